@@ -10,21 +10,70 @@ EduVis Content Generation API Server
 4. 运行: python server-example.py
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_file, redirect
 from flask_cors import CORS
+from werkzeug.security import safe_join
 import subprocess
+import hmac
 import json
+import mimetypes
 import os
+import signal
 import sys
 import time
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent / "v0_automation_toolkit"))
+from dev_server_supervisor import DevServerSupervisor
+from static_assets import choose_variant, is_immutable, IMMUTABLE_MAX_AGE
+from catalog import get_catalog
+from project_gc import ProjectGC
+from job_queue import get_queue, DEFAULT_LEASE_SEC
+from artifact_store import ArtifactStore
+
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True) # 允许所有来源访问API，并支持凭证
 
 # 配置路径
 TOOLKIT_DIR = Path("v0_automation_toolkit")
 GENERATED_PROJECTS_DIR = Path("v0_generated_projects")
+PREVIEW_PROJECT_DIRS = [GENERATED_PROJECTS_DIR,
+                        Path(os.environ.get('V0_PROJECTS_DIR', TOOLKIT_DIR / "generated_projects"))]
+GENERATION_TIMEOUT = 300  # 5分钟超时
+# 超时后等待生成脚本自行清理（停止构建和开发服务器）的时间
+CANCEL_GRACE_SEC = 15
+
+# 交互式预览使用的开发服务器（LRU 上限 + 空闲回收）
+dev_servers = DevServerSupervisor()
+
+# 项目目录：按项目名直接查找，不再扫描目录
+catalog = get_catalog()
+
+# 构建任务队列和共享产物目录：build_worker.py 领取任务并把导出结果发布到产物目录
+job_queue = get_queue()
+artifacts = ArtifactStore()
+# 其他主机上的 worker 通过 /api/worker/* 领取任务，未设置时这些接口关闭
+WORKER_TOKEN = os.environ.get('V0_WORKER_TOKEN')
+
+def find_project_dir(project_name):
+    """优先从项目目录索引中查找，找不到再回退到约定的目录"""
+    entry = catalog.find_by_project_name(project_name)
+    if entry and entry['project_path'] and Path(entry['project_path']).exists():
+        return Path(entry['project_path'])
+    for projects_dir in PREVIEW_PROJECT_DIRS:
+        project_dir = projects_dir / project_name
+        if (project_dir / "package.json").exists():
+            return project_dir
+    return None
+
+def find_export_dir(project_name):
+    """导出的静态站点：优先使用 worker 发布的产物，其次是本机项目的 out/"""
+    published = artifacts.path_for(project_name)
+    if published:
+        return published
+    project_dir = find_project_dir(project_name)
+    out_dir = project_dir / "out" if project_dir else None
+    return out_dir if out_dir and out_dir.exists() else None
 
 @app.route('/api/v0-generate', methods=['POST'])
 def generate_content():
@@ -64,15 +113,7 @@ def generate_content():
             }), 500
 
         # 执行生成脚本
-        result = subprocess.run([
-            sys.executable, str(integration_script)
-        ], 
-        input=input_data, 
-        capture_output=True, 
-        text=True, 
-        env=env,
-        timeout=300  # 5分钟超时
-        )
+        result = run_generation_script(integration_script, input_data, env)
         
         if result.returncode == 0:
             try:
@@ -113,13 +154,73 @@ def generate_content():
             "fallback": True
         }), 500
 
+def run_generation_script(script: Path, input_data: str, env: dict, timeout: int = GENERATION_TIMEOUT):
+    """运行生成脚本；超时后发送 SIGTERM 让它取消构建、停止开发服务器并释放端口
+
+    脚本在独立的进程组中运行，宽限期后仍未退出则 SIGKILL 整个进程组，
+    之后 subprocess.TimeoutExpired 照常抛出
+    """
+    proc = subprocess.Popen(
+        [sys.executable, str(script)],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, env=env, start_new_session=True,
+    )
+    try:
+        stdout, stderr = proc.communicate(input=input_data, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.communicate(timeout=CANCEL_GRACE_SEC)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.communicate()
+        raise
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+
+def send_static_file(root: Path, filename: str):
+    """发送导出项目中的静态文件：预压缩变体 + 缓存头 + 304 协商"""
+    path = safe_join(str(root), filename) if filename else str(root)
+    if path is None:
+        return "File not found", 404
+    if os.path.isdir(path):
+        path = os.path.join(path, "index.html")
+    elif not os.path.isfile(path) and os.path.isfile(path + ".html"):
+        # next export 生成的是 about.html 而不是 about/index.html
+        path = path + ".html"
+    if not os.path.isfile(path):
+        return "File not found", 404
+
+    stat = os.stat(path)
+    served_path, encoding = choose_variant(path, request.headers.get('Accept-Encoding', ''))
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}" + (f"-{encoding}" if encoding else "")
+
+    response = send_file(
+        served_path,
+        mimetype=mimetype,
+        conditional=True,
+        etag=etag,
+        last_modified=stat.st_mtime,
+    )
+    # 文件名是 .gz/.br 变体，不需要告诉客户端
+    response.headers.pop('Content-Disposition', None)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    if is_immutable(filename):
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/projects/<project_name>/')
 def serve_project(project_name):
     """为生成的项目提供静态文件服务"""
     try:
-        project_dir = GENERATED_PROJECTS_DIR / project_name / "out"
-        if project_dir.exists():
-            return send_from_directory(project_dir, "index.html")
+        out_dir = find_export_dir(project_name)
+        if out_dir:
+            catalog.mark_served(project_name)
+            return send_static_file(out_dir, "index.html")
         else:
             return "Project not found", 404
     except Exception as e:
@@ -129,14 +230,111 @@ def serve_project(project_name):
 def serve_project_files(project_name, filename):
     """为生成的项目提供静态资源文件"""
     try:
-        project_dir = GENERATED_PROJECTS_DIR / project_name / "out"
-        if project_dir.exists():
-            return send_from_directory(project_dir, filename)
+        out_dir = find_export_dir(project_name)
+        if out_dir:
+            catalog.mark_served(project_name)
+            return send_static_file(out_dir, filename)
         else:
             return "File not found", 404
     except Exception as e:
         return f"Error serving file: {e}", 500
 
+@app.route('/preview/<project_name>/')
+def preview_project(project_name):
+    """交互式预览：按需启动（或复用）项目的开发服务器并跳转"""
+    project_dir = find_project_dir(project_name)
+    if not project_dir:
+        return "Project not found", 404
+
+    if dev_servers.is_pruned(project_dir):
+        # project_gc 删除了闲置项目的 node_modules：退回静态导出
+        if find_export_dir(project_name):
+            return redirect(f"/projects/{project_name}/")
+        return "Project dependencies were pruned and no static export exists; rebuild the project to preview it", 409
+
+    catalog.mark_served(project_name)
+    port = dev_servers.ensure(project_dir)
+    if not port:
+        return "Dev server failed to start", 503
+    return redirect(f"{request.scheme}://{request.host.split(':')[0]}:{port}/")
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """异步生成：任务入队后立即返回，由 build_worker.py 构建并发布"""
+    data = request.json or {}
+    prompt = data.get('prompt', '')
+    if not prompt:
+        return jsonify({"success": False, "error": "No prompt provided"}), 400
+    job_id = job_queue.enqueue(prompt)
+    return jsonify({"success": True, "jobId": job_id, "statusUrl": f"/api/jobs/{job_id}"}), 202
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    """查询任务状态；完成后返回项目地址"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    response = {
+        "success": True,
+        "jobId": job_id,
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "error": job['error'],
+    }
+    if job['result']:
+        response['projectUrl'] = job['result']['project_url']
+    return jsonify(response)
+
+@app.route('/api/jobs/<int:job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消任务；执行中的 worker 在下次续租时停止构建"""
+    if not job_queue.cancel(job_id):
+        return jsonify({"success": False, "error": "Job not found or already finished"}), 409
+    return jsonify({"success": True, "jobId": job_id, "status": "cancelled"})
+
+def worker_auth_error():
+    """校验远程 worker 的共享密钥，通过时返回 None"""
+    if not WORKER_TOKEN:
+        return jsonify({"success": False, "error": "Remote workers are disabled (V0_WORKER_TOKEN not set)"}), 403
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), WORKER_TOKEN.encode()):
+        return jsonify({"success": False, "error": "Invalid worker token"}), 401
+    return None
+
+@app.route('/api/worker/lease', methods=['POST'])
+def worker_lease():
+    """远程 worker 领取任务；没有可领取的任务时 job 为 null"""
+    error = worker_auth_error()
+    if error:
+        return error
+    data = request.json or {}
+    if not data.get('workerId'):
+        return jsonify({"success": False, "error": "No workerId provided"}), 400
+    job = job_queue.lease(data['workerId'], float(data.get('leaseSec') or DEFAULT_LEASE_SEC))
+    return jsonify({"success": True, "job": job})
+
+@app.route('/api/worker/jobs/<int:job_id>/<action>', methods=['POST'])
+def worker_update(job_id, action):
+    """远程 worker 续租 / 完成 / 失败 / 放回；ok 为 false 表示租约已失效"""
+    error = worker_auth_error()
+    if error:
+        return error
+    data = request.json or {}
+    worker_id = data.get('workerId')
+    if not worker_id:
+        return jsonify({"success": False, "error": "No workerId provided"}), 400
+    if action == 'heartbeat':
+        ok = job_queue.heartbeat(job_id, worker_id, float(data.get('leaseSec') or DEFAULT_LEASE_SEC))
+    elif action == 'complete':
+        ok = job_queue.complete(job_id, worker_id, data.get('result') or {})
+    elif action == 'fail':
+        ok = job_queue.fail(job_id, worker_id, str(data.get('error') or 'unknown error'))
+    elif action == 'release':
+        ok = job_queue.release(job_id, worker_id)
+    else:
+        return jsonify({"success": False, "error": f"Unknown action: {action}"}), 404
+    return jsonify({"success": True, "ok": ok})
+
 @app.route('/health')
 def health_check():
     """健康检查端点"""
@@ -144,7 +342,9 @@ def health_check():
         "status": "healthy",
         "timestamp": time.time(),
         "toolkit_exists": TOOLKIT_DIR.exists(),
-        "projects_dir_exists": GENERATED_PROJECTS_DIR.exists()
+        "projects_dir_exists": GENERATED_PROJECTS_DIR.exists(),
+        "dev_servers": len(dev_servers.list_servers()),
+        "jobs": job_queue.stats()
     })
 
 @app.route('/')
@@ -155,7 +355,12 @@ def root():
         "version": "1.0",
         "endpoints": {
             "/api/v0-generate": "POST - Generate educational content",
+            "/api/jobs": "POST - Queue a generation job for the build workers",
+            "/api/jobs/<id>": "GET - Job status / DELETE - Cancel job",
+            "/api/worker/lease": "POST - Remote build worker leases a job (Bearer V0_WORKER_TOKEN)",
+            "/api/worker/jobs/<id>/<action>": "POST - Remote worker heartbeat / complete / fail / release",
             "/projects/<name>/": "GET - Access generated projects",
+            "/preview/<name>/": "GET - Interactive preview on a live dev server",
             "/health": "GET - Health check"
         }
     })
@@ -172,6 +377,10 @@ if __name__ == '__main__':
     if not TOOLKIT_DIR.exists():
         print("Warning: v0_automation_toolkit directory not found!")
         print("Please ensure the toolkit is in the same directory as this script.")
+
+    # 定期回收空闲的开发服务器和冷项目占用的磁盘
+    dev_servers.start_reaper()
+    ProjectGC(supervisor=dev_servers).start()
     
     app.run(
         host='0.0.0.0', 
@@ -0,0 +1,73 @@
+"""
+v0 自动化工具包
+
+各模块仍是可以直接运行的脚本，彼此通过同目录的 sys.path 导入。作为包导入时，
+这里把目录加入 sys.path，公开的类和函数在第一次访问时才导入对应模块，
+`import v0_automation_toolkit` 本身几乎没有开销：
+
+    from v0_automation_toolkit import V0ApiIntegration, get_catalog
+    import v0_automation_toolkit as toolkit
+    toolkit.catalog.hash_prompt("...")      # 模块同样按需导入
+
+模块以顶层名称导入（catalog 而不是 v0_automation_toolkit.catalog），
+与脚本方式共享同一份模块和进程内单例；不要写 import v0_automation_toolkit.catalog。
+"""
+
+import os
+import sys
+import importlib
+
+_TOOLKIT_DIR = os.path.dirname(os.path.abspath(__file__))
+if _TOOLKIT_DIR not in sys.path:
+    sys.path.append(_TOOLKIT_DIR)
+
+# 公开名称 -> 所在模块
+_EXPORTS = {
+    'V0ApiIntegration': 'v0_api_integration',
+    'AutoProjectBuilder': 'auto_project_builder',
+    'BuildWorker': 'build_worker',
+    'call_v0': 'v0_api_call',
+    'generate_v0': 'v0_api_call',
+    'get_catalog': 'catalog',
+    'hash_prompt': 'catalog',
+    'get_queue': 'job_queue',
+    'JobQueue': 'job_queue',
+    'ArtifactStore': 'artifact_store',
+    'get_archive': 'response_archive',
+    'extract_response': 'response_extraction',
+    'ExtractionResult': 'response_extraction',
+    'DevServerSupervisor': 'dev_server_supervisor',
+    'PromptAssembler': 'prompt_assembler',
+    'get_assembler': 'prompt_assembler',
+    'choose_max_tokens': 'token_budget',
+    'get_engine': 'fix_rules',
+    'RepairLoop': 'repair_loop',
+    'TsValidator': 'ts_validator',
+    'get_validator': 'ts_validator',
+    'CancelToken': 'cancellation',
+    'JobCancelled': 'cancellation',
+    'run_streaming': 'process_runner',
+}
+
+_MODULES = frozenset(
+    name[:-3] for name in os.listdir(_TOOLKIT_DIR)
+    if name.endswith('.py') and not name.startswith('_')
+)
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    elif name in _MODULES:
+        value = importlib.import_module(name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # 之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | _MODULES)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+共享产物目录 - 构建 worker 发布导出的静态站点，API 前端直接提供
+
+    artifacts/
+        <项目名>              -> 符号链接，指向当前版本
+        .versions/<项目名>-<时间戳>/   导出的 out/ 内容
+
+发布时先把新版本完整复制到 .versions/，再用 os.replace 原子地切换符号链接，
+前端不会读到复制了一半的目录；旧版本在切换后删除。
+其他主机上的 worker 把 V0_ARTIFACT_DIR 指向前端提供的同一个共享目录（NFS 等）：
+发布只用到目录复制、符号链接和 rename，不依赖文件锁或共享内存，在网络文件系统上同样是原子的。
+前端挂载时应避免缓存"不存在"的查找结果（NFS 的 lookupcache=positive），否则新发布的项目
+可能要等属性缓存过期才能看到。
+"""
+
+import os
+import time
+import shutil
+import socket
+import argparse
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_ARTIFACT_DIR = Path(os.environ.get('V0_ARTIFACT_DIR', Path(__file__).parent / "artifacts"))
+VERSIONS_DIR = '.versions'
+
+
+class ArtifactStore:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or DEFAULT_ARTIFACT_DIR)
+
+    def path_for(self, name: str) -> Optional[Path]:
+        """已发布的导出目录，不存在时返回 None"""
+        path = self.root / name
+        return path if path.is_dir() else None
+
+    def publish(self, out_dir: Path, name: str) -> Path:
+        """把导出目录发布为 <root>/<name>，返回发布后的路径"""
+        versions = self.root / VERSIONS_DIR
+        versions.mkdir(parents=True, exist_ok=True)
+        version = versions / f"{name}-{time.time_ns()}"
+        shutil.copytree(out_dir, version)
+
+        link = self.root / name
+        previous = link.resolve() if link.is_symlink() else None
+        # 多台主机共享目录时 pid 可能重复
+        tmp_link = self.root / f".{name}.{socket.gethostname()}.{os.getpid()}.tmp"
+        os.symlink(os.path.relpath(version, self.root), tmp_link)
+        os.replace(tmp_link, link)
+        if previous and previous != version.resolve():
+            shutil.rmtree(previous, ignore_errors=True)
+        return link
+
+    def remove(self, name: str) -> bool:
+        link = self.root / name
+        if not link.is_symlink():
+            return False
+        target = link.resolve()
+        link.unlink()
+        shutil.rmtree(target, ignore_errors=True)
+        return True
+
+    def list_artifacts(self):
+        for link in sorted(self.root.iterdir()) if self.root.is_dir() else []:
+            if link.is_symlink():
+                yield link.name, link.resolve()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享产物目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出已发布的项目")
+    publish = sub.add_parser("publish", help="发布导出目录")
+    publish.add_argument("out_dir")
+    publish.add_argument("name")
+    remove = sub.add_parser("remove", help="删除已发布的项目")
+    remove.add_argument("name")
+    args = parser.parse_args()
+
+    store = ArtifactStore()
+    if args.command == "list":
+        for name, target in store.list_artifacts():
+            print(f"{name:<40} {target}")
+    elif args.command == "publish":
+        print(f"✅ {store.publish(Path(args.out_dir), args.name)}")
+    elif args.command == "remove":
+        print("✅ 已删除" if store.remove(args.name) else "❌ 不存在")
+
+
+if __name__ == "__main__":
+    main()
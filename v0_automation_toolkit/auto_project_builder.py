@@ -13,22 +13,61 @@ import os
 import re
 import json
 import shutil
-import subprocess
 from pathlib import Path
 import argparse
-from typing import Dict, List, Tuple, Optional, Set
-import socket
 import time
-from urllib.request import urlopen
-from urllib.error import URLError, HTTPError
+import threading
+from typing import Callable, Dict, List, Tuple, Optional, Set
+
+from static_assets import precompress_directory
+from catalog import get_catalog, STATUS_BUILT, STATUS_FAILED
+from response_archive import read_response_text
+from response_extraction import extract_response
+from next_build_cache import NextBuildCache
+from process_runner import run_streaming, DEFAULT_LOG_DIR
+from cancellation import JobCancelled
+from build_cache import BuildArtifactCache, build_key, write_manifest, read_manifest, hash_content, file_hash
+from fix_rules import get_engine, iter_source_files
+from export_index import load_export_index
+from repair_loop import RepairLoop, DEFAULT_MAX_ROUNDS
+from ts_validator import get_validator, format_error
+
+# 提取的文件不允许覆盖的模板文件
+PROTECTED_PATHS = {
+    'tailwind.config.ts',
+    'app/globals.css',
+    'postcss.config.mjs',
+}
 
 class AutoProjectBuilder:
-    def __init__(self, ui_path: Optional[str] = None):
+    def __init__(self, ui_path: Optional[str] = None, cancel_event: Optional[threading.Event] = None):
         self.ui_path = ui_path
+        self.cancel_event = cancel_event
         self.setup_commands = []
         self.extracted_dependencies = []
         self.extracted_shadcn_commands = []
-        
+        self.last_extraction = None
+        self.build_cache = BuildArtifactCache()
+        self.next_cache = NextBuildCache() if os.environ.get('V0_SHARED_NEXT_CACHE', '1') != '0' else None
+        self.last_build_stats: Dict = {}
+        
+    @staticmethod
+    def _log_path(project_path: Path, step: str) -> Path:
+        return DEFAULT_LOG_DIR / project_path.name / f"{step}.log"
+
+    def _run(self, project_path: Path, step: str, cmd: List[str], cwd: Optional[Path] = None,
+             env: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+             on_line: Optional[Callable[[str], None]] = None) -> Dict:
+        """运行一个构建步骤，输出写入 logs/<项目名>/<步骤>.log，内存中只保留末尾若干行"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise JobCancelled(step)
+        result = run_streaming(cmd, cwd=cwd or project_path, env=env, timeout=timeout,
+                               log_path=self._log_path(project_path, step), cancel_event=self.cancel_event,
+                               on_line=on_line)
+        if result['cancelled']:
+            raise JobCancelled(step)
+        return result
+
     def create_nextjs_skeleton(self, project_path: Path) -> bool:
         """创建Next.js项目骨架并安装shadcn-ui"""
         print(f"🏗️  正在创建Next.js项目骨架: {project_path}")
@@ -50,13 +89,13 @@ class AutoProjectBuilder:
             
             # 1. 创建Next.js项目
             print("  - Step 1: Running create-next-app...")
-            result = subprocess.run([
+            result = self._run(project_path, 'create-next-app', [
                 'npx', 'create-next-app@latest', str(project_path.name),
                 '--typescript', '--eslint', '--tailwind', '--app', '--turbopack', '--yes'
-            ], capture_output=True, text=True, timeout=180, cwd=str(project_path.parent))
+            ], cwd=project_path.parent, timeout=180)
             
-            if result.returncode != 0:
-                print(f"❌ create-next-app 失败: {result.stderr}")
+            if result['returncode'] != 0:
+                print(f"❌ create-next-app 失败: {result['tail'][-1000:]}")
                 return False
             print("  ✅ Next.js项目创建成功")
 
@@ -148,13 +187,10 @@ class AutoProjectBuilder:
                 'recharts',
                 'vaul'
             ]
-            result = subprocess.run(
-                ['npm', 'install'] + dependencies,
-                capture_output=True, text=True, timeout=180, cwd=str(project_path)
-            )
+            result = self._run(project_path, 'npm-install-shadcn', ['npm', 'install'] + dependencies, timeout=180)
 
-            if result.returncode != 0:
-                print(f"⚠️  安装shadcn-ui核心依赖失败: {result.stderr}")
+            if result['returncode'] != 0:
+                print(f"⚠️  安装shadcn-ui核心依赖失败: {result['tail'][-1000:]}")
             else:
                 print("  ✅ shadcn-ui核心依赖安装成功")
             
@@ -173,12 +209,11 @@ class AutoProjectBuilder:
             try:
                 print(f"    Installing {len(all_components)} components in one batch...")
                 # 尝试一次性安装所有组件（最快方式）
-                result = subprocess.run(
-                    ['npx', 'shadcn@latest', 'add', '--yes'] + all_components,
-                    capture_output=True, text=True, timeout=180, cwd=str(project_path)  # 3分钟超时
-                )
+                result = self._run(project_path, 'shadcn-add',
+                                   ['npx', 'shadcn@latest', 'add', '--yes'] + all_components,
+                                   timeout=180)  # 3分钟超时
                 
-                if result.returncode == 0:
+                if result['returncode'] == 0:
                     installed_count = len(all_components)
                     print(f"    ✅ ALL {installed_count} components installed successfully in one batch!")
                 else:
@@ -194,12 +229,11 @@ class AutoProjectBuilder:
                     for i, batch in enumerate(batches, 1):
                         try:
                             print(f"      Batch {i}/4: {', '.join(batch[:3])}...")
-                            batch_result = subprocess.run(
-                                ['npx', 'shadcn@latest', 'add', '--yes'] + batch,
-                                capture_output=True, text=True, timeout=90, cwd=str(project_path)
-                            )
+                            batch_result = self._run(project_path, 'shadcn-add',
+                                                     ['npx', 'shadcn@latest', 'add', '--yes'] + batch,
+                                                     timeout=90)
                             
-                            if batch_result.returncode == 0:
+                            if batch_result['returncode'] == 0:
                                 installed_count += len(batch)
                                 print(f"      ✅ Batch {i} installed ({len(batch)} components)")
                             else:
@@ -214,7 +248,7 @@ class AutoProjectBuilder:
             print(f"  🚀 Successfully installed {installed_count} shadcn-ui components ({installed_count}/{len(all_components)})")
             
             # 安装从v0响应中提取的依赖
-            if hasattr(self, 'extracted_dependencies') and self.extracted_dependencies:
+            if self.extracted_dependencies:
                 print("  - Step 3b: Installing extracted dependencies...")
                 for dep_cmd in self.extracted_dependencies:
                     # 解析npm install命令
@@ -223,11 +257,12 @@ class AutoProjectBuilder:
                         if packages:
                             print(f"    Installing: {' '.join(packages)}")
                             try:
-                                result = subprocess.run(['npm', 'install'] + packages,
-                                                      cwd=project_path, check=True, capture_output=True, text=True, timeout=180)
-                                print(f"    ✅ 成功安装: {' '.join(packages)}")
-                            except subprocess.CalledProcessError as e:
-                                print(f"    ⚠️ 安装失败: {' '.join(packages)} - {e.stderr}")
+                                result = self._run(project_path, 'npm-install-extracted',
+                                                   ['npm', 'install'] + packages, timeout=180)
+                                if result['returncode'] == 0:
+                                    print(f"    ✅ 成功安装: {' '.join(packages)}")
+                                else:
+                                    print(f"    ⚠️ 安装失败: {' '.join(packages)} - {result['tail'][-500:]}")
                             except Exception as e:
                                 print(f"    ⚠️ 安装异常: {' '.join(packages)} - {e}")
             
@@ -296,7 +331,11 @@ class AutoProjectBuilder:
         
         next_config_content = f'''/** @type {{import('next').NextConfig}} */
 const nextConfig = {{
+  // 静态导出到 out/，由 server-example.py 在 /projects/<name>/ 下提供服务
+  output: 'export',
+  basePath: process.env.NEXT_BASE_PATH || '',
   images: {{
+    unoptimized: true,
     domains: [
 {chr(10).join([f'      "{domain}",' for domain in common_image_domains])}
     ],
@@ -582,496 +621,28 @@ export default config
         print("    ✅ postcss.config.mjs configured (v4).")
     
     def extract_files_from_response(self, file_path: str) -> Dict[str, Dict]:
-        """从v0响应文件中提取所有文件"""
+        """从v0响应文件（或 archive://<id> 归档记录）中提取所有文件
+
+        解析由 response_extraction 完成；这里记录本次提取到的命令，供后续的依赖安装和项目信息使用
+        """
         print(f"📄 正在解析文件: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            raw_content = f.read()
-        
-        files = {}
-        
-        # 首先尝试解析JSON包装格式的响应
-        content = raw_content
-        try:
-            data = json.loads(raw_content)
-            if 'content' in data and isinstance(data['content'], str):
-                print("📋 检测到JSON包装格式，提取content字段")
-                content = data['content']
-                
-                # 处理新的v0 API格式：跳过<Thinking>标签内容
-                if content.startswith('<Thinking>'):
-                    print("📋 检测到v0新格式，跳过思考过程")
-                    # 查找</Thinking>标签结束位置
-                    thinking_end = content.find('</Thinking>')
-                    if thinking_end != -1:
-                        content = content[thinking_end + 12:].strip()  # +12 for </Thinking>
-                        print(f"📋 提取实际内容，长度: {len(content)}")
-                    else:
-                        # 如果没有找到结束标签，尝试查找实际代码开始的地方
-                        # 通常代码会在一些常见标记后开始
-                        markers = ['Here\'s the implementation:', 'I\'ll create', '```', 'Let me create']
-                        for marker in markers:
-                            marker_pos = content.find(marker)
-                            if marker_pos != -1:
-                                content = content[marker_pos:].strip()
-                                print(f"📋 从标记'{marker}'开始提取，长度: {len(content)}")
-                                break
-                        else:
-                            print("⚠️  未找到合适的内容开始位置，使用原始内容")
-                            
-        except json.JSONDecodeError:
-            print("📋 非JSON包装格式，直接解析")
-        
-        # 首先提取依赖安装命令
-        self._extract_dependency_commands(content)
-        
-        # 然后尝试新的JSON格式
-        try:
-            # 寻找JSON代码块
-            json_match = re.search(r'```json\s*\n(\{.*?\n\})\s*\n```', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                data = json.loads(json_str)
-                
-                # 检查是否有files数组
-                if 'files' in data and isinstance(data['files'], list):
-                    print("📋 检测到新的JSON格式")
-                    for file_obj in data['files']:
-                        if 'path' in file_obj and 'content' in file_obj:
-                            path = file_obj['path']
-                            content = file_obj['content']
-                            
-                            # 推断语言类型
-                            lang = self._infer_language_from_path(path)
-                            
-                            files[path] = {
-                                'content': content.strip(),
-                                'language': lang,
-                                'source': 'json_format'
-                            }
-                    
-                    print(f"📊 提取了 {len(files)} 个文件")
-                    return files
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f"📋 JSON格式解析失败，尝试传统Markdown格式: {e}")
-        
-        # 回退到传统的Markdown解析
-        print("📋 使用传统Markdown格式解析")
-        processed_code_blocks = set()
-        
-        # 定义解析模式（优先级从高到低）
-        patterns = [
-            # 1. 带 file="" 属性的代码块
-            (r'```(\w+)\s+file="([^"]+)"\s*\n(.*?)\n```', 'explicit_file'),
-            # 2. Markdown标题定义的代码块
-            (r'####\s*`([^`]+)`\s*\n```(\w+)?\s*\n(.*?)\n```', 'markdown_header'),
-            # 3. Shell命令块
-            (r'```(?:sh|bash)\s*\n(.*?)\n```', 'shell_commands'),
-            # 4. package.json
-            (r'```json\s*\n(\{.*?"name":.*?\})\s*\n```', 'package_json'),
-            # 5. TSX组件
-            (r'```tsx\s*\n(.*?)\n```', 'tsx_component'),
-            # 6. TypeScript文件
-            (r'```(?:ts|typescript)\s*\n(.*?)\n```', 'typescript_file'),
-            # 7. CSS文件
-            (r'```css\s*\n(.*?)\n```', 'css_file'),
-        ]
-        
-        for pattern, source_type in patterns:
-            matches = re.findall(pattern, content, re.DOTALL)
-            
-            for match in matches:
-                if source_type == 'explicit_file':
-                    lang, filename, code = match
-                elif source_type == 'markdown_header':
-                    filename, lang, code = match
-                    lang = lang or 'tsx'
-                elif source_type == 'shell_commands':
-                    code = match
-                    self.setup_commands.extend(code.strip().split('\n'))
-                    continue
-                elif source_type == 'package_json':
-                    code = match
-                    filename = 'package.json'
-                    lang = 'json'
-                else:
-                    code = match
-                    filename = None  # 需要推断
-                    lang = source_type.split('_')[0]
-                
-                clean_code = code.strip()
-                if not clean_code or clean_code in processed_code_blocks:
-                    continue
-                
-                processed_code_blocks.add(clean_code)
-                
-                # 推断文件名（如果没有明确指定）
-                if not filename:
-                    if source_type == 'tsx_component':
-                        filename = self._infer_component_filename(clean_code, len(files))
-                    elif source_type == 'typescript_file':
-                        if 'utils' in clean_code.lower() or 'cn(' in clean_code:
-                            filename = 'lib/utils.ts'
-                        else:
-                            filename = f'lib/helpers-{len(files)}.ts'
-                    elif source_type == 'css_file':
-                        if '@tailwind' in clean_code:
-                            filename = 'app/globals.css'
-                        else:
-                            filename = f'styles/style-{len(files)}.css'
-                
-                if filename and filename not in files:
-                    files[filename] = {
-                        'content': clean_code,
-                        'language': lang,
-                        'source': source_type
-                    }
-        
-        print(f"📊 提取了 {len(files)} 个文件")
-        return files
-    
-    def _infer_language_from_path(self, path: str) -> str:
-        """根据文件路径推断语言类型"""
-        extension = Path(path).suffix.lower()
-        lang_map = {
-            '.tsx': 'tsx',
-            '.ts': 'typescript', 
-            '.js': 'javascript',
-            '.jsx': 'jsx',
-            '.css': 'css',
-            '.json': 'json',
-            '.md': 'markdown',
-            '.py': 'python',
-            '.html': 'html'
-        }
-        return lang_map.get(extension, 'text')
-    
-    def _extract_dependency_commands(self, content: str):
-        """从 v0 响应中提取依赖安装命令"""
-        dependency_commands = []
-        shadcn_commands = []
-        
-        # 提取所有 bash 代码块
-        bash_pattern = r'```bash\s*\n(.*?)\n```'
-        bash_blocks = re.findall(bash_pattern, content, re.DOTALL)
-        
-        for block in bash_blocks:
-            lines = block.strip().split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # npm install 命令
-                if line.startswith('npm install '):
-                    dependency_commands.append(line)
-                    print(f"📦 发现依赖安装命令: {line}")
-                
-                # shadcn-ui 相关命令
-                elif 'shadcn' in line.lower() or 'shadcn-ui' in line.lower():
-                    shadcn_commands.append(line)
-                    print(f"🎨 发现 shadcn-ui 命令: {line}")
-        
-        # 存储提取的命令供后续使用
-        self.extracted_dependencies = dependency_commands
-        self.extracted_shadcn_commands = shadcn_commands
-        
-        if dependency_commands:
-            print(f"📋 提取了 {len(dependency_commands)} 条依赖安装命令")
-        if shadcn_commands:
-            print(f"📋 提取了 {len(shadcn_commands)} 条 shadcn-ui 命令")
-    
-    def _infer_component_filename(self, code: str, file_count: int) -> str:
-        """从TSX内容推断组件文件名"""
-        # 尝试从export default或function名称推断
-        export_match = re.search(r'export\s+default\s+function\s+(\w+)', code)
-        if export_match:
-            component_name = export_match.group(1)
-            return f'components/{self._camel_to_kebab(component_name)}.tsx'
-        
-        # 尝试从函数定义推断
-        function_match = re.search(r'function\s+(\w+)', code)
-        if function_match:
-            component_name = function_match.group(1)
-            return f'components/{self._camel_to_kebab(component_name)}.tsx'
-        
-        # 如果找不到，使用默认名称
-        return f'components/component-{file_count}.tsx'
-    
-    def _camel_to_kebab(self, name: str) -> str:
-        """将CamelCase转换为kebab-case"""
-        return re.sub(r'([A-Z])', r'-\1', name).lower().lstrip('-')
-    
-    def _fix_styled_jsx(self, content: str) -> str:
-        """自动修复 styled-jsx 问题，转换为 Tailwind CSS"""
-        
-        # 常见的 styled-jsx 到 Tailwind CSS 的转换规则
-        animation_replacements = {
-            # 气泡动画替换为 Tailwind 内置动画
-            'animate-bubble-up-1': 'animate-bounce',
-            'animate-bubble-up-2': 'animate-pulse', 
-            'animate-bubble-up-3': 'animate-ping',
-            'animate-bubble-up': 'animate-bounce',
-            # 其他常见自定义动画
-            'animate-fade-in': 'animate-pulse',
-            'animate-slide-up': 'animate-bounce',
-            'animate-float': 'animate-pulse',
-        }
-        
-        # 1. 移除整个 <style jsx> 块
-        content = re.sub(r'<style jsx>\{`[^`]*`\}</style>', '', content, flags=re.DOTALL)
-        content = re.sub(r'<style jsx>\{`[^`]*`\}</style>\s*\n', '', content, flags=re.DOTALL)
-        
-        # 2. 替换自定义动画类名为 Tailwind 内置动画
-        for custom_class, tailwind_class in animation_replacements.items():
-            # 直接替换动画类名
-            content = content.replace(custom_class, tailwind_class)
-            # 使用正则表达式替换 className 中的动画类
-            content = re.sub(rf'\b{re.escape(custom_class)}\b', tailwind_class, content)
-        
-        # 3. 清理多余的空行和格式
-        content = re.sub(r'\n\s*\n\s*\n', '\n\n', content)  # 合并多个空行
-        content = re.sub(r'</div>\s*\n\s*\);', '</div>\n);', content)  # 清理结尾格式
-        
-        return content
-    
-    def _fix_import_conflicts(self, content: str) -> str:
-        """自动修复导入名称冲突，特别是 Tooltip 组件冲突"""
-        
-        # 检测冲突：同时存在 recharts 和 ui/tooltip 导入，且都包含 Tooltip
-        recharts_import_match = re.search(r'import\s*\{\s*([^}]*)\s*\}\s*from\s*[\'"]recharts[\'"];', content)
-        ui_tooltip_import_match = re.search(r'import\s*\{\s*([^}]*)\s*\}\s*from\s*[\'"]@/components/ui/tooltip[\'"];', content)
-        
-        if not (recharts_import_match and ui_tooltip_import_match):
-            return content  # 没有冲突
-            
-        recharts_imports = [imp.strip() for imp in recharts_import_match.group(1).split(',') if imp.strip()]
-        ui_tooltip_imports = [imp.strip() for imp in ui_tooltip_import_match.group(1).split(',') if imp.strip()]
-        
-        # 检查是否存在 Tooltip 冲突
-        has_recharts_tooltip = any('Tooltip' in imp and ' as ' not in imp for imp in recharts_imports)
-        has_ui_tooltip = any(imp.startswith('Tooltip') and ' as ' not in imp for imp in ui_tooltip_imports)
-        
-        if not (has_recharts_tooltip and has_ui_tooltip):
-            return content  # 没有 Tooltip 冲突
-            
-        print("    - 检测到 Tooltip 导入冲突，正在自动修复...")
-        
-        # 1. 修复 recharts 导入：Tooltip -> Tooltip as RechartsTooltip
-        new_recharts_imports = []
-        for imp in recharts_imports:
-            if imp.strip() == 'Tooltip':
-                new_recharts_imports.append('Tooltip as RechartsTooltip')
-            elif imp.strip() == 'Legend':
-                new_recharts_imports.append('Legend as RechartsLegend')
-            else:
-                new_recharts_imports.append(imp)
-                
-        new_recharts_line = f"import {{ {', '.join(new_recharts_imports)} }} from 'recharts';"
-        content = re.sub(r'import\s*\{\s*[^}]*\s*\}\s*from\s*[\'"]recharts[\'"];', new_recharts_line, content)
-        
-        # 2. 修复 ui/tooltip 导入：各组件添加 UI 前缀
-        new_ui_imports = []
-        for imp in ui_tooltip_imports:
-            imp = imp.strip()
-            if ' as ' in imp:
-                new_ui_imports.append(imp)  # 已有别名，保持不变
-            else:
-                new_ui_imports.append(f"{imp} as UI{imp}")
-                
-        new_ui_line = f"import {{ {', '.join(new_ui_imports)} }} from '@/components/ui/tooltip';"
-        content = re.sub(r'import\s*\{\s*[^}]*\s*\}\s*from\s*[\'"]@/components/ui/tooltip[\'"];', new_ui_line, content)
-        
-        # 3. 更新使用处：<Tooltip -> <RechartsTooltip（仅在图表上下文中）
-        if 'LineChart' in content or 'BarChart' in content or 'PieChart' in content:
-            content = re.sub(r'<Tooltip(?=\s|>|/)', '<RechartsTooltip', content)
-            content = re.sub(r'</Tooltip>', '</RechartsTooltip>', content)
-        
-        return content
-    
-    def _fix_variable_scope_errors(self, content: str) -> str:
-        """自动修复常见的变量作用域错误 - 更精确版本"""
-        
-        # 只修复 generateTrajectory 函数中的特定错误
-        # 这是从实际遇到的错误中总结的模式
-        if 'generateTrajectory' in content:
-            # 查找有问题的行：使用了未定义的 initialVelocity, angle, initialHeight
-            problematic_pattern = r'(initialVelocity|angle|initialHeight)(?!\s*[,}:])'
-            
-            # 但要排除这些情况：
-            # 1. 接口定义：export interface ProjectileState { initialVelocity: number }
-            # 2. 解构赋值：const { initialVelocity, angle } = state
-            # 3. 已经有 state. 前缀的：state.initialVelocity
-            
-            lines = content.split('\n')
-            modified = False
-            
-            for i, line in enumerate(lines):
-                # 跳过接口定义行
-                if 'interface' in line or 'const {' in line or 'state.' in line:
-                    continue
-                    
-                # 只在特定上下文中修复（generateTrajectory 函数内部）
-                if ('initialVelocity' in line and 'state.initialVelocity' not in line and 
-                    not line.strip().endswith(': number;') and 'const {' not in line):
-                    
-                    # 修复这一行中的未定义变量
-                    original_line = line
-                    line = re.sub(r'\binitialVelocity\b(?!\s*[,}:])', 'state.initialVelocity', line)
-                    line = re.sub(r'\bangle\b(?!\s*[,}:])', 'state.angle', line)  
-                    line = re.sub(r'\binitialHeight\b(?!\s*[,}:])', 'state.initialHeight', line)
-                    
-                    if line != original_line:
-                        lines[i] = line
-                        modified = True
-            
-            if modified:
-                content = '\n'.join(lines)
-        
-        return content
-    
-    def _apply_safe_fixes_only(self, content: str, filepath: str) -> str:
-        """超级保守的修复策略 - 只修复100%确定安全的问题"""
-        
-        # 白名单：只修复这些精确的已知问题模式
-        safe_fixes = []
-        
-        # 1. 只修复明确的导入冲突（手动验证过的模式）
-        if 'components/projectile-simulator.tsx' in filepath:
-            # 修复特定的 Tooltip 导入冲突
-            if ('from \'recharts\'' in content and 'from \'@/components/ui/tooltip\'' in content 
-                and 'Tooltip,' in content):
-                
-                # 非常精确的替换，只修复这一个具体的导入行
-                content = re.sub(
-                    r'import \{ ([^}]*), Tooltip, ([^}]*) \} from \'recharts\';',
-                    r'import { \1, Tooltip as RechartsTooltip, \2 } from \'recharts\';',
-                    content
-                )
-                
-                content = re.sub(
-                    r'import \{ Tooltip, ([^}]*) \} from \'@/components/ui/tooltip\';',
-                    r'import { Tooltip as UITooltip, \1 } from \'@/components/ui/tooltip\';',
-                    content  
-                )
-                
-                # 更新使用处
-                if 'LineChart' in content:
-                    content = re.sub(r'<Tooltip ', '<RechartsTooltip ', content)
-                    content = re.sub(r'</Tooltip>', '</RechartsTooltip>', content)
-                
-                print("    - 应用了安全的导入冲突修复")
-        
-        # 2. 只修复physics.ts中的特定错误
-        if 'lib/physics.ts' in filepath:
-            # 修复generateTrajectory函数中的具体错误行
-            problematic_line = r'const t_final = \(initialVelocity \* Math\.sin\(toRadians\(angle\)\) \+ Math\.sqrt\(Math\.pow\(initialVelocity \* Math\.sin\(toRadians\(angle\)\), 2\) \+ 2 \* G \* initialHeight\)\) / G;'
-            fixed_line = 'const t_final = (state.initialVelocity * Math.sin(toRadians(state.angle)) + Math.sqrt(Math.pow(state.initialVelocity * Math.sin(toRadians(state.angle)), 2) + 2 * G * state.initialHeight)) / G;'
-            
-            if re.search(problematic_line, content):
-                content = re.sub(problematic_line, fixed_line, content)
-                print("    - 应用了安全的变量作用域修复")
-        
-        return content
-    
-    def _fix_variable_scope_errors_conservative(self, content: str) -> str:
-        """保守的变量作用域错误修复 - 只修复明确识别的问题"""
-        
-        # 只修复非常特定的已知错误模式，避免破坏正确的代码
-        # 基于实际遇到的错误案例进行精确匹配
-        
-        specific_fixes = [
-            # 修复 generateTrajectory 函数中 t_final 计算行的错误
-            {
-                'pattern': r'const t_final = \(initialVelocity \* Math\.sin\(toRadians\(angle\)\)',
-                'replacement': r'const t_final = (state.initialVelocity * Math.sin(toRadians(state.angle))',
-                'context': 'generateTrajectory'
-            }
-        ]
-        
-        for fix in specific_fixes:
-            if fix['context'] in content:
-                if re.search(fix['pattern'], content):
-                    content = re.sub(fix['pattern'], fix['replacement'], content)
-                    print(f"    - 应用了保守修复: {fix['context']}")
-        
-        return content
-    
-    def _fix_import_conflicts_robust(self, content: str) -> str:
-        """超强导入冲突修复 - 基于成功手动修复案例的精确自动化"""
-        
-        # 简化检测逻辑：直接检查是否同时存在这两个导入模式
-        recharts_import = re.search(r'import\s*\{[^}]*\bTooltip\b[^}]*\}\s*from\s*[\'"]recharts[\'"];', content)
-        ui_tooltip_import = re.search(r'import\s*\{[^}]*\bTooltip\b[^}]*\}\s*from\s*["\']@/components/ui/tooltip["\'];', content)
-        
-        if recharts_import and ui_tooltip_import:
-            print("    - 检测到Tooltip导入冲突，正在自动修复...")
-            
-            # 1. 修复recharts导入 - 精确模式匹配
-            recharts_line = recharts_import.group(0)
-            # 替换 Tooltip 为 Tooltip as RechartsTooltip
-            fixed_recharts = recharts_line.replace('Tooltip', 'Tooltip as RechartsTooltip')
-            content = content.replace(recharts_line, fixed_recharts)
-            
-            # 2. 修复ui/tooltip导入 - 使用精确的一次性替换
-            ui_line = ui_tooltip_import.group(0)
-            # 使用精确的模式匹配，基于成功的手动修复案例
-            # 目标：{ Tooltip, TooltipContent, TooltipTrigger, TooltipProvider }
-            # 转换：{ Tooltip as UITooltip, TooltipContent as UITooltipContent, ... }
-            
-            # 提取import内容
-            import_match = re.search(r'import\s*\{\s*([^}]+)\s*\}', ui_line)
-            if import_match:
-                imports_str = import_match.group(1)
-                imports = [imp.strip() for imp in imports_str.split(',')]
-                
-                # 为每个导入添加UI前缀别名
-                new_imports = []
-                for imp in imports:
-                    imp = imp.strip()
-                    if ' as ' not in imp:  # 没有别名的才添加
-                        new_imports.append(f"{imp} as UI{imp}")
-                    else:
-                        new_imports.append(imp)  # 已有别名保持不变
-                
-                # 重新构建导入语句
-                new_ui_line = f"import {{ {', '.join(new_imports)} }} from \"@/components/ui/tooltip\";"
-                content = content.replace(ui_line, new_ui_line)
-            
-            # 3. 更新使用处 - 只更新图表中的Tooltip
-            if 'LineChart' in content or 'BarChart' in content:
-                # 使用更精确的替换模式
-                content = re.sub(r'<Tooltip\s+formatter=', '<RechartsTooltip formatter=', content)
-                content = re.sub(r'<Tooltip\s*/>', '<RechartsTooltip />', content)
-                content = re.sub(r'<Tooltip>', '<RechartsTooltip>', content)
-                content = re.sub(r'</Tooltip>', '</RechartsTooltip>', content)
-        
-        return content
-    
-    def _fix_variable_scope_errors_robust(self, content: str) -> str:
-        """超强变量作用域修复 - 只修复generateTrajectory函数中的特定错误"""
-        
-        # 只在physics相关文件中进行修复
-        if 'generateTrajectory' not in content:
-            return content
-            
-        # 修复具体的错误行：t_final计算中的变量作用域问题
-        # 匹配模式：const t_final = (initialVelocity * Math.sin...
-        error_pattern = r'const t_final = \(initialVelocity \* Math\.sin\(toRadians\(angle\)\)'
-        if re.search(error_pattern, content):
-            print("    - 检测到generateTrajectory中的变量作用域错误，正在修复...")
-            
-            # 精确替换：将未定义的变量改为state.变量
-            content = re.sub(
-                r'const t_final = \(initialVelocity \* Math\.sin\(toRadians\(angle\)\) \+ Math\.sqrt\(Math\.pow\(initialVelocity \* Math\.sin\(toRadians\(angle\)\), 2\) \+ 2 \* G \* initialHeight\)\) / G;',
-                'const t_final = (state.initialVelocity * Math.sin(toRadians(state.angle)) + Math.sqrt(Math.pow(state.initialVelocity * Math.sin(toRadians(state.angle)), 2) + 2 * G * state.initialHeight)) / G;',
-                content
-            )
-        
-        return content
+        result = extract_response(read_response_text(file_path))
+        for diagnostic in result.diagnostics:
+            print(f"{'⚠️ ' if diagnostic.level == 'warning' else '📋'} {diagnostic.message}")
+        for command in result.dependency_commands:
+            print(f"📦 发现依赖安装命令: {command}")
+        for command in result.shadcn_commands:
+            print(f"🎨 发现 shadcn-ui 命令: {command}")
+
+        self.last_extraction = result
+        self.setup_commands = list(result.setup_commands)
+        self.extracted_dependencies = list(result.dependency_commands)
+        self.extracted_shadcn_commands = list(result.shadcn_commands)
+        print(f"📊 提取了 {len(result.files)} 个文件")
+        return result.file_map()
     
-    def _detect_and_install_missing_dependencies(self, project_path):
-        """自动检测并安装缺失的依赖包"""
+    def _detect_and_install_missing_dependencies(self, project_path, only_files: Optional[List[Path]] = None):
+        """自动检测并安装缺失的依赖包；only_files 不为空时只扫描这些文件"""
         print("  - 🔍 检测项目依赖需求...")
         
         # 常见的依赖映射（包含更多动画和可视化库）
@@ -1092,55 +663,63 @@ export default config
         
         # 扫描所有代码文件查找导入语句
         print(f"    📂 扫描 {project_path.name} 中的代码文件...")
-        for ext in ['tsx', 'ts', 'js', 'jsx']:
-            for filepath in project_path.glob(f'**/*.{ext}'):
-                if 'node_modules' in str(filepath) or '.next' in str(filepath):
-                    continue
-                    
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
+        extensions = {'.tsx', '.ts', '.js', '.jsx'}
+        if only_files is None:
+            candidates = iter_source_files(project_path, extensions)
+        else:
+            candidates = [p for p in only_files if p.suffix in extensions and p.is_file()]
+        for filepath in candidates:
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                
+                # 更强大的导入检测 - 支持多种 import 语法
+                for package_name in dependency_map.keys():
+                    # 检测所有可能的导入格式：
+                    patterns = [
+                        rf"import\s+.*?\s+from\s+['\"]({re.escape(package_name)})['\"]",  # import ... from 'package'
+                        rf"import\s*\{{.*?\}}\s*from\s+['\"]({re.escape(package_name)})['\"]",  # import { ... } from 'package' 
+                        rf"import\s+\*\s+as\s+\w+\s+from\s+['\"]({re.escape(package_name)})['\"]",  # import * as ... from 'package'
+                        rf"const\s+.*?\s*=\s*require\(['\"]({re.escape(package_name)})['\"]\)",  # require('package')
+                    ]
                     
-                    # 更强大的导入检测 - 支持多种 import 语法
-                    for package_name in dependency_map.keys():
-                        # 检测所有可能的导入格式：
-                        patterns = [
-                            rf"import\s+.*?\s+from\s+['\"]({re.escape(package_name)})['\"]",  # import ... from 'package'
-                            rf"import\s*\{{.*?\}}\s*from\s+['\"]({re.escape(package_name)})['\"]",  # import { ... } from 'package' 
-                            rf"import\s+\*\s+as\s+\w+\s+from\s+['\"]({re.escape(package_name)})['\"]",  # import * as ... from 'package'
-                            rf"const\s+.*?\s*=\s*require\(['\"]({re.escape(package_name)})['\"]\)",  # require('package')
-                        ]
-                        
-                        for pattern in patterns:
-                            if re.search(pattern, content, re.MULTILINE):
-                                detected_deps.update(dependency_map[package_name])
-                                print(f"    ✅ 在 {filepath.name} 中发现: {package_name}")
-                                break
-                                
-                except Exception as e:
-                    print(f"    ⚠️ 读取文件失败 {filepath.name}: {e}")
-                    continue
-        
+                    for pattern in patterns:
+                        if re.search(pattern, content, re.MULTILINE):
+                            detected_deps.update(dependency_map[package_name])
+                            print(f"    ✅ 在 {filepath.name} 中发现: {package_name}")
+                            break
+                            
+            except Exception as e:
+                print(f"    ⚠️ 读取文件失败 {filepath.name}: {e}")
+                continue
+    
+        # 跳过 package.json 中已经声明的依赖
+        try:
+            with open(project_path / 'package.json', 'r', encoding='utf-8') as f:
+                pkg = json.load(f)
+            declared = set(pkg.get('dependencies', {})) | set(pkg.get('devDependencies', {}))
+        except (OSError, json.JSONDecodeError):
+            declared = set()
+        already = detected_deps & declared
+        detected_deps -= declared
+        if already:
+            print(f"  - ℹ️ 已安装，跳过: {', '.join(sorted(already))}")
+
         if detected_deps:
             print(f"  - 📦 需要安装的依赖: {', '.join(sorted(detected_deps))}")
             try:
                 # 安装缺失的依赖
-                result = subprocess.run(
-                    ['npm', 'install'] + list(detected_deps),
-                    cwd=project_path,
-                    capture_output=True,
-                    text=True,
-                    timeout=180  # 3分钟超时
-                )
+                result = self._run(project_path, 'npm-install-detected',
+                                   ['npm', 'install'] + sorted(detected_deps), timeout=180)  # 3分钟超时
                 
-                if result.returncode == 0:
+                if result['returncode'] == 0:
                     print(f"  - ✅ 成功安装 {len(detected_deps)} 个依赖包!")
+                elif result['timed_out']:
+                    print(f"  - ⚠️ 依赖安装超时（超过3分钟）")
                 else:
                     print(f"  - ❌ 依赖安装失败:")
-                    print(f"    Error: {result.stderr.strip()[:300]}")
+                    print(f"    Error: {result['tail'].strip()[-300:]}")
                     
-            except subprocess.TimeoutExpired:
-                print(f"  - ⚠️ 依赖安装超时（超过3分钟）")
             except Exception as e:
                 print(f"  - ⚠️ 依赖安装异常: {e}")
         else:
@@ -1167,15 +746,9 @@ export function cn(...inputs: ClassValue[]) {
     
     def save_files_to_project(self, files: Dict[str, Dict], project_path: Path):
         """保存提取的文件到目标项目中，并保护关键文件不被覆盖"""
-        protected_paths = {
-            'tailwind.config.ts',
-            'app/globals.css',
-            'postcss.config.mjs',
-        }
-
         saved_files = []
         for filename, file_info in files.items():
-            if filename in protected_paths:
+            if filename in PROTECTED_PATHS:
                 print(f"⏭️  跳过覆盖受保护文件: {filename}")
                 continue
             file_path = project_path / filename
@@ -1206,249 +779,112 @@ export function cn(...inputs: ClassValue[]) {
         except Exception as e:
             print(f"⚠️  UI组件复制失败: {e}")
 
-    def _post_process_files(self, project_path):
+    def _post_process_files(self, project_path, only_files: Optional[List[Path]] = None):
+        """修复项目文件；only_files 不为空时只处理这些文件（增量更新）"""
         print("\n🔧 正在对项目文件进行后处理和修复...")
         # 检测并安装缺失的依赖
-        self._detect_and_install_missing_dependencies(project_path)
+        self._detect_and_install_missing_dependencies(project_path, only_files)
         
-        # 常见的JSX标签修复
-        replacements = {
-            '</Title>': '</CardTitle>',
-            # You can add more replacement rules here in the future.
-        }
-
-        # 需要自动注入的 shadcn-ui 组件导入
-        shadcn_imports = [
-            {
-                'name': 'alert',
-                'tags': ['Alert', 'AlertTitle', 'AlertDescription'],
-                'import_line': 'import { Alert, AlertTitle, AlertDescription } from "@/components/ui/alert";'
-            },
-            {
-                'name': 'button',
-                'tags': ['Button'],
-                'import_line': 'import { Button } from "@/components/ui/button";'
-            },
-            {
-                'name': 'card',
-                'tags': ['Card', 'CardHeader', 'CardTitle', 'CardDescription', 'CardContent', 'CardFooter'],
-                'import_line': 'import { Card, CardHeader, CardTitle, CardDescription, CardContent, CardFooter } from "@/components/ui/card";'
-            },
-            {
-                'name': 'tooltip',
-                'tags': ['Tooltip', 'TooltipContent', 'TooltipTrigger', 'TooltipProvider'],
-                'import_line': 'import { Tooltip, TooltipContent, TooltipTrigger, TooltipProvider } from "@/components/ui/tooltip";'
-            },
-            {
-                'name': 'dialog',
-                'tags': ['Dialog', 'DialogContent', 'DialogHeader', 'DialogTitle', 'DialogDescription', 'DialogFooter', 'DialogTrigger', 'DialogClose'],
-                'import_line': 'import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription, DialogFooter, DialogTrigger, DialogClose } from "@/components/ui/dialog";'
-            },
-        ]
-
-        # 常见的 lucide-react 图标自动导入（解决 BrainCircuit 等图标缺失问题）
-        lucide_icons = [
-            'ArrowRight', 'CheckCircle', 'Lightbulb', 'Microscope', 'Scale', 'Target', 'GraduationCap',
-            'BrainCircuit', 'Beaker', 'FlaskConical', 'TestTube', 'BookOpen', 'Calculator', 'ChevronDown',
-            'ChevronRight', 'Info', 'AlertCircle', 'Check', 'X', 'Plus', 'Minus', 'Star', 'Heart',
-            'Eye', 'EyeOff', 'Search', 'Filter', 'Settings', 'Menu', 'Home', 'User', 'Mail', 'Phone',
-            'Calendar', 'Clock', 'MapPin', 'Edit', 'Trash', 'Download', 'Upload', 'Share', 'Copy',
-            'ExternalLink', 'Zap', 'Cpu', 'Database', 'Server', 'Code', 'Terminal', 'Globe'
-        ]
-
-        # 遍历所有 .tsx 和 .ts 文件
-        for ext in ['tsx', 'ts']:
-            for filepath in project_path.glob(f'**/*.{ext}'):
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    changed = False
-                    
-                    # 1. 自动移除重复导入
-                    content, duplicate_removed = self._remove_duplicate_imports(content)
-                    if duplicate_removed:
-                        changed = True
-                    
-                    # 2. 文本替换修复
-                    for old, new in replacements.items():
-                        if old in content:
-                            content = content.replace(old, new)
-                            changed = True
-
-                    # 3. 仅对 TSX 执行组件导入注入
-                    if filepath.suffix == '.tsx':
-                        # 3a. shadcn-ui 组件自动导入
-                        for rule in shadcn_imports:
-                            # 如果文件中使用了这些标签
-                            if any(re.search(rf"<\s*{tag}\b", content) for tag in rule['tags']):
-                                # 检查是否已存在任何形式的导入（更全面的检测）
-                                has_import = False
-                                for tag in rule['tags']:
-                                    # 检查多种导入格式：
-                                    # import { Button } from ...
-                                    # import { Button, ... } from ...
-                                    # import {..., Button, ...} from ...
-                                    patterns = [
-                                        rf"import\s*\{{[^}}]*\b{tag}\b[^}}]*\}}\s*from\s*['\"][^'\"]*{rule['name']}['\"]",
-                                        rf"import\s*\{{[^}}]*\b{tag}\b[^}}]*\}}\s*from\s*['\"][^'\"]*ui/{rule['name']}['\"]",
-                                        rf"import\s*\{{[^}}]*\b{tag}\b[^}}]*\}}\s*from\s*['\"]\.\.?/.*ui/{rule['name']}['\"]"
-                                    ]
-                                    if any(re.search(pattern, content, re.MULTILINE) for pattern in patterns):
-                                        has_import = True
-                                        break
-                                
-                                # 只有在完全没有相关导入时才添加
-                                if not has_import:
-                                    # 将导入插入到首个非注释行之前或现有 import 之后
-                                    lines = content.splitlines()
-                                    insert_idx = 0
-                                    for i, line in enumerate(lines):
-                                        if line.strip().startswith('import '):
-                                            insert_idx = i + 1
-                                    lines.insert(insert_idx, rule['import_line'])
-                                    content = "\n".join(lines) + ("\n" if not content.endswith("\n") else "")
-                                    changed = True
-
-                        # 3b. lucide-react 图标自动导入（智能检测，避免重复导入）
-                        used_icons = []
-                        for icon in lucide_icons:
-                            # 检查图标是否在代码中使用（JSX标签形式或className中）
-                            icon_patterns = [
-                                rf"<\s*{icon}\b",  # <BrainCircuit
-                                rf"\b{icon}\s*className", # BrainCircuit className
-                                rf"const\s+\w+\s*=\s*{icon}\b", # const icon = BrainCircuit
-                            ]
-                            if any(re.search(pattern, content) for pattern in icon_patterns):
-                                used_icons.append(icon)
-                        
-                        if used_icons:
-                            # 检查所有现有导入，避免重复导入
-                            all_imported_icons = set()
-                            
-                            # 扫描所有现有的导入语句，提取已导入的图标名称
-                            import_lines = re.findall(r'import\s*\{([^}]*)\}\s*from\s*[\'"][^\'"]*[\'"]', content)
-                            for import_line in import_lines:
-                                imported_names = [name.strip() for name in import_line.split(',')]
-                                all_imported_icons.update(imported_names)
-                            
-                            # 过滤掉已经导入的图标（无论从哪里导入）
-                            truly_missing_icons = [icon for icon in used_icons if icon not in all_imported_icons]
-                            
-                            if truly_missing_icons:
-                                # 检查是否已存在 lucide-react 导入
-                                lucide_import_pattern = r"import\s*\{([^}]*)\}\s*from\s*['\"]lucide-react['\"]"
-                                lucide_match = re.search(lucide_import_pattern, content)
-                                
-                                if lucide_match:
-                                    # 已存在 lucide-react 导入，添加缺失的图标
-                                    existing_lucide_imports = [imp.strip() for imp in lucide_match.group(1).split(',')]
-                                    new_imports = existing_lucide_imports + truly_missing_icons
-                                    new_import_line = f"import {{ {', '.join(new_imports)} }} from 'lucide-react';"
-                                    content = content.replace(lucide_match.group(0), new_import_line)
-                                    changed = True
-                                    print(f"    ✅ 添加缺失的 lucide 图标: {', '.join(truly_missing_icons)}")
-                                else:
-                                    # 创建新的 lucide-react 导入
-                                    new_import_line = f"import {{ {', '.join(truly_missing_icons)} }} from 'lucide-react';"
-                                    lines = content.splitlines()
-                                    insert_idx = 0
-                                    for i, line in enumerate(lines):
-                                        if line.strip().startswith('import '):
-                                            insert_idx = i + 1
-                                    lines.insert(insert_idx, new_import_line)
-                                    content = "\n".join(lines) + ("\n" if not content.endswith("\n") else "")
-                                    changed = True
-                                    print(f"    ✅ 自动添加 lucide-react 导入: {', '.join(truly_missing_icons)}")
-                            else:
-                                if used_icons:
-                                    print(f"    ℹ️ 图标已存在导入，跳过: {', '.join(used_icons)}")
-
-                    # 4. styled-jsx 自动修复（仅对 TSX 文件）
-                    if filepath.suffix == '.tsx' and '<style jsx>' in content:
-                        print(f"  - 检测到 styled-jsx，正在自动转换为 Tailwind CSS: {filepath.relative_to(project_path)}")
-                        content = self._fix_styled_jsx(content)
-                        changed = True
-                    
-                    # 5. 完全自动修复系统 - 重新启用并改进
-                    if filepath.suffix == '.tsx':
-                        original_content = content
-                        content = self._fix_import_conflicts_robust(content)
-                        if content != original_content:
-                            print(f"  - 修复了导入冲突: {filepath.relative_to(project_path)}")
-                            changed = True
-                    
-                    # 6. 变量作用域错误自动修复 - 更精确的版本
-                    if filepath.suffix in ['.tsx', '.ts']:
-                        original_content = content
-                        content = self._fix_variable_scope_errors_robust(content)
-                        if content != original_content:
-                            print(f"  - 修复了变量作用域错误: {filepath.relative_to(project_path)}")
-                            changed = True
-
-                    if changed:
-                        print(f"  - 修复了文件: {filepath.relative_to(project_path)}")
-                        with open(filepath, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                except Exception as e:
-                    print(f"  - 修复文件失败 {filepath}: {e}")
+        # 所有修复规则由 fix_rules 引擎一次扫描、按需执行；缺失的导入按模板的导出索引补全
+        engine = get_engine()
+        try:
+            context = {'export_index': load_export_index(project_path)}
+        except OSError as e:
+            print(f"  - ⚠️ 构建导出索引失败，跳过自动导入: {e}")
+            context = None
+        if only_files is None:
+            candidates = iter_source_files(project_path, engine.extensions)
+        else:
+            candidates = [p for p in only_files if p.suffix in engine.extensions and p.is_file()]
+        for filepath in candidates:
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                content, applied = engine.apply(content, filepath.suffix, context)
+                if applied:
+                    print(f"  - 修复了文件: {filepath.relative_to(project_path)} ({', '.join(applied)})")
+                    with open(filepath, 'w', encoding='utf-8') as f:
+                        f.write(content)
+            except Exception as e:
+                print(f"  - 修复文件失败 {filepath}: {e}")
         print("✅ 后处理完成")
     
-    def _find_free_port(self, start_port: int = 3000, max_tries: int = 50) -> int:
-        port = start_port
-        for _ in range(max_tries):
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                try:
-                    s.bind(("127.0.0.1", port))
-                    return port
-                except OSError:
-                    port += 1
-        return port
-
     def _wait_http_ok(self, url: str, timeout_sec: int = 40) -> Tuple[bool, Optional[int]]:
-        start = time.time()
-        last_code = None
-        while time.time() - start < timeout_sec:
-            try:
-                with urlopen(url, timeout=5) as resp:
-                    last_code = resp.getcode()
-                    if 200 <= last_code < 400:
-                        return True, last_code
-            except HTTPError as e:
-                last_code = e.code
-            except URLError:
-                pass
-            time.sleep(1)
-        return False, last_code
+        from readiness import wait_http_ok
+        return wait_http_ok(url, timeout_sec=timeout_sec)
 
     def run_smoke_test(self, project_path: Path, base_port: Optional[int] = None, timeout_sec: int = 45) -> bool:
-        port = self._find_free_port(base_port or 3000)
-        log_file = project_path / '.smoke.log'
-        print(f"🧪 正在运行 Smoke Test: http://localhost:{port}")
-        proc = subprocess.Popen(
-            ['npx', 'next', 'dev', '--turbopack', '-p', str(port)],
-            cwd=str(project_path),
-            stdout=open(log_file, 'w'),
-            stderr=subprocess.STDOUT,
-        )
-        ok, code = self._wait_http_ok(f"http://localhost:{port}/", timeout_sec=timeout_sec)
-        # 尝试关闭
-        try:
-            proc.terminate()
-            try:
-                proc.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                proc.kill()
-        except Exception:
-            pass
-        if ok:
-            print(f"✅ Smoke Test 通过 (HTTP {code})")
+        from smoke_test_runner import smoke_test_project
+        print(f"🧪 正在运行 Smoke Test: {project_path}")
+        result = smoke_test_project(project_path, mode='dev', timeout_sec=timeout_sec, base_port=base_port)
+        if result['status'] == 'passed':
+            print(f"✅ Smoke Test 通过 (HTTP {result['http_status']}, {result['elapsed']}s)")
             return True
         else:
-            print(f"❌ Smoke Test 失败 (HTTP {code})，请查看日志: {log_file}")
+            print(f"❌ Smoke Test 失败 (HTTP {result.get('http_status')}, {result['reason']})，请查看日志: {project_path / '.smoke.log'}")
+            for error in result['errors'][:5]:
+                print(f"   {error}")
+            print(f"💡 可以运行修复循环: python repair_loop.py {project_path}")
             return False
-    
+
+    def validate_project(self, project_path: Path) -> Dict:
+        """不启动开发服务器，对提取出的文件做类型检查（秒级，可与其他构建并发）"""
+        print(f"🩺 类型检查: {project_path}")
+        result = get_validator().validate(project_path, log_path=self._log_path(project_path, 'type-check'),
+                                          cancel_event=self.cancel_event)
+        if result['status'] == 'passed':
+            print(f"✅ 类型检查通过 ({result['files']} 个文件, {result['elapsed']}s)")
+        elif result['status'] == 'failed':
+            print(f"❌ 类型检查失败: {len(result['errors'])} 个错误 ({result['elapsed']}s)")
+            for error in result['errors'][:5]:
+                print(f"   {format_error(error)}")
+        else:
+            print(f"⚠️ 类型检查无法运行: {result['tail']}")
+        return result
+
+    def repair_project(self, project_path: Path, max_rounds: int = DEFAULT_MAX_ROUNDS, use_model: bool = True) -> Dict:
+        """类型检查生成的文件，失败时先本地修复，再只针对出错的文件重新调用 v0"""
+        return RepairLoop(self, max_rounds=max_rounds, use_model=use_model).run(Path(project_path))
+
+    def export_static(self, project_path: Path, base_path: Optional[str] = None, timeout_sec: int = 600) -> Optional[Path]:
+        """运行 next build 导出静态站点到 out/，并预压缩所有静态资源"""
+        if base_path is None:
+            base_path = f"/projects/{project_path.name}"
+        print(f"📦 正在导出静态站点: {project_path} (basePath={base_path or '/'})")
+        out_dir = project_path / 'out'
+        key = build_key(project_path)
+        if key and self.build_cache.materialize(key, out_dir, base_path):
+            print(f"♻️  命中构建缓存 {key[:12]}，跳过 next build: {out_dir}")
+            return out_dir
+
+        env = os.environ.copy()
+        env['NEXT_BASE_PATH'] = base_path
+        if self.next_cache and (project_path / 'node_modules').is_dir():
+            # 在共享工作区中构建，复用同一模板指纹下其他项目的编译缓存
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise JobCancelled('next-build')
+            result = self.next_cache.build(project_path, env=env, timeout_sec=timeout_sec,
+                                           log_path=self._log_path(project_path, 'next-build'),
+                                           cancel_event=self.cancel_event)
+            if result['cancelled']:
+                raise JobCancelled('next-build')
+            self.last_build_stats = {k: result[k] for k in ('fingerprint', 'cache_reuse', 'elapsed')}
+            print(f"  - ♻️ 编译缓存复用率 {result['cache_reuse']:.0%} ({result['fingerprint']})")
+        else:
+            result = self._run(project_path, 'next-build', ['npx', 'next', 'build'], env=env, timeout=timeout_sec)
+        if result['timed_out']:
+            print(f"❌ 静态导出超时（超过 {timeout_sec} 秒）")
+            return None
+
+        if result['returncode'] != 0 or not out_dir.is_dir():
+            print(f"❌ 静态导出失败: {result['tail'].strip()[-500:]}")
+            return None
+
+        stats = precompress_directory(out_dir)
+        self.build_cache.store(key, out_dir, base_path, project=str(project_path))
+        print(f"✅ 静态导出完成: {out_dir} (预压缩 {stats['files']} 个文件)")
+        return out_dir
+
     def _generate_project_info(self, project_path: Path, files: Dict, file_count: int):
         """生成项目信息文件"""
         info = {
@@ -1467,67 +903,14 @@ export function cn(...inputs: ClassValue[]) {
         with open(project_path / 'project-info.json', 'w', encoding='utf-8') as f:
             json.dump(info, f, indent=2, ensure_ascii=False)
 
-    def _remove_duplicate_imports(self, content: str) -> tuple[str, bool]:
-        """自动检测和移除重复的导入语句"""
-        lines = content.splitlines()
-        import_lines = []
-        other_lines = []
-        seen_imports = set()
-        duplicates_found = False
-        
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('import ') and ' from ' in stripped:
-                # 标准化导入语句进行比较
-                # 提取导入的组件和来源路径
-                import_match = re.match(r'import\s*\{([^}]+)\}\s*from\s*[\'"]([^\'"]+)[\'"]', stripped)
-                if import_match:
-                    components = set(c.strip() for c in import_match.group(1).split(','))
-                    from_path = import_match.group(2)
-                    
-                    # 标准化路径（处理相对路径和绝对路径的等效情况）
-                    normalized_path = from_path
-                    if from_path.startswith('../'):
-                        # 相对路径转换为标准形式
-                        if 'ui/' in from_path:
-                            ui_component = from_path.split('ui/')[-1]
-                            normalized_path = f"@/components/ui/{ui_component}"
-                    elif from_path.startswith('./'):
-                        if 'ui/' in from_path:
-                            ui_component = from_path.split('ui/')[-1]
-                            normalized_path = f"@/components/ui/{ui_component}"
-                    
-                    # 创建唯一的导入标识符
-                    for component in components:
-                        import_key = f"{component.strip()}:{normalized_path}"
-                        if import_key in seen_imports:
-                            duplicates_found = True
-                            # 跳过重复的导入行
-                            continue
-                        seen_imports.add(import_key)
-                    
-                    # 检查整行是否重复
-                    line_key = f"{sorted(components)}:{normalized_path}"
-                    if line_key not in [l[1] for l in import_lines]:
-                        import_lines.append((line, line_key))
-                    else:
-                        duplicates_found = True
-                else:
-                    import_lines.append((line, None))
-            else:
-                other_lines.append(line)
-        
-        if duplicates_found:
-            # 重新构建内容
-            result_lines = [line[0] for line in import_lines] + other_lines
-            return '\n'.join(result_lines), True
-        
-        return content, False
-    
+    @staticmethod
+    def default_project_name(input_file: str) -> str:
+        return f"chemistry_project_{Path(input_file).stem.replace('output_', '').replace('.json.raw', '')}"
+
     def build_project(self, input_file: str, output_dir: str, project_name: str = None):
         """构建完整项目"""
         if not project_name:
-            project_name = f"chemistry_project_{Path(input_file).stem.replace('output_', '').replace('.json.raw', '')}"
+            project_name = self.default_project_name(input_file)
         
         output_path = Path(output_dir)
         project_path = output_path / project_name
@@ -1547,9 +930,14 @@ export function cn(...inputs: ClassValue[]) {
             if not self.create_nextjs_skeleton(project_path):
                 raise Exception("项目骨架创建失败")
             self._add_default_files(files)
-            self.save_files_to_project(files, project_path)
+            saved_files = self.save_files_to_project(files, project_path)
             self.copy_ui_components(project_path)
+            saved = {Path(p).relative_to(project_path).as_posix() for p in saved_files}
+            sources = {rel: info['content'] for rel, info in files.items() if rel in saved}
+            # 先记录哪些文件是生成的，后处理中的导出索引据此计算模板指纹；修复后再更新文件哈希
+            write_manifest(project_path, sources)
             self._post_process_files(project_path)
+            write_manifest(project_path, sources)
             
             print(f"✅ 项目构建完成: {project_path}")
             print(f"📊 包含 {len(files)} 个提取的文件")
@@ -1559,87 +947,143 @@ export function cn(...inputs: ClassValue[]) {
             print(f"❌ 项目构建失败: {e}")
             return None
 
+    @staticmethod
+    def _package_name(spec: str) -> str:
+        """npm install 参数中的包名：去掉版本号（@scope/name@1.2 -> @scope/name）"""
+        at = spec.find('@', 1)
+        return spec[:at] if at > 0 else spec
+
+    def _install_new_dependencies(self, project_path: Path):
+        """安装响应中 npm install / shadcn add 命令里、项目还没有的包和组件"""
+        try:
+            with open(project_path / 'package.json', 'r', encoding='utf-8') as f:
+                pkg = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            pkg = {}
+        installed = set(pkg.get('dependencies', {})) | set(pkg.get('devDependencies', {}))
+
+        packages = []
+        for command in self.extracted_dependencies:
+            for spec in command.split()[2:]:
+                if not spec.startswith('-') and self._package_name(spec) not in installed and spec not in packages:
+                    packages.append(spec)
+        if packages:
+            print(f"📦 安装新增依赖: {' '.join(packages)}")
+            result = self._run(project_path, 'npm-install-extracted', ['npm', 'install'] + packages, timeout=180)
+            if result['returncode'] != 0:
+                print(f"  ⚠️ 安装失败: {result['tail'][-500:]}")
+
+        components = []
+        for command in self.extracted_shadcn_commands:
+            args = command.split()
+            if 'add' not in args:
+                continue
+            for name in args[args.index('add') + 1:]:
+                if not name.startswith('-') and not (project_path / 'components' / 'ui' / f'{name}.tsx').exists() \
+                        and name not in components:
+                    components.append(name)
+        if components:
+            print(f"🎨 安装新增 shadcn-ui 组件: {' '.join(components)}")
+            result = self._run(project_path, 'shadcn-add', ['npx', 'shadcn@latest', 'add', '--yes'] + components,
+                               timeout=180)
+            if result['returncode'] != 0:
+                print(f"  ⚠️ 组件安装失败: {result['tail'][-500:]}")
+
+    def update_project(self, input_file: str, output_dir: str, project_name: str = None):
+        """增量更新已有项目：只写入、修复内容有变化的文件，只安装新增的依赖
+
+        不重建骨架、不重新安装 node_modules，.next 缓存保留，开发服务器可直接热更新。
+        项目不存在或没有 .v0_manifest.json 时退回完整构建。
+        """
+        if not project_name:
+            project_name = self.default_project_name(input_file)
+        project_path = Path(output_dir) / project_name
+        manifest = read_manifest(project_path)
+        if not manifest or 'sources' not in manifest or not (project_path / 'node_modules').is_dir():
+            print("ℹ️  项目不存在或缺少清单，执行完整构建")
+            return self.build_project(input_file, output_dir, project_name)
+
+        print(f"🔄 增量更新项目: {project_path}")
+        files = self.extract_files_from_response(input_file)
+        if not files:
+            print("❌ 未找到可提取的文件")
+            return None
+        self._add_default_files(files)
+        files = {rel: info for rel, info in files.items() if rel not in PROTECTED_PATHS}
+
+        old_sources, old_files = manifest['sources'], manifest['files']
+        changed = {rel: info for rel, info in files.items() if old_sources.get(rel) != hash_content(info['content'])}
+        removed = [rel for rel in old_sources if rel not in files]
+        # 响应内容没变但磁盘上的文件被手工修改过：保留修改，重新后处理
+        hand_edited = [rel for rel in files if rel not in changed and rel in old_files
+                       and file_hash(project_path / rel) != old_files[rel]]
+
+        try:
+            self._install_new_dependencies(project_path)
+            for rel in removed:
+                (project_path / rel).unlink(missing_ok=True)
+                print(f"🗑️  删除文件: {rel}")
+            self.save_files_to_project(changed, project_path)
+            touched = [project_path / rel for rel in list(changed) + hand_edited]
+            if touched:
+                self._post_process_files(project_path, only_files=touched)
+            write_manifest(project_path, {rel: info['content'] for rel, info in files.items()})
+        except Exception as e:
+            print(f"❌ 增量更新失败: {e}")
+            return None
+
+        print(f"✅ 增量更新完成: 修改 {len(changed)}，手工修改 {len(hand_edited)}，删除 {len(removed)}，"
+              f"未变 {len(files) - len(changed) - len(hand_edited)}")
+        return project_path
+
 def main():
     parser = argparse.ArgumentParser(description="自动化V0项目构建器")
-    parser.add_argument("input_file", help="v0响应文件路径")
+    parser.add_argument("input_file", help="v0响应文件路径或 archive://<id>")
     parser.add_argument("-o", "--output", default="auto_projects", help="输出目录")
     parser.add_argument("--project-name", help="项目名称")
     parser.add_argument("--ui-path", help="本地UI组件路径")
     parser.add_argument("--smoke-test", action="store_true", help="构建后运行一次本地编译+首页请求健康检查")
     parser.add_argument("--port", type=int, default=None, help="Smoke Test 起始端口(可选)")
+    parser.add_argument("--export", action="store_true", help="构建后运行 next build 导出静态站点到 out/ 并预压缩")
+    parser.add_argument("--update", action="store_true", help="增量更新已有项目，只写入和修复有变化的文件")
+    parser.add_argument("--validate", action="store_true", help="构建后只对生成的文件做类型检查（不启动开发服务器）")
+    parser.add_argument("--repair", action="store_true", help="构建后类型检查，出错时本地修复或只重新生成出错的文件")
     
     args = parser.parse_args()
     
     builder = AutoProjectBuilder(ui_path=args.ui_path)
     
     try:
-        result = builder.build_project(
+        start = time.time()
+        build = builder.update_project if args.update else builder.build_project
+        result = build(
             input_file=args.input_file,
             output_dir=args.output,
             project_name=args.project_name
         )
+        get_catalog().record_project(
+            result or Path(args.output) / (args.project_name or ''),
+            response_path=args.input_file,
+            build_status=STATUS_BUILT if result else STATUS_FAILED,
+            stage_timings={'build': round(time.time() - start, 3)},
+        )
         
         if result:
             print(f"\n✅ 项目构建成功！")
             print(f"项目路径: {result}")
+            if args.repair:
+                builder.repair_project(result)
+            elif args.validate:
+                builder.validate_project(result)
             if args.smoke_test:
                 builder.run_smoke_test(result, base_port=args.port)
+            if args.export:
+                builder.export_static(result)
         else:
             print(f"\n❌ 项目构建失败")
             
     except Exception as e:
         return True
     
-    def _detect_potential_issues_and_guide(self, project_path):
-        """检测潜在问题并提供修复指导"""
-        print("\n🔍 检测潜在问题...")
-        
-        issues_found = []
-        
-        # 检测常见的导入冲突
-        for root, dirs, files in os.walk(project_path):
-            for file in files:
-                if file.endswith('.tsx'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            
-                        # 检测 Tooltip 导入冲突
-                        if ('from \'recharts\'' in content and 'from \'@/components/ui/tooltip\'' in content 
-                            and 'Tooltip' in content and 'Tooltip as' not in content):
-                            issues_found.append({
-                                'type': 'import_conflict',
-                                'file': os.path.relpath(file_path, project_path),
-                                'issue': 'Tooltip 导入名称冲突',
-                                'fix': '将 recharts 的 Tooltip 改为 "Tooltip as RechartsTooltip"'
-                            })
-                            
-                        # 检测变量作用域问题
-                        if ('generateTrajectory' in content and 'initialVelocity' in content 
-                            and 'state.initialVelocity' not in content):
-                            issues_found.append({
-                                'type': 'scope_error', 
-                                'file': os.path.relpath(file_path, project_path),
-                                'issue': '变量作用域错误',
-                                'fix': '将 initialVelocity 改为 state.initialVelocity'
-                            })
-                    except Exception:
-                        continue
-        
-        if issues_found:
-            print("⚠️  发现以下潜在问题:")
-            for i, issue in enumerate(issues_found, 1):
-                print(f"  {i}. {issue['file']}: {issue['issue']}")
-                print(f"     修复方法: {issue['fix']}")
-            
-            print(f"\n💡 修复建议:")
-            print(f"   1. 运行 'cd {project_path} && npm run dev'")
-            print(f"   2. 查看编译错误信息") 
-            print(f"   3. 根据上述指导手动修复")
-            print(f"   4. 或者使用 VS Code 的自动修复功能")
-        else:
-            print("✅ 未检测到明显问题，项目应该可以直接运行")
-    
 if __name__ == "__main__":
     main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+批量生成 - 从 JSONL 问题列表（每行 {"id": ..., "problem": ...}）批量生成整套课程
+
+1. 流式读取输入文件，在途任务数量有上限，内存占用与文件大小无关
+2. v0 API 调用和项目构建分别使用独立的并发上限
+3. 每个任务完成时立即追加一行到 JSONL 清单 (manifest)
+4. 崩溃后重新运行会读取清单：已成功的任务跳过，已拿到响应但构建失败的任务只重新构建
+5. 收到 SIGTERM/SIGINT 后不再提交新任务，正在运行的构建命令被终止，条目标记为 cancelled
+
+用法:
+    python batch_generate.py problems.jsonl -m manifest.jsonl --api-workers 4 --build-workers 2
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from v0_api_integration import V0ApiIntegration
+from auto_project_builder import AutoProjectBuilder
+from catalog import get_catalog, STATUS_BUILDING, STATUS_BUILT, STATUS_FAILED, STATUS_CANCELLED
+from response_archive import response_exists
+from prompt_assembler import prompt_key
+from cancellation import CancelToken, JobCancelled, install_signal_handlers
+
+
+def iter_problems(input_path: Path) -> Iterator[Dict]:
+    """流式读取问题列表，自动补全缺失的 id"""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ 第 {line_no} 行不是合法 JSON，跳过: {e}", file=sys.stderr)
+                continue
+            problem = item.get('problem') or item.get('prompt') or item.get('body')
+            if not problem:
+                print(f"⚠️ 第 {line_no} 行缺少 problem 字段，跳过", file=sys.stderr)
+                continue
+            job_id = str(item.get('id') or item.get('request_id') or hashlib.sha1(problem.encode('utf-8')).hexdigest()[:12])
+            yield {'id': job_id, 'problem': problem}
+
+
+class BatchGenerator:
+    def __init__(self, manifest_path: Path, api_workers: int = 4, build_workers: int = 2,
+                 export: bool = False, skip_build: bool = False, cancel_token: Optional[CancelToken] = None):
+        self.manifest_path = Path(manifest_path)
+        self.api_workers = max(1, api_workers)
+        self.build_workers = max(1, build_workers)
+        self.export = export
+        self.skip_build = skip_build
+        self.cancel_token = cancel_token or CancelToken()
+        self.integration = V0ApiIntegration(cancel_token=self.cancel_token)
+        self.catalog = get_catalog()
+        self._manifest_lock = threading.Lock()
+        self._futures_lock = threading.Lock()
+        self._build_futures: List[Future] = []
+        # 限制在途任务数量，避免一次性把整个输入文件读进线程池队列
+        self._in_flight = threading.BoundedSemaphore(self.api_workers + self.build_workers * 2)
+        self.counts = {'success': 0, 'failed': 0, 'skipped': 0}
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """读取已有清单，同一个 id 以最后一条记录为准"""
+        entries = {}
+        if not self.manifest_path.exists():
+            return entries
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 崩溃时可能写了半行
+                entries[entry['id']] = entry
+        return entries
+
+    def _record(self, entry: Dict):
+        entry['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._manifest_lock:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.counts['success' if entry['status'] == 'success' else 'failed'] += 1
+        icon = {'success': '✅', 'cancelled': '🛑'}.get(entry['status'], '❌')
+        print(f"{icon} [{entry['id']}] {entry['status']} ({entry.get('stage')})", file=sys.stderr)
+
+    def _generate(self, job: Dict, build_pool: ThreadPoolExecutor):
+        entry = {'id': job['id'], 'status': 'failed', 'stage': 'api', 'timings': {}}
+        try:
+            self.cancel_token.check()
+            start = time.time()
+            generation = self.integration.generate(job['problem'], response_name=f"batch_{job['id']}")
+            entry['timings']['api'] = round(time.time() - start, 3)
+            if not generation:
+                entry['error'] = 'V0 API call failed'
+                self._finish(entry)
+                return
+            response_path = generation['response_path']
+            entry['response_path'] = str(response_path)
+            entry['usage'] = generation['usage']
+            entry['catalog_id'] = self.catalog.record_response(
+                prompt_key(job['problem']), response_path, job['problem'], stage_timings=entry['timings'],
+                token_usage=generation['usage']
+            )
+        except JobCancelled:
+            entry['status'] = 'cancelled'
+            self._finish(entry)
+            return
+        except BaseException as e:
+            entry['error'] = str(e)
+            self._finish(entry)
+            return
+
+        if self.skip_build:
+            entry.update(status='success', stage='api')
+            self._finish(entry)
+            return
+        self._submit_build(entry, build_pool)
+
+    def _submit_build(self, entry: Dict, build_pool: ThreadPoolExecutor):
+        future = build_pool.submit(self._build, entry)
+        with self._futures_lock:
+            self._build_futures.append(future)
+
+    def _build(self, entry: Dict):
+        entry['stage'] = 'build'
+        try:
+            if not entry.get('catalog_id'):
+                entry['catalog_id'] = self.catalog.record_response(entry.get('prompt_hash', ''), entry['response_path'])
+            self.catalog.update(entry['catalog_id'], build_status=STATUS_BUILDING)
+        except Exception as e:
+            entry['error'] = f"catalog: {e}"
+            self._finish(entry)
+            return
+        try:
+            start = time.time()
+            builder = AutoProjectBuilder(cancel_event=self.cancel_token.event)
+            self.cancel_token.check()
+            # 恢复运行时上次可能已经构建成功（只是导出失败），增量更新可以跳过重建
+            project_path = self.integration.build_from_response(
+                entry['response_path'], project_name=f"batch_{entry['id']}", builder=builder, update=True
+            )
+            entry['timings']['build'] = round(time.time() - start, 3)
+            if not project_path:
+                entry['error'] = 'Project build failed'
+                return
+            entry['project_path'] = str(project_path)
+
+            if self.export:
+                entry['stage'] = 'export'
+                start = time.time()
+                out_dir = builder.export_static(Path(project_path))
+                entry['timings']['export'] = round(time.time() - start, 3)
+                if 'cache_reuse' in builder.last_build_stats:
+                    entry['cache_reuse'] = builder.last_build_stats['cache_reuse']
+                if not out_dir:
+                    entry['error'] = 'Static export failed'
+                    return
+            entry['status'] = 'success'
+            entry.pop('error', None)
+        except JobCancelled:
+            # 留下的半成品目录由 project_gc 按 cancelled 状态回收
+            entry['status'] = 'cancelled'
+        except BaseException as e:
+            entry['error'] = str(e)
+        finally:
+            status = {'success': STATUS_BUILT, 'cancelled': STATUS_CANCELLED}.get(entry['status'], STATUS_FAILED)
+            try:
+                self.catalog.update(
+                    entry['catalog_id'],
+                    build_status=status,
+                    project_path=entry.get('project_path'),
+                    stage_timings=entry['timings'],
+                    compute_size=True,
+                )
+            except Exception as e:
+                print(f"⚠️ [{entry['id']}] 写入项目目录失败: {e}", file=sys.stderr)
+            self._finish(entry)
+
+    def _finish(self, entry: Dict):
+        try:
+            self._record(entry)
+        finally:
+            self._in_flight.release()
+
+    def run(self, input_path: Path) -> Dict[str, int]:
+        previous = self.load_manifest()
+        if previous:
+            print(f"📋 从清单恢复: {len(previous)} 条已有记录", file=sys.stderr)
+
+        with ThreadPoolExecutor(self.api_workers, thread_name_prefix="v0-api") as api_pool, \
+                ThreadPoolExecutor(self.build_workers, thread_name_prefix="v0-build") as build_pool:
+            api_futures = []
+            for job in iter_problems(input_path):
+                if self.cancel_token.cancelled:
+                    print("🛑 已取消，不再提交新任务", file=sys.stderr)
+                    break
+                prev = previous.get(job['id'])
+                if prev and prev.get('status') == 'success':
+                    self.counts['skipped'] += 1
+                    continue
+
+                self._in_flight.acquire()
+                if prev and prev.get('response_path') and response_exists(prev['response_path']) and not self.skip_build:
+                    # 已有响应，只需要重新构建，不再消耗一次 v0 调用
+                    entry = {'id': job['id'], 'status': 'failed', 'stage': 'build',
+                             'response_path': prev['response_path'], 'catalog_id': prev.get('catalog_id'),
+                             'prompt_hash': prompt_key(job['problem']), 'timings': {}}
+                    self._submit_build(entry, build_pool)
+                else:
+                    api_futures.append(api_pool.submit(self._generate, job, build_pool))
+
+            for future in api_futures:
+                future.result()
+            # API 任务全部完成后不会再有新的构建任务提交
+            with self._futures_lock:
+                build_futures = list(self._build_futures)
+            for future in build_futures:
+                future.result()
+
+        return self.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 JSONL 批量生成教学网页")
+    parser.add_argument("input_file", help="问题列表 JSONL，每行 {\"id\": ..., \"problem\": ...}")
+    parser.add_argument("-m", "--manifest", default=None, help="结果清单 JSONL（默认: <输入文件名>.manifest.jsonl）")
+    parser.add_argument("--api-workers", type=int, default=4, help="v0 API 并发调用数")
+    parser.add_argument("--build-workers", type=int, default=2, help="项目构建并发数")
+    parser.add_argument("--export", action="store_true", help="构建后导出静态站点")
+    parser.add_argument("--skip-build", action="store_true", help="只调用 API 保存响应，不构建")
+    args = parser.parse_args()
+
+    if not os.environ.get('V0_API_KEY'):
+        sys.exit("❌ 请先设置 V0_API_KEY 环境变量")
+
+    input_path = Path(args.input_file)
+    manifest_path = Path(args.manifest) if args.manifest else input_path.with_suffix('.manifest.jsonl')
+
+    # 多线程：信号只置位 token，由各线程在检查点退出，构建命令由 process_runner 终止
+    cancel_token = CancelToken()
+    install_signal_handlers(cancel_token, interrupt=False)
+    generator = BatchGenerator(
+        manifest_path,
+        api_workers=args.api_workers,
+        build_workers=args.build_workers,
+        export=args.export,
+        skip_build=args.skip_build,
+        cancel_token=cancel_token,
+    )
+    start = time.time()
+    counts = generator.run(input_path)
+    print(f"\n🎉 批量生成完成 ({time.time() - start:.1f}s): 成功 {counts['success']}，"
+          f"失败 {counts['failed']}，跳过 {counts['skipped']}", file=sys.stderr)
+    print(f"📄 清单: {manifest_path}", file=sys.stderr)
+    sys.exit(0 if counts['failed'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+构建产物缓存 - 按最终文件内容复用 next build 的静态导出
+
+重试或措辞略有不同的问题经常提取出（修复后）完全相同的文件，却每次都重新 next build。
+这里用 "提取文件的最终内容哈希 + 模板指纹" 作为键，把导出的 out/ 以硬链接存入 build_cache/<key>/：
+1. 命中且 basePath 相同：直接硬链接到项目的 out/
+2. 命中但 basePath 不同：复制后把旧的 basePath 替换为新的，再重新预压缩
+模板指纹覆盖 package.json / package-lock.json、各类配置文件，以及骨架自带的 components/ui、lib 和 public
+（响应生成的文件不计入，它们由键的内容哈希部分覆盖），依赖或模板变化后键自然失效。
+package.json / package-lock.json 中的项目名和版本号（create-next-app <name> 写入）不计入，
+只有项目名不同的项目得到相同的指纹和键。
+
+用法:
+    python build_cache.py list
+    python build_cache.py key <project_path>
+    python build_cache.py prune --max-entries 100
+    python build_cache.py check        # 验证只有项目名不同的两个项目指纹和键相同
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from static_assets import precompress_directory, COMPRESSIBLE_SUFFIXES
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('V0_BUILD_CACHE', Path(__file__).parent / "build_cache"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('V0_BUILD_CACHE_MAX', 200))
+MANIFEST_NAME = '.v0_manifest.json'
+
+# 参与模板指纹的文件（相对项目根目录的 glob）；其中由响应生成的文件（清单中的 sources）不计入
+TEMPLATE_GLOBS = (
+    'package.json', 'package-lock.json', '*.config.*', 'tsconfig.json', 'components.json',
+    'app/globals.css', 'components/ui/**/*', 'lib/**/*', 'public/**/*',
+)
+# 计算指纹前去掉项目名和版本号的文件
+PACKAGE_FILES = ('package.json', 'package-lock.json')
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalized_package_hash(path: Path) -> str:
+    """去掉项目名和版本号后的 package.json / package-lock.json 哈希"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data.pop('name', None)
+        data.pop('version', None)
+        root = data.get('packages', {}).get('')  # lockfileVersion >= 2 的根包条目
+        if isinstance(root, dict):
+            root.pop('name', None)
+            root.pop('version', None)
+    return hash_content(json.dumps(data, sort_keys=True, ensure_ascii=False))
+
+
+def _template_file_hash(path: Path, rel: str) -> str:
+    if rel in PACKAGE_FILES:
+        try:
+            return _normalized_package_hash(path)
+        except (ValueError, UnicodeDecodeError):
+            pass  # 损坏的 JSON 按原始内容计算
+    return _sha256_file(path)
+
+
+def _hash_file_set(project_path: Path, rel_paths: Iterable[str], normalize: bool = False) -> str:
+    digest = hashlib.sha256()
+    for rel in sorted(set(rel_paths)):
+        path = project_path / rel
+        if path.is_file():
+            file_digest = _template_file_hash(path, rel) if normalize else _sha256_file(path)
+            digest.update(rel.encode('utf-8') + b'\0' + file_digest.encode('ascii') + b'\n')
+    return digest.hexdigest()
+
+
+def generated_paths(project_path: Path) -> Set[str]:
+    """清单中记录的、由响应生成的文件（相对路径）"""
+    manifest = read_manifest(project_path) or {}
+    return set(manifest.get('sources', {}))
+
+
+def template_fingerprint(project_path: Path) -> str:
+    """模板（骨架、配置、UI 组件、依赖声明）的指纹
+
+    响应经常覆盖 lib/utils.ts、components/ui/card.tsx 等模板文件，这些生成的文件不计入，
+    package.json / package-lock.json 也只按去掉项目名和版本号后的内容计算，
+    否则指纹几乎每个项目都不同，按指纹共享的编译缓存、tsc build info 和导出索引都无法命中
+    """
+    project_path = Path(project_path)
+    generated = generated_paths(project_path)
+    rel_paths = set()
+    for pattern in TEMPLATE_GLOBS:
+        for path in project_path.glob(pattern):
+            if path.is_file():
+                rel = path.relative_to(project_path).as_posix()
+                if rel not in generated:
+                    rel_paths.add(rel)
+    return _hash_file_set(project_path, rel_paths, normalize=True)
+
+
+def hash_content(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def file_hash(path: Path) -> Optional[str]:
+    try:
+        return _sha256_file(path)
+    except OSError:
+        return None
+
+
+def write_manifest(project_path: Path, sources: Dict[str, str]):
+    """记录提取文件的内容哈希
+
+    files: 修复后磁盘上的内容（构建缓存据此计算键，也用于发现手工修改）
+    sources: 响应中提取出的原始内容（update_project 据此判断响应中哪些文件变了）
+    """
+    project_path = Path(project_path)
+    files, source_hashes = {}, {}
+    for rel in sorted(sources):
+        digest = file_hash(project_path / rel)
+        if digest:
+            files[rel] = digest
+            source_hashes[rel] = hash_content(sources[rel])
+    with open(project_path / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump({'files': files, 'sources': source_hashes, 'updated_at': time.time()}, f, ensure_ascii=False, indent=2)
+
+
+def read_manifest(project_path: Path) -> Optional[Dict]:
+    try:
+        with open(Path(project_path) / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def build_key(project_path: Path) -> Optional[str]:
+    """构建缓存键；没有清单的项目（旧项目）不参与缓存"""
+    project_path = Path(project_path)
+    manifest = read_manifest(project_path)
+    if not manifest:
+        return None
+    content_hash = _hash_file_set(project_path, manifest['files'].keys())
+    return hashlib.sha256(f"{content_hash}:{template_fingerprint(project_path)}".encode('ascii')).hexdigest()
+
+
+def write_sample_project(project_path: Path, name: str, page: str = 'export default function Page() { return <main /> }\n') -> Path:
+    """写一个最小的 create-next-app 风格项目（不含 node_modules），供各模块的 check 命令使用"""
+    project_path = Path(project_path)
+    dependencies = {'next': '14.2.5', 'react': '^18', 'react-dom': '^18'}
+    files = {
+        'package.json': {'name': name, 'version': '0.1.0', 'private': True,
+                         'scripts': {'build': 'next build'}, 'dependencies': dependencies},
+        'package-lock.json': {'name': name, 'version': '0.1.0', 'lockfileVersion': 3, 'requires': True,
+                              'packages': {'': {'name': name, 'version': '0.1.0', 'dependencies': dependencies}}},
+        'tsconfig.json': {'compilerOptions': {'strict': True, 'jsx': 'preserve', 'paths': {'@/*': ['./*']}}},
+    }
+    for rel, data in files.items():
+        (project_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (project_path / rel).write_text(json.dumps(data, indent=2), encoding='utf-8')
+    sources = {
+        'next.config.mjs': "const nextConfig = { output: 'export' };\nexport default nextConfig;\n",
+        'lib/utils.ts': 'export function cn(...inputs: string[]) { return inputs.join(" ") }\n',
+        'components/ui/button.tsx': 'export function Button() { return <button /> }\n',
+        'app/page.tsx': page,
+    }
+    for rel, content in sources.items():
+        (project_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (project_path / rel).write_text(content, encoding='utf-8')
+    write_manifest(project_path, {'app/page.tsx': page})
+    return project_path
+
+
+def self_check() -> bool:
+    """两个只有项目名不同的项目应得到相同的模板指纹和构建缓存键"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = write_sample_project(Path(tmp) / 'chemistry_project_a', 'chemistry_project_a')
+        second = write_sample_project(Path(tmp) / 'job_42', 'job_42')
+        same_fingerprint = template_fingerprint(first) == template_fingerprint(second)
+        same_key = build_key(first) == build_key(second)
+        (second / 'package.json').write_text(
+            (second / 'package.json').read_text(encoding='utf-8').replace('14.2.5', '14.2.6'), encoding='utf-8')
+        dependency_change = template_fingerprint(first) != template_fingerprint(second)
+    for ok, label in ((same_fingerprint, '只有项目名不同时模板指纹相同'),
+                      (same_key, '只有项目名不同时构建缓存键相同'),
+                      (dependency_change, '依赖版本变化时模板指纹变化')):
+        print(f"{'✅' if ok else '❌'} {label}")
+    return same_fingerprint and same_key and dependency_change
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _rewrite_base_path(root: Path, old: str, new: str) -> int:
+    """把导出文件中的旧 basePath 替换为新的，返回修改的文件数"""
+    pattern = re.compile(re.escape(old).encode('utf-8') + rb'(?![\w.-])')
+    replacement = new.encode('utf-8')
+    changed = 0
+    for path in root.rglob('*'):
+        if not path.is_file() or path.suffix.lower() not in COMPRESSIBLE_SUFFIXES or path.suffix == '.ico':
+            continue
+        data = path.read_bytes()
+        updated = pattern.sub(replacement, data)
+        if updated != data:
+            path.write_bytes(updated)
+            changed += 1
+    return changed
+
+
+class BuildArtifactCache:
+    def __init__(self, root: Optional[Path] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.root = Path(root or DEFAULT_CACHE_DIR)
+        self.max_entries = max_entries
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key
+
+    def lookup(self, key: Optional[str]) -> Optional[Dict]:
+        if not key:
+            return None
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(entry_dir / 'meta.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not (entry_dir / 'out').is_dir():
+            return None
+        os.utime(entry_dir / 'meta.json')  # 记录最近使用时间，用于 LRU 清理
+        return meta
+
+    def materialize(self, key: str, dest: Path, base_path: str) -> bool:
+        """把缓存的导出结果放到 dest（通常是 <project>/out）"""
+        meta = self.lookup(key)
+        if meta is None:
+            return False
+        if meta['base_path'] != base_path and (not meta['base_path'] or not base_path):
+            return False  # 无法安全地在根路径和子路径之间改写
+        dest = Path(dest)
+        if dest.exists():
+            shutil.rmtree(dest)
+        src = self._entry_dir(key) / 'out'
+        if meta['base_path'] == base_path:
+            shutil.copytree(src, dest, copy_function=_link_or_copy)
+            return True
+        # 硬链接的文件不能原地修改，必须复制
+        shutil.copytree(src, dest, ignore=shutil.ignore_patterns('*.gz', '*.br'))
+        _rewrite_base_path(dest, meta['base_path'], base_path)
+        precompress_directory(dest)
+        return True
+
+    def store(self, key: Optional[str], out_dir: Path, base_path: str, project: str = ''):
+        """把导出结果（硬链接）存入缓存；已存在时不覆盖"""
+        if not key or self._entry_dir(key).exists():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f".tmp-{key}-{os.getpid()}"
+        try:
+            shutil.copytree(out_dir, tmp_dir / 'out', copy_function=_link_or_copy)
+            with open(tmp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+                json.dump({'base_path': base_path, 'project': project, 'created_at': time.time()}, f, ensure_ascii=False)
+            os.rename(tmp_dir, self._entry_dir(key))
+        except OSError:
+            pass  # 其他进程已经写入同一个键
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.prune()
+
+    def prune(self, max_entries: Optional[int] = None) -> int:
+        """按最近使用时间只保留 max_entries 个条目，返回删除的数量"""
+        max_entries = self.max_entries if max_entries is None else max_entries
+        entries = []
+        for entry_dir in self.root.glob('*/meta.json'):
+            try:
+                entries.append((entry_dir.stat().st_mtime, entry_dir.parent))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, entry_dir in entries[max_entries:]:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return max(0, len(entries) - max_entries)
+
+    def entries(self) -> Dict[str, Dict]:
+        result = {}
+        for meta_path in self.root.glob('*/meta.json'):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    result[meta_path.parent.name] = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建产物缓存")
+    parser.add_argument("command", choices=["list", "key", "prune", "check"],
+                        help="列出条目 / 计算项目的键 / 清理 / 自检指纹归一化")
+    parser.add_argument("project_path", nargs="?", help="计算键的项目路径")
+    parser.add_argument("--max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="prune 时保留的条目数")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        sys.exit(0 if self_check() else 1)
+    cache = BuildArtifactCache()
+    if args.command == "list":
+        for key, meta in sorted(cache.entries().items(), key=lambda item: item[1]['created_at']):
+            print(f"{key[:16]}  {meta['base_path'] or '/':<45} {meta['project']}")
+    elif args.command == "key":
+        if not args.project_path:
+            parser.error("key 需要 project_path")
+        print(build_key(Path(args.project_path)) or "❌ 项目没有 .v0_manifest.json")
+    elif args.command == "prune":
+        print(f"✅ 删除了 {cache.prune(args.max_entries)} 个条目")
+
+
+if __name__ == "__main__":
+    main()
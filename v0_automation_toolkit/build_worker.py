@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+构建 worker - 从共享任务队列领取任务：调用 v0、构建、导出并发布到共享产物目录
+
+每个进程同一时间只处理一个任务（npm/next build 本身就会占满 CPU 和磁盘），
+扩容就是多启动几个 worker 进程或主机：
+
+    python build_worker.py                # 与前端同一台主机，直接打开 job_queue.db
+    for i in 1 2 3; do python build_worker.py & done
+    # 其他主机：通过前端的 /api/worker/* 接口领取任务，产物发布到共享目录
+    V0_WORKER_TOKEN=... V0_ARTIFACT_DIR=/mnt/shared/artifacts \
+        python build_worker.py --queue-url http://front:5001
+
+job_queue.db 和 catalog.db 使用 SQLite WAL 模式，只能放在本地磁盘上，不能通过 NFS/SMB 共享；
+远程 worker 不打开前端的数据库，目录索引、响应归档和项目目录都在自己的主机上，
+只有 V0_ARTIFACT_DIR 需要指向前端提供的同一个共享目录。
+
+任务执行期间后台线程每 lease_sec/3 续租一次；续租失败（任务被取消或租约过期被接管）时
+取消当前任务，process_runner 会终止正在运行的构建命令。
+收到 SIGTERM/SIGINT 时取消当前任务并把它放回队列，由其他 worker 继续。
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from v0_api_integration import V0ApiIntegration, PROJECTS_DIR
+from job_queue import get_queue, JobQueue, RemoteJobQueue, DEFAULT_LEASE_SEC, DEFAULT_QUEUE_URL
+from artifact_store import ArtifactStore
+from catalog import STATUS_BUILDING, STATUS_BUILT, STATUS_FAILED
+from cancellation import CancelToken, JobCancelled, install_signal_handlers
+
+
+class BuildWorker:
+    def __init__(self, queue: Optional[Union[JobQueue, RemoteJobQueue]] = None, artifacts: Optional[ArtifactStore] = None,
+                 worker_id: Optional[str] = None, lease_sec: float = DEFAULT_LEASE_SEC,
+                 shutdown: Optional[CancelToken] = None):
+        self.queue = queue or get_queue()
+        self.artifacts = artifacts or ArtifactStore()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_sec = lease_sec
+        self.shutdown = shutdown or CancelToken()
+
+    def _keep_lease(self, job_id: int, token: CancelToken, done: threading.Event):
+        """续租线程：租约丢失（任务被取消或被接管）或 worker 退出时取消当前任务
+
+        远程队列暂时不可达时在租约到期前持续重试，到期后按租约丢失处理
+        """
+        last_renewed = time.time()
+        next_beat = last_renewed + self.lease_sec / 3
+        while not done.wait(1.0):
+            if self.shutdown.cancelled:
+                token.cancel('worker shutdown')
+                return
+            if time.time() >= next_beat:
+                try:
+                    renewed = self.queue.heartbeat(job_id, self.worker_id, self.lease_sec)
+                except OSError as e:
+                    if time.time() - last_renewed >= self.lease_sec:
+                        token.cancel('lease expired')
+                        return
+                    print(f"⚠️ 任务 {job_id} 续租失败，稍后重试: {e}", file=sys.stderr)
+                    next_beat = time.time() + min(5.0, self.lease_sec / 6)
+                    continue
+                if not renewed:
+                    token.cancel('lease lost')
+                    return
+                last_renewed = time.time()
+                next_beat = last_renewed + self.lease_sec / 3
+
+    def process(self, job: Dict) -> Dict:
+        """执行一个任务，返回写入队列的结果"""
+        token = CancelToken()
+        if self.shutdown.cancelled:
+            token.cancel('worker shutdown')
+        integration = V0ApiIntegration(cancel_token=token)
+        catalog = integration.catalog
+        project_name = f"job_{job['id']}"
+        timings = {}
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_lease, args=(job['id'], token, done), daemon=True)
+        keeper.start()
+        entry_id = None
+        try:
+            start = time.time()
+            generation = integration.generate(job['problem'], response_name=project_name)
+            timings['api'] = round(time.time() - start, 3)
+            token.check()
+            if not generation:
+                raise RuntimeError('V0 API call failed')
+            response_path, usage = generation['response_path'], generation['usage']
+            entry_id = catalog.record_response(integration.prompts.prompt_key(job['problem']), response_path, job['problem'],
+                                               stage_timings=timings, token_usage=usage)
+
+            start = time.time()
+            catalog.update(entry_id, build_status=STATUS_BUILDING,
+                           project_path=PROJECTS_DIR / project_name)
+            project_path = integration.build_from_response(response_path, project_name=project_name, update=True)
+            timings['build'] = round(time.time() - start, 3)
+            if not project_path:
+                raise RuntimeError('Project build failed')
+
+            # 导出前先修复类型错误，否则 next build 必然失败
+            timings['repair'] = integration.project_builder.repair_project(Path(project_path))['elapsed']
+            token.check()
+
+            start = time.time()
+            out_dir = integration.project_builder.export_static(Path(project_path))
+            timings['export'] = round(time.time() - start, 3)
+            if not out_dir:
+                raise RuntimeError('Static export failed')
+            token.check()
+            self.artifacts.publish(out_dir, project_name)
+            catalog.update(entry_id, build_status=STATUS_BUILT, project_path=project_path,
+                           stage_timings=timings, compute_size=True)
+            return {
+                'project_name': project_name,
+                'project_url': f"/projects/{project_name}/",
+                'catalog_id': entry_id,
+                'timings': timings,
+                'usage': usage,
+            }
+        except JobCancelled:
+            if entry_id:
+                integration.cleanup_cancelled(entry_id, PROJECTS_DIR / project_name)
+            raise
+        except Exception:
+            if entry_id:
+                catalog.update(entry_id, build_status=STATUS_FAILED, stage_timings=timings)
+            raise
+        finally:
+            done.set()
+            keeper.join()
+
+    def run_once(self) -> bool:
+        """领取并执行一个任务，队列为空时返回 False"""
+        job = self.queue.lease(self.worker_id, self.lease_sec)
+        if job is None:
+            return False
+        print(f"🔨 [{self.worker_id}] 任务 {job['id']} (第 {job['attempts']} 次)", file=sys.stderr)
+        try:
+            result = self.process(job)
+        except JobCancelled as e:
+            if self.shutdown.cancelled:
+                self.queue.release(job['id'], self.worker_id)
+                print(f"🛑 任务 {job['id']} 已放回队列", file=sys.stderr)
+            else:
+                print(f"🛑 任务 {job['id']} 已取消 ({e})", file=sys.stderr)
+            return True
+        except Exception as e:
+            self.queue.fail(job['id'], self.worker_id, str(e))
+            print(f"❌ 任务 {job['id']} 失败: {e}", file=sys.stderr)
+            return True
+        if self.queue.complete(job['id'], self.worker_id, result):
+            print(f"✅ 任务 {job['id']} 完成: {result['project_url']}", file=sys.stderr)
+        else:
+            print(f"⚠️ 任务 {job['id']} 的租约已失效，结果未写入队列", file=sys.stderr)
+        return True
+
+    def run(self, poll_interval: float = 2.0, once: bool = False):
+        print(f"👷 worker {self.worker_id} 已启动，队列: {self.queue.location}", file=sys.stderr)
+        while not self.shutdown.cancelled:
+            try:
+                leased = self.run_once()
+            except OSError as e:
+                # 远程队列不可达：没写回的结果由租约过期后的重试兜底
+                print(f"⚠️ 访问队列失败: {e}", file=sys.stderr)
+                leased = False
+            if not leased:
+                if once:
+                    break
+                self.shutdown.event.wait(poll_interval)
+        print(f"👋 worker {self.worker_id} 退出", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建 worker：从共享队列领取任务并发布导出结果")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SEC, help="租约时长（秒）")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--once", action="store_true", help="队列为空时退出")
+    parser.add_argument("--worker-id", default=None, help="worker 标识（默认: 主机名-pid）")
+    parser.add_argument("--queue-url", default=DEFAULT_QUEUE_URL,
+                        help="前端地址，设置后通过 HTTP 领取任务（默认: V0_JOB_QUEUE_URL，未设置时直接打开本机队列）")
+    args = parser.parse_args()
+
+    if not os.environ.get('V0_API_KEY'):
+        sys.exit("❌ 请先设置 V0_API_KEY 环境变量")
+    queue = None
+    if args.queue_url:
+        try:
+            queue = RemoteJobQueue(args.queue_url)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+
+    # 信号只置位 token：续租线程取消当前任务，主循环在任务放回队列后退出
+    shutdown = CancelToken()
+    install_signal_handlers(shutdown, interrupt=False)
+    BuildWorker(queue, worker_id=args.worker_id, lease_sec=args.lease, shutdown=shutdown).run(args.poll_interval, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+任务取消 - 让超时或被客户端放弃的任务真正释放资源
+
+server-example.py 超时后会向 v0_api_integration.py 所在的进程组发送 SIGTERM。
+以前子进程直接退出，它启动的 npm/npx（各自的进程组）和开发服务器会继续运行。
+现在收到信号后：
+1. CancelToken 被置位，process_runner 据此终止正在运行的构建命令的整个进程组
+2. 主线程中抛出 JobCancelled，打断阻塞中的就绪等待；v0 API 请求收到 token.event 后自己关闭连接
+   并抛出 JobCancelled，build_worker / batch_generate 的工作线程不依赖主线程信号也能中断请求
+3. 调用方捕获 JobCancelled，停止开发服务器（释放端口）并把目录中的条目标记为 cancelled，
+   由 project_gc 回收残留的项目目录
+
+JobCancelled 继承 BaseException（与 KeyboardInterrupt 相同），
+不会被构建器中大量的 `except Exception` 吞掉。
+"""
+
+import signal
+import threading
+from typing import Optional
+
+CANCEL_SIGNALS = tuple(getattr(signal, name) for name in ('SIGTERM', 'SIGHUP', 'SIGINT') if hasattr(signal, name))
+
+
+class JobCancelled(BaseException):
+    """任务被取消（收到终止信号）"""
+
+
+class CancelToken:
+    def __init__(self):
+        self.event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = 'cancelled'):
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def check(self):
+        """已取消时抛出 JobCancelled，用于各阶段之间的检查点"""
+        if self.event.is_set():
+            raise JobCancelled(self.reason)
+
+
+def install_signal_handlers(token: CancelToken, interrupt: bool = True):
+    """收到 SIGTERM/SIGHUP/SIGINT 时取消 token
+
+    interrupt=True 时同时在主线程抛出 JobCancelled，打断阻塞调用；
+    多线程的批量任务应传 False，由各线程在检查点自行退出
+    """
+    def _handler(signum, frame):
+        already = token.cancelled
+        token.cancel(f"signal {signal.Signals(signum).name}")
+        if interrupt and not already:
+            raise JobCancelled(token.reason)
+
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in CANCEL_SIGNALS:
+        signal.signal(signum, _handler)
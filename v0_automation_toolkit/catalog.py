@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+项目目录 (SQLite) - 记录每次生成的响应和构建出的项目
+
+以前要找 "这个问题对应的项目" 只能列目录（chemistry_project_generated_<ts>）
+再逐个读取 responses/ 里的 JSON。现在所有入口（集成脚本、完整管道、批量生成、
+构建器 CLI）都把结果写入 catalog.db，server-example.py 通过索引直接查找项目。
+
+字段: prompt_hash, response_path, project_path, build_status, stage_timings,
+      token_usage, size_bytes, last_served_at
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_DB_PATH = Path(os.environ.get('V0_CATALOG_DB', Path(__file__).parent / "catalog.db"))
+
+# 构建状态
+STATUS_PENDING = 'pending'
+STATUS_BUILDING = 'building'
+STATUS_BUILT = 'built'
+STATUS_FAILED = 'failed'
+STATUS_DELETED = 'deleted'  # 已被 project_gc 回收
+STATUS_CANCELLED = 'cancelled'  # 构建中途被取消，残留目录由 project_gc 回收
+
+# last_served_at 的最小更新间隔，避免每个静态资源请求都写一次数据库
+SERVED_WRITE_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_hash     TEXT NOT NULL,
+    problem         TEXT,
+    response_path   TEXT,
+    project_name    TEXT UNIQUE,
+    project_path    TEXT,
+    build_status    TEXT NOT NULL DEFAULT 'pending',
+    stage_timings   TEXT NOT NULL DEFAULT '{}',
+    token_usage     TEXT,
+    size_bytes      INTEGER,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL,
+    last_served_at  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_prompt_hash ON projects(prompt_hash, updated_at);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(build_status);
+"""
+# 旧数据库缺少的列: (列名, 类型)
+MIGRATIONS = [
+    ('token_usage', 'TEXT'),
+]
+
+
+def hash_prompt(problem: str, template_version: Optional[str] = None) -> str:
+    """问题内容（和 prompt 模板版本）的哈希，用于查找同一问题已生成的项目
+
+    模板修改后版本变化，旧模板生成的项目不会再被命中；通常通过 prompt_assembler.prompt_key 调用
+    """
+    key = problem.strip() if template_version is None else f"{template_version}\0{problem.strip()}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def directory_size(path: Path) -> int:
+    """递归统计目录占用的字节数（不跟随符号链接）"""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+class ProjectCatalog:
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or DEFAULT_DB_PATH)
+        self._local = threading.local()
+        self._served_cache: Dict[str, float] = {}
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(projects)")}
+            for column, column_type in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE projects ADD COLUMN {column} {column_type}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；WAL 模式允许多进程同时读写"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['stage_timings'] = json.loads(entry['stage_timings'] or '{}')
+        entry['token_usage'] = json.loads(entry['token_usage']) if entry.get('token_usage') else None
+        return entry
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def record_response(self, prompt_hash: str, response_path, problem: Optional[str] = None,
+                        stage_timings: Optional[Dict] = None, token_usage: Optional[Dict] = None) -> int:
+        """记录一次 v0 响应，返回条目 id；token_usage 为 v0_api_call.generate_v0 返回的用量和耗时"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO projects (prompt_hash, problem, response_path, build_status, stage_timings, token_usage, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (prompt_hash, problem, str(response_path) if response_path else None, STATUS_PENDING,
+                 json.dumps(stage_timings or {}), json.dumps(token_usage) if token_usage else None, now, now)
+            )
+            return cursor.lastrowid
+
+    def update(self, entry_id: int, build_status: Optional[str] = None, project_path=None,
+               stage_timings: Optional[Dict] = None, compute_size: bool = False, **fields):
+        """更新条目；stage_timings 与已有记录合并"""
+        updates = dict(fields)
+        if build_status:
+            updates['build_status'] = build_status
+        if project_path:
+            project_path = Path(project_path)
+            updates['project_path'] = str(project_path.resolve())
+            updates['project_name'] = project_path.name
+            if compute_size and project_path.exists():
+                updates['size_bytes'] = directory_size(project_path)
+
+        with self._connect() as conn:
+            if 'project_name' in updates:
+                # 同名项目重新构建时，旧条目让出名字
+                conn.execute("UPDATE projects SET project_name = NULL WHERE project_name = ? AND id != ?",
+                             (updates['project_name'], entry_id))
+            if stage_timings:
+                row = conn.execute("SELECT stage_timings FROM projects WHERE id = ?", (entry_id,)).fetchone()
+                timings = json.loads(row['stage_timings']) if row else {}
+                timings.update(stage_timings)
+                updates['stage_timings'] = json.dumps(timings)
+            updates['updated_at'] = time.time()
+            columns = ', '.join(f"{key} = ?" for key in updates)
+            conn.execute(f"UPDATE projects SET {columns} WHERE id = ?", (*updates.values(), entry_id))
+
+    def record_project(self, project_path, response_path=None, prompt_hash: Optional[str] = None,
+                       build_status: str = STATUS_BUILT, stage_timings: Optional[Dict] = None) -> int:
+        """一次性记录一个已构建的项目（构建器 CLI 等没有先记录响应的入口使用）"""
+        entry_id = self.record_response(prompt_hash or '', response_path)
+        self.update(entry_id, build_status=build_status, project_path=project_path,
+                    stage_timings=stage_timings, compute_size=True)
+        return entry_id
+
+    def mark_served(self, project_name: str):
+        now = time.time()
+        if now - self._served_cache.get(project_name, 0) < SERVED_WRITE_INTERVAL:
+            return
+        self._served_cache[project_name] = now
+        with self._connect() as conn:
+            conn.execute("UPDATE projects SET last_served_at = ? WHERE project_name = ?", (now, project_name))
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def get(self, entry_id: int) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM projects WHERE id = ?", (entry_id,)).fetchone()
+        return self._to_dict(row)
+
+    def find_by_prompt(self, prompt_hash: str, build_status: Optional[str] = STATUS_BUILT) -> Optional[Dict]:
+        """同一问题最近一次（指定状态的）构建结果"""
+        query = "SELECT * FROM projects WHERE prompt_hash = ?"
+        params = [prompt_hash]
+        if build_status:
+            query += " AND build_status = ?"
+            params.append(build_status)
+        query += " ORDER BY updated_at DESC LIMIT 1"
+        return self._to_dict(self._connect().execute(query, params).fetchone())
+
+    def find_by_project_name(self, project_name: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM projects WHERE project_name = ?", (project_name,)).fetchone()
+        return self._to_dict(row)
+
+    def list_projects(self, build_status: Optional[str] = None) -> List[Dict]:
+        if build_status:
+            rows = self._connect().execute(
+                "SELECT * FROM projects WHERE build_status = ? ORDER BY updated_at DESC", (build_status,))
+        else:
+            rows = self._connect().execute("SELECT * FROM projects ORDER BY updated_at DESC")
+        return [self._to_dict(row) for row in rows]
+
+
+_default_catalog: Optional[ProjectCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ProjectCatalog:
+    """进程内共享的默认目录"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = ProjectCatalog()
+        return _default_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询项目目录")
+    parser.add_argument("--status", help="按构建状态过滤")
+    parser.add_argument("--problem", help="按问题内容查找")
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    if args.problem:
+        from prompt_assembler import prompt_key
+        entries = [e for e in [catalog.find_by_prompt(prompt_key(args.problem), None)] if e]
+    else:
+        entries = catalog.list_projects(args.status)
+    for entry in entries:
+        size_mb = (entry['size_bytes'] or 0) / 1024 / 1024
+        print(f"{entry['id']:>5}  {entry['build_status']:<9} {size_mb:8.1f} MB  "
+              f"{entry['project_name'] or '-':<45} {entry['stage_timings']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+开发服务器管理器 - 限制同时运行的 `npm run dev` 数量
+
+注册表（项目路径、端口、PID、最后访问时间）保存在 .dev_servers.json 中，
+v0_api_integration.py、v0_complete_pipeline.py 和 server-example.py
+共享同一份注册表：
+1. 运行中的服务器数量达到上限时，淘汰最久未访问的服务器 (LRU)
+2. 空闲超过 TTL 的服务器会被回收
+3. 下次访问已回收的项目时按需重新启动
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from file_lock import file_lock, read_json, write_json_atomic, pid_alive
+from port_allocator import get_allocator
+
+DEFAULT_REGISTRY_PATH = Path(os.environ.get('V0_DEV_SERVER_REGISTRY', Path(__file__).parent / ".dev_servers.json"))
+DEFAULT_MAX_SERVERS = int(os.environ.get('V0_DEV_SERVER_MAX', 4))
+DEFAULT_IDLE_TTL = int(os.environ.get('V0_DEV_SERVER_IDLE_TTL', 15 * 60))
+
+# 本进程启动的开发服务器 PID -> Popen，服务器退出后由这里回收（pid_alive 不会回收僵尸进程）
+_children: Dict[int, subprocess.Popen] = {}
+_children_lock = threading.Lock()
+
+
+def _reap_children():
+    """回收本进程启动的、已经退出的开发服务器"""
+    with _children_lock:
+        for pid, proc in list(_children.items()):
+            if proc.poll() is not None:
+                del _children[pid]
+
+
+class DevServerSupervisor:
+    def __init__(self, registry_path: Optional[Path] = None,
+                 max_servers: int = DEFAULT_MAX_SERVERS,
+                 idle_ttl: int = DEFAULT_IDLE_TTL):
+        self.registry_path = Path(registry_path or DEFAULT_REGISTRY_PATH)
+        self.lock_path = self.registry_path.with_suffix('.lock')
+        self.max_servers = max(1, max_servers)
+        self.idle_ttl = idle_ttl
+        self.ports = get_allocator()
+        self._reaper_stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 注册表读写（调用方必须持有 file_lock）
+    # ------------------------------------------------------------------
+    def _load(self) -> Dict[str, Dict]:
+        registry = read_json(self.registry_path, {})
+        _reap_children()
+        # 清理已经退出的进程，同时释放它们的端口租约和 PID 文件
+        alive = {}
+        for key, entry in registry.items():
+            if pid_alive(entry.get('pid')):
+                alive[key] = entry
+            else:
+                self._cleanup(entry)
+        return alive
+
+    def _save(self, registry: Dict[str, Dict]):
+        write_json_atomic(self.registry_path, registry)
+
+    @staticmethod
+    def _key(project_path) -> str:
+        return str(Path(project_path).resolve())
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+    @staticmethod
+    def is_pruned(project_path) -> bool:
+        """项目的 node_modules 已被 project_gc 回收（或从未安装），无法启动开发服务器"""
+        return not (Path(project_path) / 'node_modules').is_dir()
+
+    def ensure(self, project_path) -> Optional[int]:
+        """返回项目开发服务器的端口，如果没有运行则（按需）启动
+
+        项目已被回收（is_pruned）时不启动，返回 None；调用方可以改为提供 out/ 中的静态导出
+        """
+        key = self._key(project_path)
+        if self.is_pruned(key):
+            print(f"⚠️ 项目依赖已被回收，无法启动开发服务器: {key}", file=sys.stderr)
+            return None
+        with file_lock(self.lock_path):
+            registry = self._load()
+            entry = registry.get(key)
+            if entry:
+                entry['last_access'] = time.time()
+                self._save(registry)
+                return entry['port']
+
+            while len(registry) >= self.max_servers:
+                self._evict_lru(registry)
+
+            port = self.ports.lease(owner=f"dev-server:{key}")
+            if not port:
+                print("❌ 无法找到可用端口", file=sys.stderr)
+                self._save(registry)
+                return None
+
+            pid = self._spawn(Path(key), port)
+            if not pid:
+                self.ports.release(port)
+                self._save(registry)
+                return None
+            self.ports.assign(port, pid)
+
+            now = time.time()
+            registry[key] = {
+                'project': key,
+                'port': port,
+                'pid': pid,
+                'started_at': now,
+                'last_access': now,
+            }
+            self._save(registry)
+            return port
+
+    def touch(self, project_path) -> bool:
+        """记录一次访问，返回服务器是否仍在运行"""
+        key = self._key(project_path)
+        with file_lock(self.lock_path):
+            registry = self._load()
+            if key not in registry:
+                self._save(registry)
+                return False
+            registry[key]['last_access'] = time.time()
+            self._save(registry)
+            return True
+
+    def stop(self, project_path) -> bool:
+        """停止指定项目的开发服务器"""
+        key = self._key(project_path)
+        with file_lock(self.lock_path):
+            registry = self._load()
+            entry = registry.pop(key, None)
+            if entry:
+                self._kill(entry)
+            self._save(registry)
+            return entry is not None
+
+    def stop_all(self) -> int:
+        with file_lock(self.lock_path):
+            registry = self._load()
+            for entry in registry.values():
+                self._kill(entry)
+            self._save({})
+            return len(registry)
+
+    def reap_idle(self) -> List[str]:
+        """停止空闲超过 idle_ttl 的服务器，返回被回收的项目路径"""
+        reaped = []
+        now = time.time()
+        with file_lock(self.lock_path):
+            registry = self._load()
+            for key, entry in list(registry.items()):
+                if now - entry.get('last_access', 0) > self.idle_ttl:
+                    print(f"🧹 回收空闲开发服务器: {key} (端口 {entry['port']})", file=sys.stderr)
+                    self._kill(entry)
+                    registry.pop(key)
+                    reaped.append(key)
+            self._save(registry)
+        return reaped
+
+    def list_servers(self) -> List[Dict]:
+        with file_lock(self.lock_path):
+            registry = self._load()
+            self._save(registry)
+        return sorted(registry.values(), key=lambda e: e['last_access'], reverse=True)
+
+    def start_reaper(self, interval: int = 60) -> threading.Thread:
+        """启动后台线程定期回收空闲服务器"""
+        def _loop():
+            while not self._reaper_stop.wait(interval):
+                try:
+                    self.reap_idle()
+                except Exception as e:
+                    print(f"⚠️ 回收空闲服务器失败: {e}", file=sys.stderr)
+
+        thread = threading.Thread(target=_loop, name="dev-server-reaper", daemon=True)
+        thread.start()
+        return thread
+
+    def stop_reaper(self):
+        self._reaper_stop.set()
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _evict_lru(self, registry: Dict[str, Dict]):
+        key, entry = min(registry.items(), key=lambda item: item[1].get('last_access', 0))
+        print(f"♻️ 达到开发服务器上限 ({self.max_servers})，淘汰最久未访问的: {key}", file=sys.stderr)
+        self._kill(entry)
+        registry.pop(key)
+
+    def _spawn(self, project_path: Path, port: int) -> Optional[int]:
+        env = os.environ.copy()
+        env['PORT'] = str(port)
+        try:
+            with open(project_path / '.dev_server.log', 'w') as log:
+                proc = subprocess.Popen(
+                    ['npm', 'run', 'dev', '--', '-p', str(port)],
+                    cwd=str(project_path),
+                    env=env,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
+        except Exception as e:
+            print(f"❌ 启动开发服务器失败: {e}", file=sys.stderr)
+            return None
+
+        with _children_lock:
+            _children[proc.pid] = proc
+        with open(project_path / '.dev_server.pid', 'w') as f:
+            f.write(str(proc.pid))
+        print(f"🚀 Dev server started for {project_path.name} on port {port} (PID: {proc.pid})", file=sys.stderr)
+        return proc.pid
+
+    def _kill(self, entry: Dict, grace_sec: float = 5):
+        """终止整个进程组（npm -> next dev -> 子进程）"""
+        pid = entry.get('pid')
+        if not pid:
+            return
+        try:
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                return
+            deadline = time.time() + grace_sec
+            while time.time() < deadline:
+                _reap_children()
+                if not pid_alive(pid):
+                    break
+                time.sleep(0.1)
+            if pid_alive(pid):
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+        finally:
+            # 服务器已经退出（killpg 抛出 ProcessLookupError）时同样要清理
+            self._cleanup(entry)
+
+    def _cleanup(self, entry: Dict):
+        """释放已停止服务器的端口租约，删除仍指向它的 .dev_server.pid"""
+        pid = entry.get('pid')
+        self.ports.release(entry.get('port'), pid=pid)
+        pid_file = Path(entry['project']) / '.dev_server.pid'
+        try:
+            if pid_file.read_text().strip() == str(pid):
+                pid_file.unlink()
+        except (OSError, ValueError):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="开发服务器管理器")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出运行中的开发服务器")
+    start = sub.add_parser("start", help="启动（或复用）项目的开发服务器")
+    start.add_argument("project_path")
+    stop = sub.add_parser("stop", help="停止项目的开发服务器")
+    stop.add_argument("project_path")
+    sub.add_parser("stop-all", help="停止所有开发服务器")
+    sub.add_parser("reap", help="回收空闲超时的开发服务器")
+    args = parser.parse_args()
+
+    supervisor = DevServerSupervisor()
+    if args.command == "list":
+        now = time.time()
+        for entry in supervisor.list_servers():
+            idle = int(now - entry['last_access'])
+            print(f"{entry['port']:>5}  PID {entry['pid']:<8} 空闲 {idle}s  {entry['project']}")
+    elif args.command == "start":
+        if supervisor.is_pruned(args.project_path):
+            print("❌ 项目的 node_modules 已被回收，请先运行 npm ci")
+            sys.exit(1)
+        port = supervisor.ensure(args.project_path)
+        print(f"http://localhost:{port}" if port else "❌ 启动失败")
+    elif args.command == "stop":
+        print("✅ 已停止" if supervisor.stop(args.project_path) else "ℹ️ 没有运行中的服务器")
+    elif args.command == "stop-all":
+        print(f"✅ 已停止 {supervisor.stop_all()} 个服务器")
+    elif args.command == "reap":
+        print(f"✅ 回收了 {len(supervisor.reap_idle())} 个服务器")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+导出索引 - 标识符 -> 模块，用于自动补全生成代码中缺失的导入
+
+生成的代码经常用了组件却漏写 import（shadcn 组件、lucide 图标、recharts、framer-motion），
+以前的修复只认识 5 个 shadcn 组件和 50 个图标，其余的缺失导入只能让构建失败、重新调用 v0。
+这里为每个模板建一次索引：
+
+    components/ui/*.tsx        -> @/components/ui/<文件名>
+    lucide-react / recharts / framer-motion 的类型声明入口 (.d.ts) -> 包名
+
+索引按模板指纹缓存在 export_index/<指纹>.json，同一模板的所有项目共用；
+响应生成的 components/ui 文件不进入共享索引，加载时按项目叠加。
+只收录值导出（组件、函数、常量），不收录 type / interface。
+同名导出时项目自己的 ui 组件优先，其次按 INDEXED_PACKAGES 的顺序。
+
+用法:
+    python export_index.py <项目目录>                 # 构建并显示统计
+    python export_index.py <项目目录> --lookup Zap    # 查询标识符
+    python export_index.py --check                    # 验证同一模板的第二个项目直接加载缓存的索引
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from build_cache import template_fingerprint, generated_paths, write_sample_project
+
+DEFAULT_INDEX_DIR = Path(os.environ.get('V0_EXPORT_INDEX_DIR', Path(__file__).parent / "export_index"))
+INDEX_VERSION = 2
+
+# 同名导出时的优先级：项目 ui 组件 > framer-motion > recharts > lucide-react
+INDEXED_PACKAGES = ('framer-motion', 'recharts', 'lucide-react')
+UI_DIR = Path('components') / 'ui'
+# 常见的默认导出组件：生成的代码经常直接写 <Image> / <Link> 而忘记导入
+DEFAULT_IMPORTS = {
+    'Image': 'next/image',
+    'Link': 'next/link',
+    'Script': 'next/script',
+}
+# 跟随 export * from './x' 的最大深度
+MAX_REEXPORT_DEPTH = 4
+
+_EXPORT_LIST_RE = re.compile(r"\bexport\s+(type\s+)?\{([^}]*)\}(?:\s*from\s*['\"]([^'\"]+)['\"])?")
+_EXPORT_DECL_RE = re.compile(
+    r"^\s*export\s+(?:declare\s+)?(?:default\s+)?(?:async\s+)?"
+    r"(const|let|var|function\*?|class|abstract\s+class|enum|interface|type|namespace)\s+([A-Za-z_$][\w$]*)",
+    re.MULTILINE,
+)
+_EXPORT_STAR_RE = re.compile(r"\bexport\s+\*\s+from\s*['\"](\.{1,2}/[^'\"]+)['\"]")
+_COMMENT_RE = re.compile(r"/\*.*?\*/|//[^\n]*", re.DOTALL)
+_TYPE_KINDS = {'interface', 'type'}
+
+
+def parse_exports(source: str) -> Set[str]:
+    """从 TS/TSX/.d.ts 源码中提取值导出的名字"""
+    source = _COMMENT_RE.sub('', source)
+    names = set()
+    for type_only, items, _ in _EXPORT_LIST_RE.findall(source):
+        if type_only:
+            continue
+        for item in items.split(','):
+            item = item.strip()
+            if not item or item.startswith('type '):
+                continue
+            # a as b -> b；default as X -> X
+            exported = item.split(' as ')[-1].strip()
+            if exported != 'default' and re.fullmatch(r"[A-Za-z_$][\w$]*", exported):
+                names.add(exported)
+    for kind, name in _EXPORT_DECL_RE.findall(source):
+        if kind not in _TYPE_KINDS:
+            names.add(name)
+    return names
+
+
+def _resolve_relative(base: Path, spec: str) -> Optional[Path]:
+    target = (base.parent / spec)
+    for candidate in (target, target.with_name(target.name + '.d.ts'), target / 'index.d.ts',
+                      target.with_suffix('.d.ts')):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _parse_declaration_file(path: Path, depth: int = 0, seen: Optional[Set[Path]] = None) -> Set[str]:
+    """解析 .d.ts，跟随相对路径的 export * from"""
+    seen = seen if seen is not None else set()
+    if path in seen or depth > MAX_REEXPORT_DEPTH:
+        return set()
+    seen.add(path)
+    try:
+        source = path.read_text(encoding='utf-8')
+    except OSError:
+        return set()
+    names = parse_exports(source)
+    for spec in _EXPORT_STAR_RE.findall(source):
+        target = _resolve_relative(path, spec)
+        if target:
+            names |= _parse_declaration_file(target, depth + 1, seen)
+    return names
+
+
+def _types_entry(value) -> Optional[str]:
+    """从 package.json 的 exports 条件中找出 types 入口"""
+    if isinstance(value, str):
+        return value if value.endswith('.d.ts') else None
+    if isinstance(value, dict):
+        if isinstance(value.get('types'), str):
+            return value['types']
+        for key in ('import', 'require', 'default'):
+            found = _types_entry(value.get(key))
+            if found:
+                return found
+    return None
+
+
+def package_types_entry(package_dir: Path) -> Optional[Path]:
+    """包的类型声明入口：types / typings / exports["."].types / index.d.ts"""
+    try:
+        with open(package_dir / 'package.json', 'r', encoding='utf-8') as f:
+            pkg = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    exports = pkg.get('exports')
+    candidates = [
+        pkg.get('types'),
+        pkg.get('typings'),
+        _types_entry(exports.get('.')) if isinstance(exports, dict) else None,
+        'index.d.ts',
+    ]
+    for candidate in candidates:
+        if candidate and (package_dir / candidate).is_file():
+            return package_dir / candidate
+    return None
+
+
+class ExportIndex:
+    def __init__(self, exports: Dict[str, str], sources: Optional[Dict[str, int]] = None):
+        self.exports = exports
+        self.sources = sources or {}
+
+    def resolve(self, name: str) -> Optional[str]:
+        """具名导出所在的模块"""
+        return self.exports.get(name)
+
+    @staticmethod
+    def default_import(name: str) -> Optional[str]:
+        """应以默认导入方式引入的模块（优先于具名导出）"""
+        return DEFAULT_IMPORTS.get(name)
+
+    def __len__(self) -> int:
+        return len(self.exports)
+
+    @staticmethod
+    def _ui_exports(project_path: Path, rel_paths: Iterable[str]) -> Dict[str, str]:
+        exports: Dict[str, str] = {}
+        for rel in sorted(rel_paths):
+            path = project_path / rel
+            module = f"@/components/ui/{path.name.split('.')[0]}"
+            exports.update(dict.fromkeys(parse_exports(path.read_text(encoding='utf-8')), module))
+        return exports
+
+    def with_generated_ui(self, project_path: Path, rel_paths: Iterable[str]) -> 'ExportIndex':
+        """叠加项目自己生成的 ui 组件（优先级最高），返回新的索引"""
+        overlay = self._ui_exports(Path(project_path), rel_paths)
+        if not overlay:
+            return self
+        return ExportIndex({**self.exports, **overlay}, self.sources)
+
+    @classmethod
+    def build(cls, project_path: Path, packages: Iterable[str] = INDEXED_PACKAGES,
+              exclude: Iterable[str] = ()) -> 'ExportIndex':
+        """exclude: 不收录的 ui 文件（相对路径），即响应生成的文件"""
+        project_path = Path(project_path)
+        exports: Dict[str, str] = {}
+        sources: Dict[str, int] = {}
+
+        # 优先级低的先写入，高的覆盖
+        for package in reversed(tuple(packages)):
+            entry = package_types_entry(project_path / 'node_modules' / package)
+            if entry is None:
+                continue
+            names = _parse_declaration_file(entry)
+            sources[package] = len(names)
+            exports.update(dict.fromkeys(names, package))
+
+        ui_dir = project_path / UI_DIR
+        excluded = set(exclude)
+        ui_files = [path.relative_to(project_path).as_posix()
+                    for path in (sorted(ui_dir.glob('*.ts*')) if ui_dir.is_dir() else [])]
+        ui_exports = cls._ui_exports(project_path, [rel for rel in ui_files if rel not in excluded])
+        exports.update(ui_exports)
+        sources['components/ui'] = len(ui_exports)
+        return cls(exports, sources)
+
+    def to_json(self) -> Dict:
+        return {'version': INDEX_VERSION, 'sources': self.sources, 'exports': self.exports}
+
+
+_memory_cache: Dict[str, ExportIndex] = {}
+_memory_lock = threading.Lock()
+
+
+def load_export_index(project_path: Path, index_dir: Optional[Path] = None) -> ExportIndex:
+    """项目所属模板的导出索引：进程内缓存 -> 磁盘缓存 -> 重新构建"""
+    project_path = Path(project_path)
+    index_dir = Path(index_dir or DEFAULT_INDEX_DIR)
+    # node_modules 中的包版本由 package.json 决定，已包含在模板指纹中
+    fingerprint = template_fingerprint(project_path)[:16]
+    generated = generated_paths(project_path)
+    generated_ui = [rel for rel in generated
+                    if rel.startswith(f"{UI_DIR.as_posix()}/") and (project_path / rel).is_file()]
+    has_node_modules = (project_path / 'node_modules').is_dir()
+    memory_key = f"{fingerprint}:{int(has_node_modules)}"
+    with _memory_lock:
+        if memory_key in _memory_cache:
+            return _memory_cache[memory_key].with_generated_ui(project_path, generated_ui)
+
+    cache_path = index_dir / f"{fingerprint}.json"
+    index = None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == INDEX_VERSION:
+            index = ExportIndex(data['exports'], data.get('sources'))
+    except (OSError, json.JSONDecodeError, KeyError):
+        pass
+    if index is None:
+        index = ExportIndex.build(project_path, exclude=generated)
+        # node_modules 还没安装时不写磁盘缓存，安装后重新构建
+        if has_node_modules:
+            index_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index.to_json(), f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+    with _memory_lock:
+        _memory_cache[memory_key] = index
+    return index.with_generated_ui(project_path, generated_ui)
+
+
+def self_check() -> bool:
+    """同一模板、项目名不同的两个项目共用一份磁盘索引
+
+    第一个项目的 node_modules 中有 lucide-react，第二个项目的 node_modules 是空的：
+    第二个项目仍能解析 Zap，说明索引来自第一个项目写下的缓存而不是重新构建
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        index_dir = tmp / 'export_index'
+        first = write_sample_project(tmp / 'chemistry_project_a', 'chemistry_project_a')
+        lucide = first / 'node_modules' / 'lucide-react'
+        lucide.mkdir(parents=True)
+        (lucide / 'package.json').write_text(json.dumps({'name': 'lucide-react', 'types': 'index.d.ts'}), encoding='utf-8')
+        (lucide / 'index.d.ts').write_text('export declare const Zap: LucideIcon;\n', encoding='utf-8')
+        second = write_sample_project(tmp / 'job_42', 'job_42')
+        (second / 'node_modules').mkdir()
+
+        first_index = load_export_index(first, index_dir)
+        with _memory_lock:
+            _memory_cache.clear()  # 模拟另一个进程，只能命中磁盘缓存
+        second_index = load_export_index(second, index_dir)
+        cached_files = [path.name for path in index_dir.glob('*.json')]
+
+    checks = (
+        (first_index.resolve('Zap') == 'lucide-react', '第一个项目构建出索引'),
+        (len(cached_files) == 1, f'两个项目共用一个索引文件 ({len(cached_files)} 个)'),
+        (second_index.resolve('Zap') == 'lucide-react', '第二个项目加载了缓存的索引'),
+        (second_index.resolve('Button') == '@/components/ui/button', '模板 ui 组件在索引中'),
+    )
+    for ok, label in checks:
+        print(f"{'✅' if ok else '❌'} {label}")
+    return all(ok for ok, _ in checks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建模板的导出索引（标识符 -> 模块）")
+    parser.add_argument("project_path", nargs="?", help="项目目录")
+    parser.add_argument("--lookup", nargs="*", default=None, help="查询标识符")
+    parser.add_argument("--check", action="store_true", help="自检：同一模板的项目共用缓存的索引")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if self_check() else 1)
+    if not args.project_path:
+        parser.error("需要 project_path")
+    index = load_export_index(Path(args.project_path))
+    if args.lookup:
+        for name in args.lookup:
+            module = index.default_import(name) or index.resolve(name)
+            print(f"{name:<30} {module or '❌ 未找到'}")
+        return
+    print(f"📚 {len(index)} 个导出: " + ', '.join(f"{src} {n}" for src, n in index.sources.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+跨进程文件锁 + JSON 注册表读写
+
+server-example.py 会为每个请求单独启动 v0_api_integration.py，
+因此需要在多个进程之间共享的状态（开发服务器注册表等）都保存在
+JSON 文件中，并通过 fcntl 文件锁串行化读写。
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: 退化为仅进程内加锁
+    fcntl = None
+
+# 同一进程内多个线程共享同一个文件锁时，flock 不会互斥，需要额外的线程锁
+_thread_locks: Dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock_for(path: Path) -> threading.RLock:
+    key = str(path.resolve())
+    with _thread_locks_guard:
+        if key not in _thread_locks:
+            _thread_locks[key] = threading.RLock()
+        return _thread_locks[key]
+
+
+@contextmanager
+def file_lock(lock_path: Path, blocking: bool = True) -> Iterator[bool]:
+    """在 lock_path 上持有排他锁（进程内 + 进程间）
+
+    blocking=False 时不等待，拿不到锁时 yield False
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    thread_lock = _thread_lock_for(lock_path)
+    if not thread_lock.acquire(blocking=blocking):
+        yield False
+        return
+    try:
+        with open(lock_path, 'a+') as f:
+            if fcntl:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
+
+
+def read_json(path: Path, default):
+    """读取 JSON 文件，不存在或损坏时返回 default"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+
+
+def write_json_atomic(path: Path, data) -> None:
+    """先写临时文件再 rename，避免读到写了一半的注册表"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def pid_alive(pid: int) -> bool:
+    """检查进程是否仍在运行
+
+    只用 kill(pid, 0) 探测，不调用 waitpid：回收别人的子进程会让对应 Popen 的 poll()/wait()
+    拿不到真实的退出码。本进程启动的子进程退出后在被回收前仍是僵尸进程（这里会判断为存活），
+    启动方应当通过自己的 Popen（poll()/wait()）回收。
+    """
+    if not pid or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
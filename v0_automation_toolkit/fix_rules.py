@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+生成代码的修复规则引擎
+
+以前的修复散落在构建器的各个方法里（_fix_styled_jsx、_fix_import_conflicts_robust、
+_fix_variable_scope_errors_robust、_remove_duplicate_imports，以及 _post_process_files 中的
+replacements / shadcn_imports / lucide_icons 表），每个文件都要依次跑完所有检查，
+正则每次调用都重新拼接编译。这里：
+
+1. 规则（FixRule）只声明一次：适用的扩展名、触发模式 patterns、触发条件 when、修复函数 transform
+2. 所有规则的触发模式和公共的结构扫描（import 语句、JSX 组件标签）在启动时编译成一个组合正则，
+   每个文件只扫描一遍得到 ScanFacts，再决定哪些规则需要运行
+3. 只有被触发的规则才运行 transform；某条规则修改了内容后才重新扫描，供后面的规则使用
+4. 每条规则记录检查次数、命中次数和耗时
+
+用法:
+    python fix_rules.py <项目目录> [--dry-run]
+
+新增规则：写一个 transform，构造 FixRule 加入 DEFAULT_RULES（顺序即执行顺序）。
+不同规则的 patterns 不要在同一位置开始匹配（组合正则在同一位置只取先声明的分支）。
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import lazy_re
+
+# 扫描源码时跳过的目录
+SKIPPED_SOURCE_DIRS = {'node_modules', '.next', 'out', '.git'}
+
+
+def iter_source_files(project_path: Path, extensions: Iterable[str]) -> List[Path]:
+    """项目中指定扩展名的源码文件，不进入 node_modules、.next 等目录"""
+    extensions = set(extensions)
+    files = []
+    for root, dirs, names in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIPPED_SOURCE_DIRS)
+        files.extend(Path(root) / name for name in sorted(names) if os.path.splitext(name)[1] in extensions)
+    return files
+
+
+# ----------------------------------------------------------------------
+# 公共结构扫描
+# ----------------------------------------------------------------------
+IMPORT_PATTERN = r"""^[ \t]*import\s*\{(?P<import_names>[^}]*)\}\s*from\s*['"](?P<import_module>[^'"]+)['"]"""
+# 组件标签 <Card、成员标签 <motion.div 取 motion
+TAG_PATTERN = r"<\s*(?P<tag>[A-Z]\w*\b|[a-z_$][\w$]*(?=\.))"
+
+
+class ScanFacts:
+    """一次扫描得到的事实：import 列表、使用的组件标签、命中了触发模式的规则"""
+
+    __slots__ = ('imports', 'tags', 'hits')
+
+    def __init__(self):
+        self.imports: List[Tuple[List[str], str]] = []
+        self.tags: Set[str] = set()
+        self.hits: Set[str] = set()
+
+    def imported_names(self, module: Optional[str] = None) -> Set[str]:
+        return {name for names, mod in self.imports if module is None or mod == module for name in names}
+
+
+class FixRule:
+    """一条修复规则
+
+    patterns:   任意一个匹配即触发（加入组合正则）
+    when:       基于 ScanFacts 的触发条件；与 patterns 是 "或" 的关系
+    transform:  content -> content，只在触发时调用；
+                uses_context=True 时为 (content, context) -> content，context 由调用方提供（如导出索引）
+    """
+
+    def __init__(self, name: str, transform: Callable[[str], str], extensions: Iterable[str] = ('.ts', '.tsx'),
+                 patterns: Iterable[str] = (), when: Optional[Callable[[ScanFacts], bool]] = None,
+                 description: str = '', uses_context: bool = False):
+        self.name = name
+        self.transform = transform
+        self.extensions = frozenset(extensions)
+        self.patterns = tuple(patterns)
+        self.when = when
+        self.description = description
+        self.uses_context = uses_context
+
+    def triggered(self, facts: ScanFacts) -> bool:
+        return self.name in facts.hits or bool(self.when and self.when(facts))
+
+
+# ----------------------------------------------------------------------
+# 规则实现
+# ----------------------------------------------------------------------
+def _insert_after_imports(content: str, line: str) -> str:
+    """把一行插入到最后一个 import 之后（没有 import 时插入到 "use client" 指令之后或文件开头）"""
+    lines = content.splitlines()
+    insert_idx = 0
+    for i, existing in enumerate(lines):
+        stripped = existing.strip()
+        if stripped.startswith('import '):
+            insert_idx = i + 1
+        elif not insert_idx and stripped.strip('\'";') in ('use client', 'use server'):
+            insert_idx = i + 1
+    lines.insert(insert_idx, line)
+    return "\n".join(lines) + ("\n" if not content.endswith("\n") else "")
+
+
+def _normalize_module(module: str) -> str:
+    """相对路径的 ui 组件与 @/components/ui/ 视为同一个模块"""
+    if module.startswith(('../', './')) and 'ui/' in module:
+        return f"@/components/ui/{module.split('ui/')[-1]}"
+    return module
+
+
+def _has_duplicate_imports(facts: ScanFacts) -> bool:
+    seen = set()
+    for names, module in facts.imports:
+        module = _normalize_module(module)
+        for name in names:
+            if (name, module) in seen:
+                return True
+            seen.add((name, module))
+    return False
+
+
+_SINGLE_LINE_IMPORT_RE = lazy_re.compile(r'import\s*\{([^}]+)\}\s*from\s*[\'"]([^\'"]+)[\'"]')
+
+
+def remove_duplicate_imports(content: str) -> str:
+    """移除重复的导入语句"""
+    lines = content.splitlines()
+    import_lines = []
+    other_lines = []
+    seen_imports = set()
+    seen_line_keys = set()
+    duplicates_found = False
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('import ') and ' from ' in stripped:
+            import_match = _SINGLE_LINE_IMPORT_RE.match(stripped)
+            if import_match:
+                components = set(c.strip() for c in import_match.group(1).split(','))
+                normalized_path = _normalize_module(import_match.group(2))
+                for component in components:
+                    import_key = f"{component.strip()}:{normalized_path}"
+                    if import_key in seen_imports:
+                        duplicates_found = True
+                        continue
+                    seen_imports.add(import_key)
+
+                # 整行重复时跳过
+                line_key = f"{sorted(components)}:{normalized_path}"
+                if line_key not in seen_line_keys:
+                    seen_line_keys.add(line_key)
+                    import_lines.append(line)
+                else:
+                    duplicates_found = True
+            else:
+                import_lines.append(line)
+        else:
+            other_lines.append(line)
+
+    if duplicates_found:
+        return '\n'.join(import_lines + other_lines)
+    return content
+
+
+# 常见的JSX标签修复
+JSX_REPLACEMENTS = {
+    '</Title>': '</CardTitle>',
+}
+
+
+def fix_jsx_replacements(content: str) -> str:
+    for old, new in JSX_REPLACEMENTS.items():
+        content = content.replace(old, new)
+    return content
+
+
+# 需要自动注入的 shadcn-ui 组件导入
+SHADCN_IMPORTS = [
+    {
+        'name': 'alert',
+        'tags': ['Alert', 'AlertTitle', 'AlertDescription'],
+        'import_line': 'import { Alert, AlertTitle, AlertDescription } from "@/components/ui/alert";'
+    },
+    {
+        'name': 'button',
+        'tags': ['Button'],
+        'import_line': 'import { Button } from "@/components/ui/button";'
+    },
+    {
+        'name': 'card',
+        'tags': ['Card', 'CardHeader', 'CardTitle', 'CardDescription', 'CardContent', 'CardFooter'],
+        'import_line': 'import { Card, CardHeader, CardTitle, CardDescription, CardContent, CardFooter } from "@/components/ui/card";'
+    },
+    {
+        'name': 'tooltip',
+        'tags': ['Tooltip', 'TooltipContent', 'TooltipTrigger', 'TooltipProvider'],
+        'import_line': 'import { Tooltip, TooltipContent, TooltipTrigger, TooltipProvider } from "@/components/ui/tooltip";'
+    },
+    {
+        'name': 'dialog',
+        'tags': ['Dialog', 'DialogContent', 'DialogHeader', 'DialogTitle', 'DialogDescription', 'DialogFooter', 'DialogTrigger', 'DialogClose'],
+        'import_line': 'import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription, DialogFooter, DialogTrigger, DialogClose } from "@/components/ui/dialog";'
+    },
+]
+_SHADCN_TAGS = {tag for spec in SHADCN_IMPORTS for tag in spec['tags']}
+
+
+def _compile_shadcn_spec(spec: Dict) -> Dict:
+    tags = '|'.join(spec['tags'])
+    name = re.escape(spec['name'])
+    # import { Button } / { Button, ... } / {..., Button, ...} from "...button" / ".../ui/button" / "../ui/button"
+    import_re = lazy_re.compile(
+        rf"import\s*\{{[^}}]*\b(?:{tags})\b[^}}]*\}}\s*from\s*['\"](?:[^'\"]*(?:ui/)?{name}|\.\.?/.*ui/{name})['\"]",
+        re.MULTILINE,
+    )
+    return dict(spec, usage_re=lazy_re.compile(rf"<\s*(?:{tags})\b"), import_re=import_re)
+
+
+_SHADCN_COMPILED = [_compile_shadcn_spec(spec) for spec in SHADCN_IMPORTS]
+
+
+def inject_shadcn_imports(content: str) -> str:
+    """使用了 shadcn-ui 组件标签但完全没有相关导入时，注入导入语句"""
+    declared = None
+    for spec in _SHADCN_COMPILED:
+        if spec['usage_re'].search(content) and not spec['import_re'].search(content):
+            # 组件自己的定义文件（components/ui/tooltip.tsx 中使用 <TooltipProvider>）不能导入自己
+            declared = _declared_names(content) if declared is None else declared
+            if declared.intersection(spec['tags']):
+                continue
+            content = _insert_after_imports(content, spec['import_line'])
+    return content
+
+
+# 常见的 lucide-react 图标自动导入（解决 BrainCircuit 等图标缺失问题）
+LUCIDE_ICONS = [
+    'ArrowRight', 'CheckCircle', 'Lightbulb', 'Microscope', 'Scale', 'Target', 'GraduationCap',
+    'BrainCircuit', 'Beaker', 'FlaskConical', 'TestTube', 'BookOpen', 'Calculator', 'ChevronDown',
+    'ChevronRight', 'Info', 'AlertCircle', 'Check', 'X', 'Plus', 'Minus', 'Star', 'Heart',
+    'Eye', 'EyeOff', 'Search', 'Filter', 'Settings', 'Menu', 'Home', 'User', 'Mail', 'Phone',
+    'Calendar', 'Clock', 'MapPin', 'Edit', 'Trash', 'Download', 'Upload', 'Share', 'Copy',
+    'ExternalLink', 'Zap', 'Cpu', 'Database', 'Server', 'Code', 'Terminal', 'Globe'
+]
+_LUCIDE_SET = frozenset(LUCIDE_ICONS)
+_LUCIDE_ALT = '|'.join(sorted(LUCIDE_ICONS, key=len, reverse=True))
+# 图标的非标签用法：BrainCircuit className / const icon = BrainCircuit
+LUCIDE_REF_PATTERNS = (
+    rf"\b(?:{_LUCIDE_ALT})\s*className",
+    rf"const\s+\w+\s*=\s*(?:{_LUCIDE_ALT})\b",
+)
+_LUCIDE_USAGE_RE = lazy_re.compile(
+    rf"<\s*(?P<a>{_LUCIDE_ALT})\b|\b(?P<b>{_LUCIDE_ALT})\s*className|const\s+\w+\s*=\s*(?P<c>{_LUCIDE_ALT})\b"
+)
+_NAMED_IMPORT_RE = lazy_re.compile(r'import\s*\{([^}]*)\}\s*from\s*[\'"][^\'"]*[\'"]')
+_LUCIDE_IMPORT_RE = lazy_re.compile(r"import\s*\{([^}]*)\}\s*from\s*['\"]lucide-react['\"]")
+
+
+def inject_lucide_imports(content: str) -> str:
+    """补全使用了但没有导入的 lucide-react 图标"""
+    used = set()
+    for match in _LUCIDE_USAGE_RE.finditer(content):
+        used.add(match.group('a') or match.group('b') or match.group('c'))
+    used_icons = [icon for icon in LUCIDE_ICONS if icon in used]
+    if not used_icons:
+        return content
+
+    # 无论从哪里导入的都算已导入
+    imported = set()
+    for names in _NAMED_IMPORT_RE.findall(content):
+        imported.update(name.strip() for name in names.split(','))
+    missing = [icon for icon in used_icons if icon not in imported]
+    if not missing:
+        print(f"    ℹ️ 图标已存在导入，跳过: {', '.join(used_icons)}")
+        return content
+
+    lucide_match = _LUCIDE_IMPORT_RE.search(content)
+    if lucide_match:
+        existing = [imp.strip() for imp in lucide_match.group(1).split(',')]
+        new_import_line = f"import {{ {', '.join(existing + missing)} }} from 'lucide-react';"
+        print(f"    ✅ 添加缺失的 lucide 图标: {', '.join(missing)}")
+        return content.replace(lucide_match.group(0), new_import_line)
+    print(f"    ✅ 自动添加 lucide-react 导入: {', '.join(missing)}")
+    return _insert_after_imports(content, f"import {{ {', '.join(missing)} }} from 'lucide-react';")
+
+
+# styled-jsx 自定义动画到 Tailwind 内置动画
+STYLED_JSX_ANIMATIONS = {
+    # 气泡动画替换为 Tailwind 内置动画
+    'animate-bubble-up-1': 'animate-bounce',
+    'animate-bubble-up-2': 'animate-pulse',
+    'animate-bubble-up-3': 'animate-ping',
+    'animate-bubble-up': 'animate-bounce',
+    # 其他常见自定义动画
+    'animate-fade-in': 'animate-pulse',
+    'animate-slide-up': 'animate-bounce',
+    'animate-float': 'animate-pulse',
+}
+_STYLE_JSX_BLOCK_RE = lazy_re.compile(r'<style jsx>\{`[^`]*`\}</style>', re.DOTALL)
+_BLANK_LINES_RE = lazy_re.compile(r'\n\s*\n\s*\n')
+_TRAILING_DIV_RE = lazy_re.compile(r'</div>\s*\n\s*\);')
+
+
+def fix_styled_jsx(content: str) -> str:
+    """移除 <style jsx> 块，自定义动画类名替换为 Tailwind 内置动画"""
+    content = _STYLE_JSX_BLOCK_RE.sub('', content)
+    for custom_class, tailwind_class in STYLED_JSX_ANIMATIONS.items():
+        content = content.replace(custom_class, tailwind_class)
+    content = _BLANK_LINES_RE.sub('\n\n', content)
+    content = _TRAILING_DIV_RE.sub('</div>\n);', content)
+    return content
+
+
+_RECHARTS_TOOLTIP_IMPORT_RE = lazy_re.compile(r'import\s*\{[^}]*\bTooltip\b[^}]*\}\s*from\s*[\'"]recharts[\'"];')
+_UI_TOOLTIP_IMPORT_RE = lazy_re.compile(r'import\s*\{[^}]*\bTooltip\b[^}]*\}\s*from\s*["\']@/components/ui/tooltip["\'];')
+_IMPORT_NAMES_RE = lazy_re.compile(r'import\s*\{\s*([^}]+)\s*\}')
+_CHART_TOOLTIP_USAGES = (
+    (lazy_re.compile(r'<Tooltip\s+formatter='), '<RechartsTooltip formatter='),
+    (lazy_re.compile(r'<Tooltip\s*/>'), '<RechartsTooltip />'),
+)
+
+
+def _has_tooltip_conflict(facts: ScanFacts) -> bool:
+    return 'Tooltip' in facts.imported_names('recharts') and 'Tooltip' in facts.imported_names('@/components/ui/tooltip')
+
+
+def fix_tooltip_conflict(content: str) -> str:
+    """recharts 和 ui/tooltip 同时导入 Tooltip 时加别名，图表中的 Tooltip 改用 RechartsTooltip"""
+    recharts_import = _RECHARTS_TOOLTIP_IMPORT_RE.search(content)
+    ui_tooltip_import = _UI_TOOLTIP_IMPORT_RE.search(content)
+    if not (recharts_import and ui_tooltip_import):
+        return content
+    print("    - 检测到Tooltip导入冲突，正在自动修复...")
+
+    recharts_line = recharts_import.group(0)
+    content = content.replace(recharts_line, recharts_line.replace('Tooltip', 'Tooltip as RechartsTooltip'))
+
+    # { Tooltip, TooltipContent } -> { Tooltip as UITooltip, TooltipContent as UITooltipContent }
+    ui_line = ui_tooltip_import.group(0)
+    import_match = _IMPORT_NAMES_RE.search(ui_line)
+    if import_match:
+        new_imports = []
+        for imp in (imp.strip() for imp in import_match.group(1).split(',')):
+            new_imports.append(imp if ' as ' in imp else f"{imp} as UI{imp}")
+        content = content.replace(ui_line, f"import {{ {', '.join(new_imports)} }} from \"@/components/ui/tooltip\";")
+
+    # 只更新图表中的 Tooltip
+    if 'LineChart' in content or 'BarChart' in content:
+        for pattern, replacement in _CHART_TOOLTIP_USAGES:
+            content = pattern.sub(replacement, content)
+        content = content.replace('<Tooltip>', '<RechartsTooltip>').replace('</Tooltip>', '</RechartsTooltip>')
+    return content
+
+
+# JSX 中使用的标识符：<Card / <motion.div；排除泛型 useState<Point> 和比较 a < B
+_JSX_IDENT_RE = lazy_re.compile(r"(?<![\w$)\].])<([A-Z][\w$]*|[a-z_$][\w$]*(?=\.))(?=[\s/>.])")
+# 作为值传递的图标：icon: Zap / icon={Zap}
+_ICON_VALUE_RE = lazy_re.compile(r"\b[iI]con\s*(?::|=\s*\{)\s*([A-Z][\w$]*)\b")
+_IMPORT_CLAUSE_RE = lazy_re.compile(r"^\s*import\s+(?:type\s+)?([^'\";]+?)\s+from\s*['\"]", re.MULTILINE)
+_LOCAL_DECL_RE = lazy_re.compile(r"\b(?:const|let|var|function\*?|class|enum|interface|type|namespace)\s+([A-Za-z_$][\w$]*)")
+_DESTRUCTURE_RE = lazy_re.compile(r"(?:\b(?:const|let|var)\s*|\(\s*)\{([^{}]*)\}")
+_IDENT_RE = lazy_re.compile(r"[A-Za-z_$][\w$]*")
+
+
+def _binding_names(pattern: str) -> Set[str]:
+    """{ a, b: B, c = 1, ...rest } 中绑定的名字"""
+    names = set()
+    for item in pattern.split(','):
+        item = item.split('=')[0].strip().lstrip('.')
+        if ':' in item:
+            item = item.split(':')[-1].strip()
+        if _IDENT_RE.fullmatch(item):
+            names.add(item)
+    return names
+
+
+def _declared_names(content: str) -> Set[str]:
+    """文件中已经导入或声明的名字"""
+    names = set()
+    for clause in _IMPORT_CLAUSE_RE.findall(content):
+        clause = clause.replace('{', ',').replace('}', ',')
+        for item in clause.split(','):
+            item = item.strip()
+            if item.startswith('type '):
+                item = item[5:]
+            name = item.split(' as ')[-1].strip()
+            if _IDENT_RE.fullmatch(name):
+                names.add(name)
+    names.update(_LOCAL_DECL_RE.findall(content))
+    for pattern in _DESTRUCTURE_RE.findall(content):
+        names |= _binding_names(pattern)
+    return names
+
+
+def _add_named_imports(content: str, module: str, names: List[str]) -> str:
+    """合并到已有的 import { ... } from module，没有时新增一行"""
+    existing = re.search(rf"import\s*\{{([^}}]*)\}}\s*from\s*['\"]{re.escape(module)}['\"]", content)
+    if existing:
+        current = [imp.strip() for imp in existing.group(1).split(',') if imp.strip()]
+        merged = f"import {{ {', '.join(current + names)} }} from \"{module}\""
+        return content.replace(existing.group(0), merged, 1)
+    return _insert_after_imports(content, f"import {{ {', '.join(names)} }} from \"{module}\";")
+
+
+def import_from_index(content: str, names: Iterable[str], index) -> Tuple[str, List[str]]:
+    """为 names 中没有导入或声明的标识符按导出索引补全导入，返回 (新内容, 补全的名字)"""
+    declared = _declared_names(content)
+    named: Dict[str, List[str]] = {}
+    defaults: Dict[str, str] = {}
+    for name in dict.fromkeys(names):
+        if name in declared:
+            continue
+        module = index.default_import(name)
+        if module:
+            defaults[name] = module
+            continue
+        module = index.resolve(name)
+        if module:
+            named.setdefault(module, []).append(name)
+    for name, module in defaults.items():
+        content = _insert_after_imports(content, f"import {name} from \"{module}\";")
+    for module, module_names in named.items():
+        content = _add_named_imports(content, module, module_names)
+    return content, [*defaults, *(n for module_names in named.values() for n in module_names)]
+
+
+def inject_indexed_imports(content: str, context: Dict) -> str:
+    """JSX 中使用但没有导入或声明的标识符，按导出索引补全导入"""
+    index = context.get('export_index')
+    if index is None:
+        return content
+    used = _JSX_IDENT_RE.findall(content) + _ICON_VALUE_RE.findall(content)
+    content, resolved = import_from_index(content, used, index)
+    if resolved:
+        print(f"    ✅ 按导出索引补全导入: {', '.join(resolved)}")
+    return content
+
+
+TRAJECTORY_PATTERN = r'const t_final = \(initialVelocity \* Math\.sin\(toRadians\(angle\)\)'
+_TRAJECTORY_LINE = ('const t_final = (initialVelocity * Math.sin(toRadians(angle)) + Math.sqrt(Math.pow('
+                    'initialVelocity * Math.sin(toRadians(angle)), 2) + 2 * G * initialHeight)) / G;')
+_TRAJECTORY_FIXED = ('const t_final = (state.initialVelocity * Math.sin(toRadians(state.angle)) + Math.sqrt(Math.pow('
+                     'state.initialVelocity * Math.sin(toRadians(state.angle)), 2) + 2 * G * state.initialHeight)) / G;')
+
+
+def fix_trajectory_scope(content: str) -> str:
+    """generateTrajectory 中 t_final 的计算引用了未解构的 state 字段"""
+    if 'generateTrajectory' not in content:
+        return content
+    print("    - 检测到generateTrajectory中的变量作用域错误，正在修复...")
+    return content.replace(_TRAJECTORY_LINE, _TRAJECTORY_FIXED)
+
+
+DEFAULT_RULES = [
+    FixRule('duplicate_imports', remove_duplicate_imports, when=_has_duplicate_imports,
+            description='移除重复导入'),
+    FixRule('jsx_replacements', fix_jsx_replacements, patterns=[re.escape(old) for old in JSX_REPLACEMENTS],
+            description='常见的 JSX 标签替换'),
+    FixRule('auto_imports', inject_indexed_imports, extensions=('.tsx',), uses_context=True,
+            when=lambda facts: bool(facts.tags), description='按导出索引补全缺失导入'),
+    FixRule('shadcn_imports', inject_shadcn_imports, extensions=('.tsx',),
+            when=lambda facts: bool(facts.tags & _SHADCN_TAGS), description='注入 shadcn-ui 组件导入'),
+    FixRule('lucide_imports', inject_lucide_imports, extensions=('.tsx',), patterns=LUCIDE_REF_PATTERNS,
+            when=lambda facts: bool(facts.tags & _LUCIDE_SET), description='注入 lucide-react 图标导入'),
+    FixRule('styled_jsx', fix_styled_jsx, extensions=('.tsx',), patterns=[re.escape('<style jsx>')],
+            description='styled-jsx 转换为 Tailwind'),
+    FixRule('tooltip_conflict', fix_tooltip_conflict, extensions=('.tsx',), when=_has_tooltip_conflict,
+            description='recharts / ui Tooltip 命名冲突'),
+    FixRule('trajectory_scope', fix_trajectory_scope, patterns=[TRAJECTORY_PATTERN],
+            description='generateTrajectory 变量作用域'),
+]
+
+
+# ----------------------------------------------------------------------
+# 引擎
+# ----------------------------------------------------------------------
+class FixEngine:
+    def __init__(self, rules: Optional[List[FixRule]] = None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.extensions = frozenset(ext for rule in self.rules for ext in rule.extensions)
+        # 规则的触发模式放在公共扫描之前，各自是一个命名分组
+        self._group_to_rule: Dict[str, str] = {}
+        branches = []
+        for i, rule in enumerate(self.rules):
+            if rule.patterns:
+                group = f"r{i}"
+                self._group_to_rule[group] = rule.name
+                branches.append(f"(?P<{group}>{'|'.join(f'(?:{p})' for p in rule.patterns)})")
+        branches += [IMPORT_PATTERN, TAG_PATTERN]
+        self._scanner = re.compile('|'.join(branches), re.MULTILINE)
+        self.stats: Dict[str, Dict] = {rule.name: {'checked': 0, 'hits': 0, 'seconds': 0.0} for rule in self.rules}
+        self.scan_stats = {'files': 0, 'scans': 0, 'seconds': 0.0}
+
+    def scan(self, content: str) -> ScanFacts:
+        """一遍扫描收集所有规则需要的事实"""
+        start = time.perf_counter()
+        facts = ScanFacts()
+        for match in self._scanner.finditer(content):
+            group = match.lastgroup
+            if group == 'tag':
+                facts.tags.add(match.group('tag'))
+            elif group == 'import_module':
+                names = [n.strip() for n in match.group('import_names').split(',') if n.strip()]
+                facts.imports.append((names, match.group('import_module')))
+            elif group in self._group_to_rule:
+                facts.hits.add(self._group_to_rule[group])
+        self.scan_stats['scans'] += 1
+        self.scan_stats['seconds'] += time.perf_counter() - start
+        return facts
+
+    def apply(self, content: str, suffix: str, context: Optional[Dict] = None) -> Tuple[str, List[str]]:
+        """对一个文件的内容运行所有适用的规则，返回 (新内容, 生效的规则名)
+
+        context 传给 uses_context 的规则；为 None 时跳过这些规则
+        """
+        if suffix not in self.extensions:
+            return content, []
+        self.scan_stats['files'] += 1
+        facts = self.scan(content)
+        applied = []
+        for rule in self.rules:
+            if suffix not in rule.extensions or (rule.uses_context and context is None):
+                continue
+            if facts is None:
+                facts = self.scan(content)  # 前面的规则改过内容
+            stats = self.stats[rule.name]
+            stats['checked'] += 1
+            if not rule.triggered(facts):
+                continue
+            start = time.perf_counter()
+            updated = rule.transform(content, context) if rule.uses_context else rule.transform(content)
+            stats['seconds'] += time.perf_counter() - start
+            if updated != content:
+                stats['hits'] += 1
+                applied.append(rule.name)
+                content = updated
+                facts = None
+        return content, applied
+
+    def report(self) -> str:
+        lines = [f"扫描 {self.scan_stats['files']} 个文件 ({self.scan_stats['scans']} 次, "
+                 f"{self.scan_stats['seconds'] * 1000:.1f}ms)"]
+        for rule in self.rules:
+            stats = self.stats[rule.name]
+            lines.append(f"{rule.name:<20} 检查 {stats['checked']:>5}  命中 {stats['hits']:>4}  "
+                         f"{stats['seconds'] * 1000:8.1f}ms  {rule.description}")
+        return '\n'.join(lines)
+
+
+_default_engine: Optional[FixEngine] = None
+
+
+def get_engine() -> FixEngine:
+    """进程内共享的默认引擎（规则只编译一次）"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = FixEngine()
+    return _default_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对项目源码运行修复规则并报告各规则的命中次数和耗时")
+    parser.add_argument("project_path", help="项目目录")
+    parser.add_argument("--dry-run", action="store_true", help="只报告，不写回文件")
+    args = parser.parse_args()
+
+    project_path = Path(args.project_path)
+    if not project_path.is_dir():
+        sys.exit(f"❌ 目录不存在: {project_path}")
+    from export_index import load_export_index
+    engine = get_engine()
+    context = {'export_index': load_export_index(project_path)}
+    for filepath in iter_source_files(project_path, engine.extensions):
+        content = filepath.read_text(encoding='utf-8')
+        updated, applied = engine.apply(content, filepath.suffix, context)
+        if applied:
+            print(f"🔧 {filepath.relative_to(project_path)}: {', '.join(applied)}")
+            if not args.dry_run:
+                filepath.write_text(updated, encoding='utf-8')
+    print(engine.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+构建任务队列 (SQLite) - API 前端入队，多个构建 worker 按租约领取
+
+server-example.py 只负责入队和提供导出结果，npm/next 的重活由任意数量的 build_worker.py 进程完成。
+job_queue.db 只由前端所在主机打开：WAL 模式依赖共享内存（-shm 文件的 mmap），不能放在 NFS/SMB 上
+被多台主机同时打开。其他主机上的 worker 通过前端的 /api/worker/* 接口（RemoteJobQueue）领取任务，
+租约协议相同，数据库事务仍在前端本机执行：
+
+1. lease(): 在一个 IMMEDIATE 事务中领取最早的排队任务，或租约已过期的任务
+   （worker 崩溃或失联），同一任务不会同时被两个 worker 持有
+2. worker 定期 heartbeat() 续租；续租失败说明任务已被取消或被别人接管，应立即停止
+3. fail() 未超过 max_attempts 时重新排队，release() 把任务原样放回（worker 正常退出）
+
+状态: queued -> leased -> done / failed / cancelled
+
+远程 worker 设置 V0_JOB_QUEUE_URL（前端地址）和 V0_WORKER_TOKEN（与前端相同的共享密钥）。
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_DB_PATH = Path(os.environ.get('V0_JOB_QUEUE_DB', Path(__file__).parent / "job_queue.db"))
+DEFAULT_LEASE_SEC = 120
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_QUEUE_URL = os.environ.get('V0_JOB_QUEUE_URL')
+DEFAULT_WORKER_TOKEN = os.environ.get('V0_WORKER_TOKEN')
+# 远程调用遇到网络错误时的重试次数和间隔（秒）
+REMOTE_RETRIES = 3
+REMOTE_RETRY_DELAY = 1.0
+
+STATUS_QUEUED = 'queued'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'queued',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    max_attempts    INTEGER NOT NULL DEFAULT 3,
+    worker_id       TEXT,
+    lease_expires   REAL,
+    result          TEXT,
+    error           TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or DEFAULT_DB_PATH)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；WAL 模式允许同一主机上的多个进程同时读写"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @property
+    def location(self) -> str:
+        return str(self.db_path)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    # ------------------------------------------------------------------
+    # 前端
+    # ------------------------------------------------------------------
+    def enqueue(self, problem: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (problem, status, max_attempts, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (problem, STATUS_QUEUED, max_attempts, now, now),
+            )
+            return cursor.lastrowid
+
+    def cancel(self, job_id: int) -> bool:
+        """取消排队中或执行中的任务；执行中的 worker 在下次续租时发现并停止"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires = NULL, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED, STATUS_LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        conn = self._connect()
+        if status:
+            rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit))
+        else:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [self._to_dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row['status']: row['n'] for row in rows}
+
+    # ------------------------------------------------------------------
+    # worker
+    # ------------------------------------------------------------------
+    def lease(self, worker_id: str, lease_sec: float = DEFAULT_LEASE_SEC) -> Optional[Dict]:
+        """领取一个任务，没有可领取的任务时返回 None"""
+        conn = self._connect()
+        while True:
+            now = time.time()
+            with conn:
+                # IMMEDIATE：读取和更新之间不会有其他 worker 插入写事务
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (STATUS_QUEUED, STATUS_LEASED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['attempts'] >= row['max_attempts']:
+                    # 持有它的 worker 已经失联了 max_attempts 次，不再重试
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                        (STATUS_FAILED, row['error'] or 'lease expired', now, row['id']),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (STATUS_LEASED, worker_id, now + lease_sec, now, row['id']),
+                )
+            return self.get(row['id'])
+
+    def _update_leased(self, job_id: int, worker_id: str, sql: str, params: tuple) -> bool:
+        """只在仍由该 worker 持有租约时更新，返回是否成功"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {sql}, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (*params, time.time(), job_id, worker_id, STATUS_LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_sec: float = DEFAULT_LEASE_SEC) -> bool:
+        """续租；返回 False 表示任务已被取消或被其他 worker 接管"""
+        return self._update_leased(job_id, worker_id, "lease_expires = ?", (time.time() + lease_sec,))
+
+    def complete(self, job_id: int, worker_id: str, result: Dict) -> bool:
+        return self._update_leased(job_id, worker_id, "status = ?, result = ?, error = NULL, lease_expires = NULL",
+                                   (STATUS_DONE, json.dumps(result, ensure_ascii=False)))
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """失败：还有重试次数时重新排队"""
+        return self._update_leased(
+            job_id, worker_id,
+            "status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, error = ?, lease_expires = NULL",
+            (STATUS_QUEUED, STATUS_FAILED, error),
+        )
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """worker 退出时把任务放回队列，不计入重试次数"""
+        return self._update_leased(job_id, worker_id, "status = ?, attempts = attempts - 1, lease_expires = NULL",
+                                   (STATUS_QUEUED,))
+
+
+class RemoteJobQueue:
+    """通过前端 HTTP 接口访问队列，只提供 worker 侧的方法，签名与 JobQueue 相同
+
+    网络错误重试 REMOTE_RETRIES 次后抛出 OSError；前端返回的 False 表示租约已失效
+    """
+
+    def __init__(self, url: Optional[str] = None, token: Optional[str] = None, timeout: float = 30):
+        self.url = (url or DEFAULT_QUEUE_URL or '').rstrip('/')
+        self.token = token or DEFAULT_WORKER_TOKEN
+        if not self.url:
+            raise ValueError("需要前端地址（V0_JOB_QUEUE_URL）")
+        if not self.token:
+            raise ValueError("需要 worker 共享密钥（V0_WORKER_TOKEN）")
+        self.timeout = timeout
+
+    @property
+    def location(self) -> str:
+        return self.url
+
+    def _call(self, path: str, payload: Dict) -> Dict:
+        import urllib.error
+        import urllib.request
+
+        request = urllib.request.Request(
+            f"{self.url}/api/worker/{path}",
+            data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+            method='POST',
+            headers={'Content-Type': 'application/json', 'Authorization': f"Bearer {self.token}"},
+        )
+        for attempt in range(REMOTE_RETRIES):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                if e.code < 500 or attempt == REMOTE_RETRIES - 1:
+                    raise  # 401/403 等配置错误不重试
+            except OSError:
+                if attempt == REMOTE_RETRIES - 1:
+                    raise
+            time.sleep(REMOTE_RETRY_DELAY * (attempt + 1))
+
+    def lease(self, worker_id: str, lease_sec: float = DEFAULT_LEASE_SEC) -> Optional[Dict]:
+        return self._call('lease', {'workerId': worker_id, 'leaseSec': lease_sec})['job']
+
+    def _update_leased(self, job_id: int, action: str, payload: Dict) -> bool:
+        return bool(self._call(f"jobs/{job_id}/{action}", payload)['ok'])
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_sec: float = DEFAULT_LEASE_SEC) -> bool:
+        return self._update_leased(job_id, 'heartbeat', {'workerId': worker_id, 'leaseSec': lease_sec})
+
+    def complete(self, job_id: int, worker_id: str, result: Dict) -> bool:
+        return self._update_leased(job_id, 'complete', {'workerId': worker_id, 'result': result})
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        return self._update_leased(job_id, 'fail', {'workerId': worker_id, 'error': error})
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        return self._update_leased(job_id, 'release', {'workerId': worker_id})
+
+
+_default_queue: Optional[JobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    """进程内共享的默认队列"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建任务队列")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="按状态统计任务数")
+    ls = sub.add_parser("list", help="列出最近的任务")
+    ls.add_argument("--status", default=None)
+    ls.add_argument("--limit", type=int, default=20)
+    enqueue = sub.add_parser("enqueue", help="提交任务（问题内容从参数或 stdin 读取）")
+    enqueue.add_argument("problem", nargs="?")
+    cancel = sub.add_parser("cancel", help="取消任务")
+    cancel.add_argument("job_id", type=int)
+    args = parser.parse_args()
+
+    queue = get_queue()
+    if args.command == "stats":
+        print(json.dumps(queue.stats(), ensure_ascii=False))
+    elif args.command == "list":
+        for job in queue.list_jobs(args.status, args.limit):
+            detail = (job['result'] or {}).get('project_url') or job['error'] or ''
+            print(f"{job['id']:>6}  {job['status']:<9} {job['attempts']}/{job['max_attempts']}  "
+                  f"{job['worker_id'] or '-':<24} {detail}")
+    elif args.command == "enqueue":
+        problem = args.problem or sys.stdin.read().strip()
+        if not problem:
+            parser.error("缺少问题内容")
+        print(f"✅ 任务 {queue.enqueue(problem)} 已入队")
+    elif args.command == "cancel":
+        print("✅ 已取消" if queue.cancel(args.job_id) else "❌ 任务不存在或已结束")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+延迟编译的正则 - 模块级的规则表在导入时不编译，第一次使用时才编译
+
+fix_rules 等模块在导入时编译几十个正则（lucide 图标和 shadcn 组件的大分支模式要几毫秒），
+而每个请求都会新启动一次 v0_api_integration.py，很多路径（命中缓存、参数错误、只查状态）
+根本用不到它们。用法与 re.compile 相同：
+
+    _ICON_RE = lazy_re.compile(r"...")
+    _ICON_RE.search(content)      # 第一次调用时编译
+
+编译后 search / sub 等方法直接挂到实例上，之后的调用与 re.Pattern 一样快。
+并发首次使用时可能重复编译一次，结果相同，无需加锁。
+"""
+
+import re
+from typing import Optional
+
+_FORWARDED_METHODS = ('search', 'match', 'fullmatch', 'finditer', 'findall', 'sub', 'subn', 'split')
+
+
+class LazyPattern:
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self._compiled: Optional[re.Pattern] = None
+
+    def compiled(self) -> re.Pattern:
+        if self._compiled is None:
+            compiled = re.compile(self.pattern, self.flags)
+            # 之后的方法调用直接命中实例字典，不再经过 __getattr__
+            for name in _FORWARDED_METHODS:
+                setattr(self, name, getattr(compiled, name))
+            self._compiled = compiled
+        return self._compiled
+
+    def __getattr__(self, name):
+        # 只有实例上没有的属性（编译前的 search 等）才会走到这里
+        if name.startswith('__') or name == '_compiled':
+            raise AttributeError(name)
+        return getattr(self.compiled(), name)
+
+    def __repr__(self) -> str:
+        state = 'compiled' if self._compiled is not None else 'pending'
+        return f"LazyPattern({self.pattern!r}, {state})"
+
+
+def compile(pattern: str, flags: int = 0) -> LazyPattern:
+    return LazyPattern(pattern, flags)
@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+端到端压测 - 回答 "一台机器能同时处理多少个生成任务"
+
+按设定的到达速率向 server-example.py 提交任务，记录每个任务从提交到完成的全过程：
+
+1. 默认在隔离的工作目录中启动整套服务：进程内的 v0 API 替身 (mock_v0_server)、
+   server-example.py 和若干 build_worker.py；队列、目录索引、归档、产物、缓存和项目目录
+   都指向工作目录，不会碰到正式数据
+2. npm / npx 替换为离线桩脚本：create-next-app 生成最小骨架，npm install 只建目录，
+   next build 写出 out/ 并按 --build-cpu 占用 CPU，tsc 直接通过；压测的是调度、队列和
+   Python 侧的开销，不是 npm 本身
+3. 到达过程可选泊松或匀速 (--arrival)，--rate 个/秒，共 --jobs 个或持续 --duration 秒
+4. jobs 模式走 POST /api/jobs + 轮询 GET /api/jobs/<id>，排队等待取第一次观察到 leased 的时刻
+   （精度为轮询间隔）；sync 模式直接请求 /api/v0-generate
+5. 采样线程每 --sample-interval 秒从 /proc 读取服务进程树和 worker 进程树的
+   CPU、RSS、打开的文件描述符，以及队列深度
+6. 报告写成 JSON（吞吐量、端到端延迟 p50/p95/p99、排队等待、资源时间序列），
+   --baseline 与之前的报告逐项对比
+7. --remote-workers 模拟多主机：每个 worker 有自己的数据目录（目录索引、归档、项目、缓存），
+   通过前端的 /api/worker/* 领取任务，只共享产物目录
+
+用法:
+    python load_test.py --rate 0.5 --jobs 20 --workers 2 --output baseline.json
+    python load_test.py --rate 0.5 --jobs 20 --workers 2 --baseline baseline.json
+    python load_test.py --url http://127.0.0.1:5001 --pid 1234 --rate 0.2 --duration 300   # 压测已有的服务
+    python load_test.py --compare baseline.json new.json
+    python load_test.py --rate 0.5 --jobs 10 --workers 3 --remote-workers
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_v0_server import MockConfig, make_server, load_corpus
+from token_budget import percentile
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SERVER_SCRIPT = REPO_ROOT / "server-example.py"
+WORKER_SCRIPT = Path(__file__).resolve().parent / "build_worker.py"
+REPORT_VERSION = 1
+TERMINAL_STATUSES = ('done', 'failed', 'cancelled')
+CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# 与基线对比的指标：(路径, 越小越好)
+COMPARED_METRICS = [
+    ('throughput_per_min', False),
+    ('latency.p50', True),
+    ('latency.p95', True),
+    ('latency.p99', True),
+    ('queue_wait.p50', True),
+    ('queue_wait.p95', True),
+    ('resources.server.cpu_avg', True),
+    ('resources.workers.cpu_avg', True),
+    ('resources.server.rss_max_mb', True),
+    ('resources.workers.rss_max_mb', True),
+    ('resources.server.fds_max', True),
+    ('resources.workers.fds_max', True),
+]
+
+# 离线的 npm / npx：只做构建流程依赖的文件系统操作
+STUB_TOOL = r'''#!{python}
+import os, sys, json, time
+from pathlib import Path
+
+tool = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+time.sleep(float(os.environ.get('V0_STUB_NPM_DELAY', '0')))
+
+def burn(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        sum(i * i for i in range(1000))
+
+if tool == 'npx' and args and args[0].startswith('create-next-app'):
+    root = Path(args[1])
+    (root / 'app').mkdir(parents=True)
+    (root / 'node_modules' / 'next').mkdir(parents=True)
+    (root / 'node_modules' / 'next' / 'package.json').write_text('{{"name": "next", "version": "15.0.0"}}')
+    (root / 'package.json').write_text(json.dumps({{
+        'name': root.name, 'version': '0.1.0', 'private': True,
+        'scripts': {{'dev': 'next dev', 'build': 'next build', 'start': 'next start'}},
+        'dependencies': {{'next': '15.0.0', 'react': '19.0.0', 'react-dom': '19.0.0'}},
+        'devDependencies': {{'typescript': '^5', 'tailwindcss': '^4', '@tailwindcss/postcss': '^4'}},
+    }}, indent=2))
+    (root / 'tsconfig.json').write_text(json.dumps({{'compilerOptions': {{'strict': True, 'paths': {{'@/*': ['./*']}}}}}}))
+    (root / 'next-env.d.ts').write_text('/// <reference types="next" />\n')
+    (root / 'next.config.ts').write_text('const nextConfig = {{}};\nexport default nextConfig;\n')
+    (root / 'app' / 'globals.css').write_text('@import "tailwindcss";\n')
+    (root / 'app' / 'layout.tsx').write_text('export default function RootLayout({{ children }}: {{ children: React.ReactNode }}) {{\n  return <html><body>{{children}}</body></html>;\n}}\n')
+    (root / 'app' / 'page.tsx').write_text('export default function Home() {{\n  return <main />;\n}}\n')
+elif tool == 'npm' and args[:1] == ['install']:
+    for package in args[1:]:
+        if not package.startswith('-'):
+            name = '@' + package[1:].split('@')[0] if package.startswith('@') else package.split('@')[0]
+            (Path('node_modules') / name).mkdir(parents=True, exist_ok=True)
+elif tool == 'npm' and args[:2] == ['run', 'dev']:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+    class Page(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'<html></html>')
+
+        def log_message(self, *args):
+            pass
+
+    port = int(args[args.index('-p') + 1]) if '-p' in args else int(os.environ.get('PORT', 3000))
+    server = HTTPServer(('127.0.0.1', port), Page)
+    print(f"  - Local: http://localhost:{{port}}", flush=True)
+    server.serve_forever()
+elif tool == 'npx' and args[:2] == ['next', 'build']:
+    burn(float(os.environ.get('V0_STUB_BUILD_CPU', '0')))
+    out = Path('out')
+    (out / '_next' / 'static').mkdir(parents=True, exist_ok=True)
+    (out / 'index.html').write_text('<!DOCTYPE html><html><body>' + 'x' * 4096 + '</body></html>')
+    (out / '_next' / 'static' / 'main.js').write_text('console.log(1);' * 512)
+print(f"[stub] {{tool}} {{' '.join(args)}}")
+'''
+
+
+def write_stub_toolchain(bin_dir: Path) -> Path:
+    """在 bin_dir 中写入 npm / npx 桩脚本，返回 bin_dir"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for tool in ('npm', 'npx'):
+        path = bin_dir / tool
+        path.write_text(STUB_TOOL.format(python=sys.executable), encoding='utf-8')
+        path.chmod(0o755)
+    return bin_dir
+
+
+# ----------------------------------------------------------------------
+# 资源采样
+# ----------------------------------------------------------------------
+def _read_proc_table() -> Dict[int, Dict]:
+    """所有进程的 {pid: {'ppid', 'ticks', 'rss'}}"""
+    table = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # comm 可能包含空格和括号，从最后一个 ')' 之后开始解析
+                fields = f.read().rsplit(')', 1)[1].split()
+            table[int(entry)] = {
+                'ppid': int(fields[1]),
+                # utime + stime + cutime + cstime：已退出的子进程（npm、tsc 等）的 CPU 计入父进程
+                'ticks': sum(int(v) for v in fields[11:15]),
+                'rss': int(fields[21]) * PAGE_SIZE,
+            }
+        except (OSError, IndexError, ValueError):
+            continue
+    return table
+
+
+def _tree(table: Dict[int, Dict], roots: List[int], exclude=()) -> List[int]:
+    """roots 及其所有后代；exclude 中的进程（属于其他组）连同后代一起跳过"""
+    children: Dict[int, List[int]] = {}
+    for pid, info in table.items():
+        children.setdefault(info['ppid'], []).append(pid)
+    pids, stack = [], [pid for pid in roots if pid in table]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(child for child in children.get(pid, []) if child not in exclude)
+    return pids
+
+
+def _open_fds(pid: int) -> int:
+    try:
+        return len(os.listdir(f'/proc/{pid}/fd'))
+    except OSError:
+        return 0
+
+
+class ResourceSampler:
+    """按组（server / workers / harness）定期采样进程树的 CPU、RSS 和文件描述符"""
+
+    def __init__(self, groups: Dict[str, List[int]], interval: float = 1.0, health_url: Optional[str] = None):
+        self.groups = groups
+        self.interval = interval
+        self.health_url = health_url
+        self.samples: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._start = time.time()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _queue_depth(self) -> Optional[Dict]:
+        if not self.health_url:
+            return None
+        try:
+            return http_json('GET', self.health_url, timeout=2)[1].get('jobs')
+        except Exception:
+            return None
+
+    def _loop(self):
+        last_ticks: Dict[str, int] = {}
+        last_time = time.time()
+        while True:
+            now = time.time()
+            table = _read_proc_table()
+            sample = {'t': round(now - self._start, 2), 'groups': {}}
+            for name, roots in self.groups.items():
+                others = {pid for other, pids in self.groups.items() if other != name for pid in pids}
+                pids = _tree(table, roots, others)
+                ticks = sum(table[pid]['ticks'] for pid in pids)
+                cpu = None
+                if name in last_ticks and now > last_time:
+                    cpu = round(max(0, ticks - last_ticks[name]) / CLK_TCK / (now - last_time) * 100, 1)
+                last_ticks[name] = ticks
+                sample['groups'][name] = {
+                    'processes': len(pids),
+                    'cpu': cpu,
+                    'rss_mb': round(sum(table[pid]['rss'] for pid in pids) / 1024 ** 2, 1),
+                    'fds': sum(_open_fds(pid) for pid in pids),
+                }
+            jobs = self._queue_depth()
+            if jobs is not None:
+                sample['jobs'] = jobs
+            self.samples.append(sample)
+            last_time = now
+            if self._stop.wait(self.interval):
+                return
+
+    def summary(self) -> Dict:
+        result = {}
+        for name in self.groups:
+            points = [s['groups'][name] for s in self.samples if name in s['groups']]
+            cpu = [p['cpu'] for p in points if p['cpu'] is not None]
+            result[name] = {
+                'cpu_avg': round(sum(cpu) / len(cpu), 1) if cpu else None,
+                'cpu_max': max(cpu) if cpu else None,
+                'rss_max_mb': max((p['rss_mb'] for p in points), default=None),
+                'fds_max': max((p['fds'] for p in points), default=None),
+                'processes_max': max((p['processes'] for p in points), default=None),
+            }
+        return result
+
+
+# ----------------------------------------------------------------------
+# 被测环境
+# ----------------------------------------------------------------------
+def http_json(method: str, url: str, payload: Optional[Dict] = None, timeout: float = 10):
+    """返回 (状态码, JSON)；HTTP 错误也返回响应体"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b'{}')
+    except urllib.error.HTTPError as e:
+        try:
+            return e.code, json.loads(e.read() or b'{}')
+        except ValueError:
+            return e.code, {}
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LoadTestEnvironment:
+    """隔离工作目录中的 v0 替身 + server-example.py + N 个 build_worker.py"""
+
+    def __init__(self, workdir: Path, workers: int, mock_config: MockConfig,
+                 npm_delay: float = 0.0, build_cpu: float = 0.0, use_archive: bool = False,
+                 remote_workers: bool = False):
+        self.workdir = Path(workdir)
+        self.workers = workers
+        self.mock_config = mock_config
+        self.npm_delay = npm_delay
+        self.build_cpu = build_cpu
+        self.use_archive = use_archive
+        self.remote_workers = remote_workers
+        self.mock = None
+        self.server: Optional[subprocess.Popen] = None
+        self.worker_procs: List[subprocess.Popen] = []
+        self.port = None
+        self.child_env: Optional[Dict[str, str]] = None
+        self._log_files = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _env(self, mock_url: str) -> Dict[str, str]:
+        env = os.environ.copy()
+        bin_dir = write_stub_toolchain(self.workdir / 'bin')
+        data = self.workdir / 'data'
+        env.update({
+            'PATH': f"{bin_dir}{os.pathsep}{env.get('PATH', '')}",
+            'V0_API_URL': mock_url,
+            'V0_API_KEY': 'mock',
+            'V0_JOB_QUEUE_DB': str(data / 'job_queue.db'),
+            'V0_CATALOG_DB': str(data / 'catalog.db'),
+            'V0_RESPONSE_ARCHIVE': str(data / 'response_archive'),
+            'V0_ARTIFACT_DIR': str(data / 'artifacts'),
+            'V0_PROJECTS_DIR': str(data / 'generated_projects'),
+            'V0_LOG_DIR': str(data / 'logs'),
+            'V0_BUILD_CACHE': str(data / 'build_cache'),
+            'V0_NEXT_BUILD_CACHE': str(data / 'next_build_cache'),
+            'V0_TSC_CACHE_DIR': str(data / 'tsc_cache'),
+            'V0_DEV_SERVER_REGISTRY': str(data / '.dev_servers.json'),
+            'V0_PORT_REGISTRY': str(data / '.port_leases.json'),
+            'V0_STUB_NPM_DELAY': str(self.npm_delay),
+            'V0_STUB_BUILD_CPU': str(self.build_cpu),
+            'PYTHONUNBUFFERED': '1',
+        })
+        return env
+
+    def _remote_worker_env(self, env: Dict[str, str], index: int) -> Dict[str, str]:
+        """模拟另一台主机上的 worker：本机数据全部独立，只共享产物目录，队列走前端 HTTP 接口"""
+        host = self.workdir / 'data' / f'host-{index}'
+        return {
+            **env,
+            'V0_JOB_QUEUE_URL': self.url,
+            'V0_JOB_QUEUE_DB': str(host / 'unused_job_queue.db'),
+            'V0_CATALOG_DB': str(host / 'catalog.db'),
+            'V0_RESPONSE_ARCHIVE': str(host / 'response_archive'),
+            'V0_PROJECTS_DIR': str(host / 'generated_projects'),
+            'V0_LOG_DIR': str(host / 'logs'),
+            'V0_BUILD_CACHE': str(host / 'build_cache'),
+            'V0_NEXT_BUILD_CACHE': str(host / 'next_build_cache'),
+            'V0_TSC_CACHE_DIR': str(host / 'tsc_cache'),
+            'V0_DEV_SERVER_REGISTRY': str(host / '.dev_servers.json'),
+            'V0_PORT_REGISTRY': str(host / '.port_leases.json'),
+        }
+
+    def _spawn(self, name: str, cmd: List[str], env: Dict[str, str]) -> subprocess.Popen:
+        log = open(self.workdir / f"{name}.log", 'wb')
+        self._log_files.append(log)
+        return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def start(self, ready_timeout: float = 30.0):
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        corpus = load_corpus(use_archive=self.use_archive)
+        self.mock = make_server('127.0.0.1', 0, self.mock_config, corpus)
+        self.mock.RequestHandlerClass.log_message = lambda handler, format, *args: None
+        threading.Thread(target=self.mock.serve_forever, daemon=True).start()
+        mock_url = f"http://127.0.0.1:{self.mock.server_address[1]}/v1/chat/completions"
+
+        env = self.child_env = self._env(mock_url)
+        if self.remote_workers:
+            env['V0_WORKER_TOKEN'] = f"load-test-{random.getrandbits(64):016x}"
+        self.port = _free_port()
+        self.server = self._spawn('server', [sys.executable, str(SERVER_SCRIPT)], {**env, 'PORT': str(self.port)})
+        for i in range(self.workers):
+            worker_env = self._remote_worker_env(env, i) if self.remote_workers else env
+            self.worker_procs.append(self._spawn(f'worker-{i}', [
+                sys.executable, str(WORKER_SCRIPT), '--poll-interval', '0.2', '--worker-id', f'load-{i}'], worker_env))
+
+        deadline = time.time() + ready_timeout
+        while time.time() < deadline:
+            if self.server.poll() is not None:
+                raise RuntimeError(f"server-example.py 启动失败，见 {self.workdir / 'server.log'}")
+            try:
+                if http_json('GET', f"{self.url}/health", timeout=1)[0] == 200:
+                    mode = '，远程队列' if self.remote_workers else ''
+                    print(f"🚀 被测服务: {self.url}（{self.workers} 个 worker{mode}，工作目录 {self.workdir}）")
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"server-example.py 在 {ready_timeout}s 内没有就绪")
+
+    def mock_stats(self) -> Optional[Dict]:
+        return self.mock.RequestHandlerClass.state.stats() if self.mock else None
+
+    def stop(self):
+        procs = [*self.worker_procs, self.server]
+        for proc in procs:
+            if proc and proc.poll() is None:
+                proc.terminate()
+        for proc in procs:
+            if proc:
+                try:
+                    proc.wait(timeout=20)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    proc.wait()
+        # sync 模式下生成脚本启动的（桩）开发服务器
+        registry = self.workdir / 'data' / '.dev_servers.json'
+        if registry.exists() and self.child_env:
+            subprocess.run([sys.executable, '-c', 'from dev_server_supervisor import DevServerSupervisor; '
+                            'DevServerSupervisor().stop_all()'],
+                           cwd=Path(__file__).resolve().parent, env=self.child_env, capture_output=True)
+        if self.mock:
+            self.mock.shutdown()
+            self.mock.server_close()
+        for log in self._log_files:
+            log.close()
+
+
+# ----------------------------------------------------------------------
+# 负载生成
+# ----------------------------------------------------------------------
+def arrival_offsets(rate: float, arrival: str, count: Optional[int], duration: Optional[float],
+                    seed: int = 0) -> List[float]:
+    """到达时刻（相对开始的秒数）；count 和 duration 同时给出时取先到者"""
+    rng = random.Random(seed)
+    offsets, t = [], 0.0
+    while True:
+        if count is not None and len(offsets) >= count:
+            break
+        if duration is not None and t >= duration:
+            break
+        offsets.append(round(t, 3))
+        t += rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+    return offsets
+
+
+def default_problems(count: int) -> List[str]:
+    """互不相同的问题（替身按 prompt 哈希选择回放的响应，不同问题分布到不同响应上）"""
+    return [f"压测问题 #{i}: 一个小球从 {10 + i} 米高处自由落下，求落地时的速度和所用时间。" for i in range(count)]
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, mode: str = 'jobs', poll_interval: float = 0.25,
+                 job_timeout: float = 600.0):
+        self.base_url = base_url.rstrip('/')
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def _run_job(self, index: int, problem: str, scheduled: float):
+        record = {'index': index, 'scheduled': scheduled, 'submitted': time.time(), 'status': 'error',
+                  'queue_wait': None, 'latency': None, 'error': None}
+        try:
+            if self.mode == 'sync':
+                status, body = http_json('POST', f"{self.base_url}/api/v0-generate", {'prompt': problem},
+                                         timeout=self.job_timeout)
+                record['status'] = 'done' if status == 200 and body.get('success') else 'failed'
+                record['error'] = None if record['status'] == 'done' else body.get('error') or f"HTTP {status}"
+            else:
+                self._run_async_job(record, problem)
+        except Exception as e:
+            record['error'] = str(e)
+        record['finished'] = time.time()
+        if record['status'] == 'done':
+            record['latency'] = round(record['finished'] - record['submitted'], 3)
+        with self._lock:
+            self.records.append(record)
+
+    def _run_async_job(self, record: Dict, problem: str):
+        status, body = http_json('POST', f"{self.base_url}/api/jobs", {'prompt': problem})
+        if status != 202:
+            record['error'] = body.get('error') or f"HTTP {status}"
+            return
+        record['job_id'] = body['jobId']
+        status_url = f"{self.base_url}{body['statusUrl']}"
+        deadline = record['submitted'] + self.job_timeout
+        while time.time() < deadline:
+            _, job = http_json('GET', status_url)
+            if job.get('status') != 'queued' and record['queue_wait'] is None:
+                record['queue_wait'] = round(time.time() - record['submitted'], 3)
+            if job.get('status') in TERMINAL_STATUSES:
+                record['status'] = job['status']
+                record['attempts'] = job.get('attempts')
+                record['error'] = job.get('error')
+                return
+            time.sleep(self.poll_interval)
+        record['status'] = 'timeout'
+        http_json('DELETE', status_url)
+
+    def run(self, offsets: List[float], problems: List[str]) -> List[Dict]:
+        """开环负载：按到达时刻提交，不等待前面的任务完成"""
+        start = time.time()
+        threads = []
+        for index, offset in enumerate(offsets):
+            delay = start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(target=self._run_job, daemon=True,
+                                      args=(index, problems[index % len(problems)], offset))
+            thread.start()
+            threads.append(thread)
+            print(f"📤 [{offset:7.1f}s] 提交第 {index + 1}/{len(offsets)} 个任务")
+        for thread in threads:
+            thread.join()
+        return sorted(self.records, key=lambda r: r['index'])
+
+
+# ----------------------------------------------------------------------
+# 报告
+# ----------------------------------------------------------------------
+def _distribution(values: List[float]) -> Dict:
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values), 3) if values else None,
+        'p50': percentile(values, 0.5),
+        'p95': percentile(values, 0.95),
+        'p99': percentile(values, 0.99),
+        'max': round(max(values), 3) if values else None,
+    }
+
+
+def build_report(config: Dict, records: List[Dict], resources: Dict, timeseries: List[Dict],
+                 mock_stats: Optional[Dict] = None) -> Dict:
+    done = [r for r in records if r['status'] == 'done']
+    status_counts: Dict[str, int] = {}
+    for record in records:
+        status_counts[record['status']] = status_counts.get(record['status'], 0) + 1
+    if records:
+        window = max(r['finished'] for r in records) - min(r['submitted'] for r in records)
+    else:
+        window = 0
+    return {
+        'version': REPORT_VERSION,
+        'created_at': time.time(),
+        'config': config,
+        'summary': {
+            'submitted': len(records),
+            'completed': len(done),
+            'status_counts': status_counts,
+            'wall_time': round(window, 3),
+            'throughput_per_min': round(len(done) / window * 60, 3) if window else 0.0,
+            'latency': _distribution([r['latency'] for r in done]),
+            'queue_wait': _distribution([r['queue_wait'] for r in records if r['queue_wait'] is not None]),
+            'resources': resources,
+        },
+        'mock': mock_stats,
+        'jobs': records,
+        'timeseries': timeseries,
+    }
+
+
+def _lookup(summary: Dict, path: str):
+    value = summary
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare_reports(baseline: Dict, report: Dict) -> List[Dict]:
+    """逐项对比两个报告的 summary；change 为相对变化，better 表示是否改善"""
+    rows = []
+    for path, lower_is_better in COMPARED_METRICS:
+        old, new = _lookup(baseline['summary'], path), _lookup(report['summary'], path)
+        if old is None or new is None:
+            continue
+        change = round((new - old) / old, 3) if old else None
+        better = None if new == old else (new < old) == lower_is_better
+        rows.append({'metric': path, 'baseline': old, 'current': new, 'change': change, 'better': better})
+    return rows
+
+
+def print_comparison(rows: List[Dict]):
+    print(f"\n{'指标':<30} {'基线':>10} {'本次':>10} {'变化':>8}")
+    for row in rows:
+        icon = {True: '✅', False: '❌', None: '  '}[row['better']]
+        change = f"{row['change']:+.0%}" if row['change'] is not None else '-'
+        print(f"{row['metric']:<30} {row['baseline']:>10} {row['current']:>10} {change:>8} {icon}")
+
+
+def print_summary(report: Dict):
+    summary = report['summary']
+    latency, wait = summary['latency'], summary['queue_wait']
+    counts = ', '.join(f"{status} {count}" for status, count in sorted(summary['status_counts'].items()))
+    print(f"\n📊 {summary['submitted']} 个任务（{counts}），用时 {summary['wall_time']}s，"
+          f"吞吐 {summary['throughput_per_min']} 个/分钟")
+    if latency['count']:
+        print(f"⏱️ 端到端延迟 p50 {latency['p50']}s / p95 {latency['p95']}s / p99 {latency['p99']}s"
+              f"（最大 {latency['max']}s）")
+    if wait['count']:
+        print(f"⏳ 排队等待 p50 {wait['p50']}s / p95 {wait['p95']}s / p99 {wait['p99']}s")
+    for name, stats in summary['resources'].items():
+        print(f"🖥️ {name:<8} CPU 平均 {stats['cpu_avg']}% / 峰值 {stats['cpu_max']}%，"
+              f"RSS 峰值 {stats['rss_max_mb']} MB，FD 峰值 {stats['fds_max']}，进程数峰值 {stats['processes_max']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成服务端到端压测")
+    parser.add_argument("--url", default=None, help="压测已有的服务（默认在隔离目录中启动整套服务）")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="与 --url 配合：要采样的服务进程")
+    parser.add_argument("--mode", choices=["jobs", "sync"], default="jobs", help="任务队列或同步生成接口")
+    parser.add_argument("--workers", type=int, default=2, help="启动的 build_worker 数量")
+    parser.add_argument("--remote-workers", action="store_true",
+                        help="worker 模拟其他主机：独立数据目录，通过前端 HTTP 接口领取任务")
+    parser.add_argument("--rate", type=float, default=0.5, help="到达速率（个/秒）")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson", help="到达过程")
+    parser.add_argument("--jobs", type=int, default=None, help="任务总数")
+    parser.add_argument("--duration", type=float, default=None, help="提交任务的持续时间（秒）")
+    parser.add_argument("--problems", default=None, help="问题列表文件（每行一个，默认自动生成）")
+    parser.add_argument("--seed", type=int, default=0, help="到达时刻和故障注入的随机种子")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="任务状态轮询间隔（秒）")
+    parser.add_argument("--job-timeout", type=float, default=600.0, help="单个任务的超时（秒）")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="资源采样间隔（秒）")
+    parser.add_argument("--ttft", type=float, default=2.0, help="替身首个 token 前的等待（秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="替身输出速度，0 表示不限速")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="替身等待时间的缩放系数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身返回 500 的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="替身返回 429 的概率")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="替身的并发上限，0 表示不限")
+    parser.add_argument("--archive", action="store_true", help="替身同时回放响应归档中的记录")
+    parser.add_argument("--npm-delay", type=float, default=0.5, help="每次 npm/npx 调用的等待（秒）")
+    parser.add_argument("--build-cpu", type=float, default=2.0, help="每次 next build 占用的 CPU 时间（秒）")
+    parser.add_argument("--workdir", default=None, help="工作目录（默认临时目录，结束后删除）")
+    parser.add_argument("--keep", action="store_true", help="保留工作目录")
+    parser.add_argument("--output", default=None, help="报告输出路径 (JSON)")
+    parser.add_argument("--baseline", default=None, help="与之前的报告对比")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "REPORT"), help="只对比两个已有报告")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, report = (json.loads(Path(p).read_text(encoding='utf-8')) for p in args.compare)
+        print_comparison(compare_reports(baseline, report))
+        return
+    if args.rate <= 0:
+        sys.exit("❌ --rate 必须大于 0")
+    if args.jobs is None and args.duration is None:
+        args.jobs = 10
+
+    offsets = arrival_offsets(args.rate, args.arrival, args.jobs, args.duration, args.seed)
+    if args.problems:
+        problems = [line.strip() for line in Path(args.problems).read_text(encoding='utf-8').splitlines() if line.strip()]
+    else:
+        problems = default_problems(len(offsets))
+    config = {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'compare', 'keep', 'pid')}
+
+    env = None
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix='v0_load_'))
+    groups = {'harness': [os.getpid()]}
+    try:
+        if args.url:
+            base_url = args.url
+            if args.pid:
+                groups['server'] = args.pid
+        else:
+            mock_config = MockConfig(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, time_scale=args.time_scale,
+                                     error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                     max_concurrent=args.max_concurrent, seed=args.seed)
+            env = LoadTestEnvironment(workdir, args.workers if args.mode == 'jobs' else 0, mock_config,
+                                      npm_delay=args.npm_delay, build_cpu=args.build_cpu, use_archive=args.archive,
+                                      remote_workers=args.remote_workers)
+            env.start()
+            base_url = env.url
+            groups['server'] = [env.server.pid]
+            if env.worker_procs:
+                groups['workers'] = [proc.pid for proc in env.worker_procs]
+
+        sampler = ResourceSampler(groups, args.sample_interval,
+                                  health_url=f"{base_url.rstrip('/')}/health" if args.mode == 'jobs' else None)
+        sampler.start()
+        print(f"🏋️ {len(offsets)} 个任务，{args.arrival} 到达 {args.rate}/s，模式 {args.mode}")
+        records = LoadGenerator(base_url, args.mode, args.poll_interval, args.job_timeout).run(offsets, problems)
+        sampler.stop()
+        report = build_report(config, records, sampler.summary(), sampler.samples,
+                              env.mock_stats() if env else None)
+    finally:
+        if env:
+            env.stop()
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        elif env:
+            print(f"📁 工作目录（日志、项目）: {workdir}")
+
+    print_summary(report)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        report['comparison'] = compare_reports(baseline, report)
+        print_comparison(report['comparison'])
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 报告已保存: {args.output}")
+    failed = report['summary']['submitted'] - report['summary']['completed']
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+本地 v0 API 替身 - 离线、可重复地压测和基准测试整条管道
+
+实现 /v1/chat/completions（普通响应和 SSE 流式响应），回放 responses/*.json
+（或响应归档）中已有的真实响应：
+
+1. 同一个 prompt 总是回放同一条响应（按 prompt 哈希选择），也可以用请求头 X-Mock-Response 指定
+2. --ttft 控制首个 token 前的等待，--tokens-per-sec 控制输出速度，--time-scale 整体缩放
+   （0 表示不等待）
+3. 故障注入：--error-rate 返回 500，--rate-limit-rate 返回 429，--max-concurrent 超过并发上限时返回 429；
+   随机数由 --seed 决定，按请求顺序可重现
+4. 遵守 max_tokens：超出时截断并返回 finish_reason=length；stream_options.include_usage 时最后发送 usage
+
+只依赖标准库。管道指向替身:
+    python mock_v0_server.py --port 8787 --ttft 2 --tokens-per-sec 200
+    V0_API_URL=http://127.0.0.1:8787/v1/chat/completions V0_API_KEY=mock python v0_api_integration.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_RESPONSES_DIR = Path(__file__).parent / "responses"
+DEFAULT_PORT = 8787
+# 每个 SSE 块包含的 token 数
+CHUNK_TOKENS = 8
+CHARS_PER_TOKEN = 4
+
+
+def _tokens(text: str) -> int:
+    return max(1, round(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def _response_content(raw: str) -> str:
+    """归档的响应是 {"content": ...} 包装过的 JSON，也可能是原始文本"""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+    if isinstance(data, dict) and isinstance(data.get('content'), str):
+        return data['content']
+    return raw
+
+
+def load_corpus(responses_dir: Optional[Path] = None, use_archive: bool = False) -> List[Tuple[str, str]]:
+    """要回放的 (名称, 内容) 列表，按名称排序保证选择可重现"""
+    corpus = []
+    if use_archive:
+        from response_archive import get_archive
+        corpus.extend((record_id, _response_content(content)) for record_id, content in get_archive().iter_records())
+    for path in sorted(Path(responses_dir or DEFAULT_RESPONSES_DIR).glob('*.json')):
+        corpus.append((path.stem, _response_content(path.read_text(encoding='utf-8'))))
+    corpus = [(name, content) for name, content in corpus if content.strip()]
+    corpus.sort(key=lambda item: item[0])
+    return corpus
+
+
+class MockConfig:
+    def __init__(self, ttft: float = 1.0, tokens_per_sec: float = 0.0, time_scale: float = 1.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, max_concurrent: int = 0,
+                 retry_after: int = 1, seed: int = 0):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.time_scale = time_scale
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+class MockState:
+    """请求计数、并发数和可重现的随机数"""
+
+    def __init__(self, corpus: List[Tuple[str, str]], config: MockConfig):
+        self.corpus = corpus
+        self.by_name = dict(corpus)
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.active = 0
+        self.counts = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'truncated': 0,
+                       'completion_tokens': 0}
+
+    def pick(self, prompt: str, name: Optional[str] = None) -> Tuple[str, str]:
+        if name and name in self.by_name:
+            return name, self.by_name[name]
+        digest = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+        return self.corpus[digest % len(self.corpus)]
+
+    def admit(self) -> Optional[int]:
+        """决定这个请求的命运：None 表示正常处理，否则返回要返回的状态码"""
+        with self.lock:
+            self.counts['requests'] += 1
+            roll = self.rng.random()
+            if self.config.max_concurrent and self.active >= self.config.max_concurrent:
+                self.counts['rate_limited'] += 1
+                return 429
+            if roll < self.config.rate_limit_rate:
+                self.counts['rate_limited'] += 1
+                return 429
+            if roll < self.config.rate_limit_rate + self.config.error_rate:
+                self.counts['errors'] += 1
+                return 500
+            self.active += 1
+            return None
+
+    def release(self, completion_tokens: int, truncated: bool):
+        with self.lock:
+            self.active -= 1
+            self.counts['ok'] += 1
+            self.counts['completion_tokens'] += completion_tokens
+            self.counts['truncated'] += int(truncated)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {**self.counts, 'active': self.active, 'corpus': len(self.corpus)}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state: MockState = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        print(f"[mock-v0] {self.address_string()} {format % args}", file=sys.stderr)
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _sleep(self, seconds: float):
+        seconds *= self.state.config.time_scale
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def do_GET(self):
+        if self.path in ('/health', '/stats'):
+            self._send_json(200, self.state.stats())
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send_json(401, {'error': {'message': 'missing API key', 'type': 'authentication_error'}})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            messages = body['messages']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': {'message': 'invalid request body'}})
+            return
+
+        status = self.state.admit()
+        if status == 429:
+            self._send_json(429, {'error': {'message': 'rate limit exceeded', 'type': 'rate_limit_error'}},
+                            headers={'Retry-After': str(self.state.config.retry_after)})
+            return
+        if status == 500:
+            self._send_json(500, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+            return
+
+        completion_tokens, truncated = 0, False
+        try:
+            prompt = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+            name, content = self.state.pick(prompt, self.headers.get('X-Mock-Response'))
+            max_tokens = body.get('max_tokens')
+            if max_tokens and _tokens(content) > max_tokens:
+                content, truncated = content[:max_tokens * CHARS_PER_TOKEN], True
+            completion_tokens = _tokens(content)
+            usage = {'prompt_tokens': _tokens(prompt), 'completion_tokens': completion_tokens,
+                     'total_tokens': _tokens(prompt) + completion_tokens}
+            finish_reason = 'length' if truncated else 'stop'
+            completion_id = f"chatcmpl-mock-{name}"
+            if body.get('stream'):
+                include_usage = bool((body.get('stream_options') or {}).get('include_usage'))
+                self._stream(completion_id, body.get('model'), content, finish_reason, usage if include_usage else None)
+            else:
+                self._sleep(self.state.config.ttft + self._generation_time(completion_tokens))
+                self._send_json(200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                 'finish_reason': finish_reason}],
+                    'usage': usage,
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.state.release(completion_tokens, truncated)
+
+    def _generation_time(self, tokens: int) -> float:
+        rate = self.state.config.tokens_per_sec
+        return tokens / rate if rate > 0 else 0.0
+
+    def _stream(self, completion_id: str, model: Optional[str], content: str, finish_reason: str,
+                usage: Optional[Dict]):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send(payload):
+            data = f"data: {payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)}\n\n"
+            raw = data.encode('utf-8')
+            self.wfile.write(f"{len(raw):x}\r\n".encode('ascii') + raw + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta: Dict, finish: Optional[str] = None) -> Dict:
+            return {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish}]}
+
+        self._sleep(self.state.config.ttft)
+        send(chunk({'role': 'assistant', 'content': ''}))
+        step = CHUNK_TOKENS * CHARS_PER_TOKEN
+        delay = self._generation_time(CHUNK_TOKENS)
+        for start in range(0, len(content), step):
+            send(chunk({'content': content[start:start + step]}))
+            self._sleep(delay)
+        send(chunk({}, finish_reason))
+        if usage:
+            send({'id': completion_id, 'object': 'chat.completion.chunk', 'model': model, 'choices': [],
+                  'usage': usage})
+        send('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def make_server(host: str = '127.0.0.1', port: int = DEFAULT_PORT, config: Optional[MockConfig] = None,
+                corpus: Optional[List[Tuple[str, str]]] = None) -> ThreadingHTTPServer:
+    """创建（未启动的）替身服务器；port=0 时由系统分配端口，见 server.server_address"""
+    corpus = corpus if corpus is not None else load_corpus()
+    if not corpus:
+        raise ValueError("没有可回放的响应")
+    handler = type('BoundMockHandler', (MockHandler,), {'state': MockState(corpus, config or MockConfig())})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 v0 API 替身（回放已有响应）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--responses", default=str(DEFAULT_RESPONSES_DIR), help="回放的响应目录 (*.json)")
+    parser.add_argument("--archive", action="store_true", help="同时回放响应归档中的记录")
+    parser.add_argument("--ttft", type=float, default=1.0, help="首个 token 前的等待（秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="输出速度，0 表示不限速")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="所有等待时间乘以该系数，0 表示不等待")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="超过该并发数时返回 429，0 表示不限")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 响应的 Retry-After（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="故障注入的随机种子")
+    args = parser.parse_args()
+
+    config = MockConfig(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, time_scale=args.time_scale,
+                        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                        max_concurrent=args.max_concurrent, retry_after=args.retry_after, seed=args.seed)
+    corpus = load_corpus(Path(args.responses), use_archive=args.archive)
+    server = make_server(args.host, args.port, config, corpus)
+    host, port = server.server_address[:2]
+    print(f"🧪 v0 API 替身: http://{host}:{port}/v1/chat/completions（{len(corpus)} 条响应）", file=sys.stderr)
+    print(f"   V0_API_URL=http://{host}:{port}/v1/chat/completions", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+跨项目共享的 Next.js 编译缓存
+
+每个生成的项目都要从头编译同样的 shadcn 组件、radix、framer-motion 和 lucide-react。
+webpack 的持久化缓存（.next/cache）以模块的绝对路径为键，直接把缓存目录复制到另一个项目
+几乎不会命中。因此 next build 不在项目目录中运行，而是在按模板指纹划分的固定工作区中运行：
+
+    next_build_cache/<指纹>/slot-<n>/
+        node_modules/   首次从项目硬链接过来，之后复用
+        .next/cache/    持久保留，同一指纹的所有项目共享
+        其余文件         每次构建前与项目源码同步
+
+模板指纹相同意味着依赖和配置相同，除生成的文件以外的模块都能命中缓存；指纹不含
+package.json / package-lock.json 中的项目名，所有用同一骨架创建的项目共用工作区。
+每个指纹有若干个工作区（slot），并发构建各自占用一个，都被占用时等待任意一个空出来。
+每次构建报告缓存复用率：构建前已存在且构建后未被改写的缓存文件字节数 / 构建后缓存总字节数。
+
+`next dev --turbopack` 的缓存同样以路径为键，开发服务器仍在项目目录中运行，不经过这里。
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from build_cache import template_fingerprint, MANIFEST_NAME
+from file_lock import file_lock
+from process_runner import run_streaming
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('V0_NEXT_BUILD_CACHE', Path(__file__).parent / "next_build_cache"))
+DEFAULT_SLOTS = int(os.environ.get('V0_NEXT_BUILD_SLOTS', 2))
+SLOT_POLL_INTERVAL = 0.2
+
+# 同步源码时不复制、也不从工作区删除的条目
+PRESERVED_ENTRIES = {'node_modules', '.next'}
+SKIPPED_ENTRIES = PRESERVED_ENTRIES | {'out', MANIFEST_NAME, '.dev_server.log', '.dev_server.pid', '.smoke.log'}
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _snapshot(cache_dir: Path) -> Dict[str, tuple]:
+    """缓存目录中每个文件的 (大小, inode, mtime)"""
+    snapshot = {}
+    if not cache_dir.is_dir():
+        return snapshot
+    for path in cache_dir.rglob('*'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if path.is_file():
+            snapshot[str(path.relative_to(cache_dir))] = (stat.st_size, stat.st_ino, stat.st_mtime_ns)
+    return snapshot
+
+
+def cache_reuse(before: Dict[str, tuple], after: Dict[str, tuple]) -> float:
+    """构建后缓存中有多少字节是构建前就存在、且没有被改写的"""
+    total = sum(size for size, _, _ in after.values())
+    if not total:
+        return 0.0
+    reused = sum(meta[0] for rel, meta in after.items() if before.get(rel) == meta)
+    return reused / total
+
+
+def _sync_sources(project_path: Path, workspace: Path):
+    """让工作区的源码与项目一致，保留 node_modules 和 .next"""
+    for entry in workspace.iterdir():
+        if entry.name in PRESERVED_ENTRIES:
+            continue
+        if entry.is_dir() and not entry.is_symlink():
+            shutil.rmtree(entry)
+        else:
+            entry.unlink()
+    for entry in project_path.iterdir():
+        if entry.name in SKIPPED_ENTRIES:
+            continue
+        target = workspace / entry.name
+        if entry.is_dir():
+            shutil.copytree(entry, target, symlinks=True)
+        else:
+            shutil.copy2(entry, target)
+
+
+class NextBuildCache:
+    def __init__(self, root: Optional[Path] = None, slots: int = DEFAULT_SLOTS):
+        self.root = Path(root or DEFAULT_CACHE_DIR)
+        self.slots = max(1, slots)
+
+    def _workspace_for(self, fingerprint: str, slot: int) -> Path:
+        return self.root / fingerprint / f"slot-{slot}"
+
+    def _acquire_slot(self, fingerprint: str, stack: ExitStack,
+                      cancel_event: Optional[threading.Event] = None) -> Optional[int]:
+        """占用一个空闲的工作区，都被占用时轮询直到有一个空出来；等待期间被取消时返回 None
+
+        不按 pid 之类固定选一个工作区阻塞等待：那样两个构建可能排在同一个工作区上，
+        而另一个工作区已经空闲
+        """
+        while True:
+            for slot in range(self.slots):
+                lock_path = self._workspace_for(fingerprint, slot).with_suffix('.lock')
+                # 每次尝试单独一个 ExitStack，没拿到的锁立即释放，拿到的才转移给调用方
+                with ExitStack() as attempt:
+                    if attempt.enter_context(file_lock(lock_path, blocking=False)):
+                        stack.enter_context(attempt.pop_all())
+                        return slot
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            time.sleep(SLOT_POLL_INTERVAL)
+
+    def build(self, project_path: Path, env: Optional[Dict[str, str]] = None, timeout_sec: int = 600,
+              log_path: Optional[Path] = None, cancel_event: Optional[threading.Event] = None) -> Dict:
+        """在共享工作区中运行 next build，并把 out/ 复制回项目
+
+        返回 run_streaming 的结果，另加 'fingerprint', 'slot', 'cache_reuse'。
+        cancel_event 置位时终止 next build；等待工作区期间或拿到工作区时已经取消则不再同步源码，
+        直接返回 cancelled
+        """
+        project_path = Path(project_path).resolve()
+        fingerprint = template_fingerprint(project_path)[:16]
+        start = time.time()
+
+        with ExitStack() as stack:
+            slot = self._acquire_slot(fingerprint, stack, cancel_event)
+            if slot is None or cancel_event is not None and cancel_event.is_set():
+                return {'returncode': None, 'tail': '', 'log_path': log_path, 'timed_out': False,
+                        'cancelled': True, 'elapsed': round(time.time() - start, 3),
+                        'fingerprint': fingerprint, 'slot': slot, 'cache_reuse': 0.0}
+            workspace = self._workspace_for(fingerprint, slot)
+            workspace.mkdir(parents=True, exist_ok=True)
+            # 指纹目录的 mtime 记录最近一次使用，project_gc 据此淘汰长期不用的工作区
+            os.utime(workspace.parent)
+            if not (workspace / 'node_modules').is_dir():
+                print(f"  - 📦 初始化共享构建工作区 {fingerprint}/slot-{slot}")
+                shutil.copytree(project_path / 'node_modules', workspace / 'node_modules',
+                                symlinks=True, copy_function=_link_or_copy)
+            _sync_sources(project_path, workspace)
+
+            cache_dir = workspace / '.next' / 'cache'
+            before = _snapshot(cache_dir)
+            result = run_streaming(['npx', 'next', 'build'], cwd=workspace, env=env,
+                                   timeout=timeout_sec, log_path=log_path, cancel_event=cancel_event)
+            reuse = cache_reuse(before, _snapshot(cache_dir))
+
+            out_dir = project_path / 'out'
+            if result['returncode'] == 0 and (workspace / 'out').is_dir():
+                if out_dir.exists():
+                    shutil.rmtree(out_dir)
+                shutil.move(str(workspace / 'out'), str(out_dir))
+
+        result.update(
+            fingerprint=fingerprint,
+            slot=slot,
+            cache_reuse=round(reuse, 3),
+            elapsed=round(time.time() - start, 3),
+        )
+        return result
+
+    def list_workspaces(self):
+        for workspace in sorted(self.root.glob('*/slot-*')):
+            cache_dir = workspace / '.next' / 'cache'
+            size = sum(meta[0] for meta in _snapshot(cache_dir).values())
+            yield {'workspace': workspace, 'cache_bytes': size}
+
+    def remove_if_idle(self, fingerprint: str) -> bool:
+        """没有构建正在使用时删除该指纹的全部工作区，返回是否删除"""
+        target = self.root / fingerprint
+        with ExitStack() as stack:
+            for lock_path in sorted(self.root.glob(f'{fingerprint}/slot-*.lock')):
+                if not stack.enter_context(file_lock(lock_path, blocking=False)):
+                    return False
+            shutil.rmtree(target, ignore_errors=True)
+        return not target.exists()
+
+    def clear(self, fingerprint: Optional[str] = None) -> int:
+        """删除全部（或指定指纹的）工作区，返回删除的指纹目录数"""
+        targets = [self.root / fingerprint] if fingerprint else [p for p in self.root.iterdir() if p.is_dir()]
+        count = 0
+        for target in targets:
+            if target.is_dir():
+                shutil.rmtree(target, ignore_errors=True)
+                count += 1
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享 Next.js 编译缓存")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出工作区和缓存大小")
+    build = sub.add_parser("build", help="在共享工作区中构建项目")
+    build.add_argument("project_path")
+    clear = sub.add_parser("clear", help="删除工作区")
+    clear.add_argument("fingerprint", nargs="?")
+    args = parser.parse_args()
+
+    cache = NextBuildCache()
+    if args.command == "list":
+        for item in cache.list_workspaces():
+            print(f"{item['cache_bytes'] / 1024 ** 2:8.1f} MB  {item['workspace']}")
+    elif args.command == "build":
+        result = cache.build(Path(args.project_path))
+        icon = '✅' if result['returncode'] == 0 else '❌'
+        print(f"{icon} {result['elapsed']}s，缓存复用率 {result['cache_reuse']:.0%} "
+              f"({result['fingerprint']}/slot-{result['slot']})")
+        if result['returncode'] != 0:
+            print(result['tail'][-2000:])
+            sys.exit(1)
+    elif args.command == "clear":
+        print(f"✅ 删除了 {cache.clear(args.fingerprint)} 个指纹的工作区")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+端口分配器 - 所有开发服务器和 Smoke Test 统一从这里租用端口
+
+以前构建器、集成脚本和完整管道各自 "bind 一下再关闭" 来找空闲端口，
+并发构建时多个进程会拿到同一个端口（EADDRINUSE）。
+这里把租约记录在 .port_leases.json 中（进程内 + 文件锁保护）：
+1. lease() 在锁内挑选既未被租用、又能 bind 成功的端口
+2. assign() 把租约转交给实际监听端口的子进程
+3. 租约持有进程退出后，租约在下一次分配时自动失效
+"""
+
+import os
+import sys
+import time
+import errno
+import atexit
+import socket
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from file_lock import file_lock, read_json, write_json_atomic, pid_alive
+
+DEFAULT_REGISTRY_PATH = Path(os.environ.get('V0_PORT_REGISTRY', Path(__file__).parent / ".port_leases.json"))
+DEFAULT_PORT_RANGE = (
+    int(os.environ.get('V0_PORT_RANGE_START', 3000)),
+    int(os.environ.get('V0_PORT_RANGE_END', 3999)),
+)
+
+
+class PortAllocator:
+    def __init__(self, registry_path: Optional[Path] = None, port_range=DEFAULT_PORT_RANGE):
+        self.registry_path = Path(registry_path or DEFAULT_REGISTRY_PATH)
+        self.lock_path = self.registry_path.with_suffix('.lock')
+        self.port_range = port_range
+        atexit.register(self.release_owned)
+
+    def _load(self) -> Dict[str, Dict]:
+        leases = read_json(self.registry_path, {})
+        return {port: lease for port, lease in leases.items() if pid_alive(lease.get('pid'))}
+
+    @staticmethod
+    def _bindable(port: int) -> bool:
+        """next dev -p 监听所有地址，因此按同样的地址试绑：0.0.0.0，以及可用时的 ::"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind(("", port))
+        except OSError:
+            return False
+        if socket.has_ipv6:
+            try:
+                s = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+            except OSError:
+                return True  # 内核没有启用 IPv6
+            with s:
+                try:
+                    s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+                    s.bind(("::", port))
+                except OSError as e:
+                    # 没有 IPv6 地址时服务器同样不会监听 IPv6
+                    return e.errno == errno.EADDRNOTAVAIL
+        return True
+
+    def lease(self, owner: str, pid: Optional[int] = None, start_port: Optional[int] = None) -> Optional[int]:
+        """租用一个端口，租约归属 pid（默认当前进程）"""
+        low, high = self.port_range
+        start = max(low, start_port or low)
+        with file_lock(self.lock_path):
+            leases = self._load()
+            for port in list(range(start, high + 1)) + list(range(low, start)):
+                if str(port) in leases or not self._bindable(port):
+                    continue
+                leases[str(port)] = {
+                    'owner': owner,
+                    'pid': pid or os.getpid(),
+                    'leased_at': time.time(),
+                }
+                write_json_atomic(self.registry_path, leases)
+                return port
+            write_json_atomic(self.registry_path, leases)
+        print(f"❌ 端口范围 {low}-{high} 内没有可用端口", file=sys.stderr)
+        return None
+
+    def assign(self, port: int, pid: int):
+        """把租约转交给实际监听端口的进程，该进程退出时租约失效"""
+        with file_lock(self.lock_path):
+            leases = self._load()
+            if str(port) in leases:
+                leases[str(port)]['pid'] = pid
+                write_json_atomic(self.registry_path, leases)
+
+    def release(self, port: Optional[int], pid: Optional[int] = None):
+        """释放租约；给出 pid 时只释放仍归属该进程的租约（端口可能已经被别人重新租用）"""
+        if not port:
+            return
+        with file_lock(self.lock_path):
+            leases = self._load()
+            lease = leases.get(str(port))
+            if lease and (pid is None or lease.get('pid') == pid):
+                leases.pop(str(port))
+            write_json_atomic(self.registry_path, leases)
+
+    def release_owned(self):
+        """释放仍归属当前进程的租约（进程退出时调用）"""
+        try:
+            with file_lock(self.lock_path):
+                leases = self._load()
+                owned = [port for port, lease in leases.items() if lease.get('pid') == os.getpid()]
+                for port in owned:
+                    leases.pop(port)
+                if owned:
+                    write_json_atomic(self.registry_path, leases)
+        except Exception:
+            pass
+
+    def leases(self) -> Dict[str, Dict]:
+        with file_lock(self.lock_path):
+            leases = self._load()
+            write_json_atomic(self.registry_path, leases)
+        return leases
+
+
+_default_allocator: Optional[PortAllocator] = None
+
+
+def get_allocator() -> PortAllocator:
+    """进程内共享的默认分配器"""
+    global _default_allocator
+    if _default_allocator is None:
+        _default_allocator = PortAllocator()
+    return _default_allocator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端口租约管理")
+    parser.add_argument("command", choices=["list", "release"], help="列出或释放租约")
+    parser.add_argument("port", nargs="?", type=int, help="要释放的端口")
+    args = parser.parse_args()
+
+    allocator = get_allocator()
+    if args.command == "list":
+        for port, lease in sorted(allocator.leases().items(), key=lambda item: int(item[0])):
+            print(f"{port:>5}  PID {lease['pid']:<8} {lease['owner']}")
+    elif args.command == "release":
+        allocator.release(args.port)
+        print(f"✅ 已释放端口 {args.port}")
+
+
+if __name__ == "__main__":
+    main()
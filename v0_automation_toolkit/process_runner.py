@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+子进程运行器 - 输出流式写入日志，内存占用恒定
+
+以前 create-next-app、npm install、shadcn add、next build 都用
+subprocess.run(..., capture_output=True) 把全部输出读进内存，成功时又直接丢弃。这里：
+1. 输出逐行写入按大小滚动的日志文件（每个任务一个）
+2. 内存中只保留最后 tail_lines 行，用于失败时报告错误
+3. 子进程在新会话中启动，超时或取消时终止整个进程组（npx/npm 会再启动子进程）
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_LOG_DIR = Path(os.environ.get('V0_LOG_DIR', Path(__file__).parent / "logs"))
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 2
+# 单次读取的上限：npm 的进度条用 \r 刷新，可能很长时间没有换行
+READ_CHUNK = 64 * 1024
+
+
+def kill_process_group(proc: subprocess.Popen, grace_sec: float = 5):
+    """终止进程组：先 SIGTERM，超时后 SIGKILL"""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=grace_sec)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+class RotatingLog:
+    """按大小滚动的日志文件：log -> log.1 -> log.2"""
+
+    def __init__(self, path: Path, max_bytes: int = MAX_LOG_BYTES, backups: int = LOG_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups, 0, -1):
+            src = self.path if i == 1 else self.path.with_name(f"{self.path.name}.{i - 1}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i}"))
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+    def write(self, data: bytes):
+        if self._size + len(data) > self.max_bytes and self._size:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def close(self):
+        self._file.close()
+
+
+def run_streaming(cmd: List[str], cwd=None, env: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None, log_path: Optional[Path] = None,
+                  tail_lines: int = 200, cancel_event: Optional[threading.Event] = None,
+                  on_line: Optional[Callable[[str], None]] = None) -> Dict:
+    """运行命令，stdout/stderr 合并写入日志文件
+
+    返回 {'returncode', 'tail', 'log_path', 'timed_out', 'cancelled', 'elapsed'}；
+    超时或取消时 returncode 为 None
+    """
+    start = time.time()
+    tail = deque(maxlen=tail_lines)
+    log = RotatingLog(log_path) if log_path else None
+    if log:
+        log.write(f"\n$ {' '.join(map(str, cmd))}  (cwd={cwd})\n".encode('utf-8'))
+
+    proc = subprocess.Popen(
+        cmd, cwd=str(cwd) if cwd else None, env=env,
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+    def _pump():
+        for chunk in iter(lambda: proc.stdout.readline(READ_CHUNK), b''):
+            if log:
+                log.write(chunk)
+            line = chunk.decode('utf-8', errors='replace').rstrip('\r\n')
+            tail.append(line)
+            if on_line:
+                on_line(line)
+
+    reader = threading.Thread(target=_pump, name="process-runner-reader", daemon=True)
+    reader.start()
+
+    timed_out = cancelled = False
+    deadline = start + timeout if timeout else None
+    try:
+        while True:
+            try:
+                proc.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+            elif deadline and time.time() > deadline:
+                timed_out = True
+            if cancelled or timed_out:
+                kill_process_group(proc)
+                break
+    except BaseException:
+        # 信号处理函数抛出的 JobCancelled / KeyboardInterrupt：不能留下孤儿进程组
+        kill_process_group(proc)
+        reader.join(timeout=5)
+        if log:
+            log.close()
+        raise
+
+    reader.join(timeout=5)
+    proc.stdout.close()
+    if log:
+        status = 'cancelled' if cancelled else 'timeout' if timed_out else f'exit {proc.returncode}'
+        log.write(f"[{status} after {time.time() - start:.1f}s]\n".encode('utf-8'))
+        log.close()
+
+    return {
+        'returncode': None if (timed_out or cancelled) else proc.returncode,
+        'tail': '\n'.join(tail),
+        'log_path': str(log_path) if log_path else None,
+        'timed_out': timed_out,
+        'cancelled': cancelled,
+        'elapsed': round(time.time() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式运行命令并写入滚动日志")
+    parser.add_argument("--log", required=True, help="日志文件路径")
+    parser.add_argument("--timeout", type=float, default=None, help="超时时间（秒）")
+    parser.add_argument("cmd", nargs=argparse.REMAINDER, help="要运行的命令")
+    args = parser.parse_args()
+    if not args.cmd:
+        parser.error("缺少命令")
+
+    result = run_streaming(args.cmd, timeout=args.timeout, log_path=Path(args.log))
+    if result['returncode'] != 0:
+        print(result['tail'], file=sys.stderr)
+    print(f"{'✅' if result['returncode'] == 0 else '❌'} {result['elapsed']}s  日志: {result['log_path']}",
+          file=sys.stderr)
+    sys.exit(0 if result['returncode'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+生成项目的垃圾回收 - 控制 generated_projects 的磁盘占用
+
+每个生成的项目都带一份完整的 node_modules，长期运行的服务会慢慢占满磁盘。
+回收策略（按最近访问时间从旧到新处理）：
+1. 闲置超过 prune_after 的项目删除 node_modules / .next（保留源码和 out/，仍可静态访问）
+2. 闲置超过 delete_after 的项目整个删除
+3. 总占用仍超过预算时，继续按 LRU 先瘦身、再删除，直到回到预算以内
+运行中的开发服务器、目录中处于 pending / building 状态的项目以及最近刚修改的项目不会被处理。
+
+按模板指纹共享的缓存（next_build_cache/ 的构建工作区、tsc_cache/ 的 build info）单独计算：
+超过 cache_max_age 未使用的淘汰，总量超过 cache_budget 时按 LRU 淘汰；正在构建的工作区跳过。
+
+用法:
+    python project_gc.py --dry-run
+    python project_gc.py --budget-gb 10
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import get_catalog, directory_size, STATUS_PENDING, STATUS_BUILDING, STATUS_DELETED, STATUS_CANCELLED
+from dev_server_supervisor import DevServerSupervisor
+from file_lock import pid_alive
+from next_build_cache import NextBuildCache, DEFAULT_CACHE_DIR as NEXT_CACHE_DIR
+from ts_validator import DEFAULT_CACHE_DIR as TSC_CACHE_DIR
+
+TOOLKIT_DIR = Path(__file__).parent
+# 与 v0_api_integration.PROJECTS_DIR 一致：V0_PROJECTS_DIR 可以把生成的项目放到别处
+DEFAULT_PROJECT_DIRS = [
+    Path(os.environ.get('V0_PROJECTS_DIR', TOOLKIT_DIR / "generated_projects")),
+    TOOLKIT_DIR.parent / "v0_generated_projects",
+]
+DEFAULT_BUDGET_BYTES = int(float(os.environ.get('V0_GC_BUDGET_GB', 20)) * 1024 ** 3)
+DEFAULT_PRUNE_AFTER = int(os.environ.get('V0_GC_PRUNE_AFTER', 3 * 24 * 3600))
+DEFAULT_DELETE_AFTER = int(os.environ.get('V0_GC_DELETE_AFTER', 30 * 24 * 3600))
+DEFAULT_CACHE_BUDGET_BYTES = int(float(os.environ.get('V0_GC_CACHE_BUDGET_GB', 5)) * 1024 ** 3)
+DEFAULT_CACHE_MAX_AGE = int(os.environ.get('V0_GC_CACHE_MAX_AGE', 7 * 24 * 3600))
+# 刚创建或刚修改的项目可能正在由没有写目录的入口构建，不处理
+MIN_IDLE_SEC = 3600
+
+PRUNABLE_DIRS = ('node_modules', '.next')
+IN_FLIGHT_STATUSES = (STATUS_PENDING, STATUS_BUILDING)
+
+
+class ProjectGC:
+    def __init__(self, project_dirs: Optional[List[Path]] = None, budget_bytes: int = DEFAULT_BUDGET_BYTES,
+                 prune_after: int = DEFAULT_PRUNE_AFTER, delete_after: int = DEFAULT_DELETE_AFTER,
+                 supervisor: Optional[DevServerSupervisor] = None,
+                 cache_budget_bytes: int = DEFAULT_CACHE_BUDGET_BYTES, cache_max_age: int = DEFAULT_CACHE_MAX_AGE,
+                 next_cache: Optional[NextBuildCache] = None, tsc_cache_dir: Optional[Path] = None):
+        self.project_dirs = [Path(d) for d in (project_dirs or DEFAULT_PROJECT_DIRS)]
+        self.budget_bytes = budget_bytes
+        self.prune_after = prune_after
+        self.delete_after = delete_after
+        self.supervisor = supervisor or DevServerSupervisor()
+        self.cache_budget_bytes = cache_budget_bytes
+        self.cache_max_age = cache_max_age
+        self.next_cache = next_cache or NextBuildCache(NEXT_CACHE_DIR)
+        self.tsc_cache_dir = Path(tsc_cache_dir or TSC_CACHE_DIR)
+        self.catalog = get_catalog()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 扫描
+    # ------------------------------------------------------------------
+    def _running_projects(self) -> set:
+        return {str(Path(entry['project']).resolve()) for entry in self.supervisor.list_servers()}
+
+    @staticmethod
+    def _pid_file_alive(project_path: Path) -> bool:
+        """不在管理器注册表中的开发服务器（例如构建器 CLI 启动的）也要保护"""
+        try:
+            return pid_alive(int((project_path / '.dev_server.pid').read_text().strip()))
+        except (OSError, ValueError):
+            return False
+
+    def _last_access(self, project_path: Path, entry: Optional[Dict]) -> float:
+        times = []
+        for path in (project_path, project_path / 'package.json', project_path / 'out'):
+            try:
+                times.append(path.stat().st_mtime)
+            except OSError:
+                pass
+        if entry:
+            times.extend(t for t in (entry['updated_at'], entry['last_served_at']) if t)
+        return max(times) if times else 0.0
+
+    def scan(self) -> List[Dict]:
+        """列出所有项目及其占用、最近访问时间和是否受保护"""
+        running = self._running_projects()
+        now = time.time()
+        projects = []
+        for projects_dir in self.project_dirs:
+            if not projects_dir.is_dir():
+                continue
+            for project_path in sorted(projects_dir.iterdir()):
+                if not project_path.is_dir():
+                    continue
+                entry = self.catalog.find_by_project_name(project_path.name)
+                cancelled = bool(entry) and entry['build_status'] == STATUS_CANCELLED
+                # 被取消的构建可能停在 create-next-app 中途，还没有 package.json
+                if not cancelled and not (project_path / 'package.json').exists():
+                    continue
+                last_access = self._last_access(project_path, entry)
+                prunable = {name: directory_size(project_path / name)
+                            for name in PRUNABLE_DIRS if (project_path / name).is_dir()}
+                reason = None
+                if str(project_path.resolve()) in running or self._pid_file_alive(project_path):
+                    reason = 'dev server running'
+                elif entry and entry['build_status'] in IN_FLIGHT_STATUSES:
+                    reason = f"job {entry['build_status']}"
+                elif not cancelled and now - last_access < MIN_IDLE_SEC:
+                    reason = 'recently modified'
+                projects.append({
+                    'path': project_path,
+                    'catalog_id': entry['id'] if entry else None,
+                    'size': directory_size(project_path),
+                    'prunable': prunable,
+                    'idle': now - last_access,
+                    'cancelled': cancelled,
+                    'protected': reason,
+                })
+        return projects
+
+    # ------------------------------------------------------------------
+    # 回收
+    # ------------------------------------------------------------------
+    def plan(self, projects: List[Dict]) -> List[Dict]:
+        """根据年龄和预算生成回收动作列表（不修改磁盘）"""
+        actions = []
+        total = sum(p['size'] for p in projects)
+        candidates = sorted((p for p in projects if not p['protected']), key=lambda p: p['idle'], reverse=True)
+        pruned, deleted = set(), set()
+
+        def prune(project, reason):
+            nonlocal total
+            freed = sum(project['prunable'].values())
+            if freed and id(project) not in pruned and id(project) not in deleted:
+                pruned.add(id(project))
+                total -= freed
+                actions.append({'action': 'prune', 'path': project['path'], 'bytes': freed,
+                                'reason': reason, 'catalog_id': project['catalog_id']})
+
+        def delete(project, reason):
+            nonlocal total
+            if id(project) in deleted:
+                return
+            freed = project['size'] - (sum(project['prunable'].values()) if id(project) in pruned else 0)
+            deleted.add(id(project))
+            total -= freed
+            actions.append({'action': 'delete', 'path': project['path'], 'bytes': freed,
+                            'reason': reason, 'catalog_id': project['catalog_id']})
+
+        # 1-2. 被取消任务的残留目录直接删除，其余按闲置时间
+        for project in candidates:
+            if project['cancelled']:
+                delete(project, 'cancelled')
+            elif project['idle'] >= self.delete_after:
+                delete(project, f"idle {project['idle'] / 86400:.1f}d")
+            elif project['idle'] >= self.prune_after:
+                prune(project, f"idle {project['idle'] / 86400:.1f}d")
+
+        # 3. 超出预算：先瘦身，再整个删除
+        for project in candidates:
+            if total <= self.budget_bytes:
+                break
+            prune(project, 'over budget')
+        for project in candidates:
+            if total <= self.budget_bytes:
+                break
+            delete(project, 'over budget')
+        return actions
+
+    def scan_caches(self) -> List[Dict]:
+        """共享缓存条目：每个指纹的构建工作区目录、每个 tsc build info 文件"""
+        now = time.time()
+        entries = []
+        if self.next_cache.root.is_dir():
+            for path in self.next_cache.root.iterdir():
+                if path.is_dir():
+                    entries.append({'kind': 'next-build', 'path': path, 'size': directory_size(path),
+                                    'idle': now - path.stat().st_mtime})
+        if self.tsc_cache_dir.is_dir():
+            for path in self.tsc_cache_dir.glob('*.tsbuildinfo'):
+                stat = path.stat()
+                entries.append({'kind': 'tsc', 'path': path, 'size': stat.st_size, 'idle': now - stat.st_mtime})
+        return entries
+
+    def plan_caches(self, entries: List[Dict]) -> List[Dict]:
+        """过期的缓存条目全部淘汰，剩余的超出预算时按 LRU 淘汰"""
+        actions = []
+        total = sum(e['size'] for e in entries)
+        for entry in sorted(entries, key=lambda e: e['idle'], reverse=True):
+            if entry['idle'] >= self.cache_max_age:
+                reason = f"cache idle {entry['idle'] / 86400:.1f}d"
+            elif total > self.cache_budget_bytes:
+                reason = 'cache over budget'
+            else:
+                continue
+            total -= entry['size']
+            actions.append({'action': 'evict', 'kind': entry['kind'], 'path': entry['path'],
+                            'bytes': entry['size'], 'reason': reason, 'catalog_id': None})
+        return actions
+
+    def _evict(self, action: Dict) -> bool:
+        path = action['path']
+        if action['kind'] == 'next-build':
+            # 有构建正占用其中的工作区时跳过
+            return self.next_cache.remove_if_idle(path.name)
+        try:
+            path.unlink()
+            return True
+        except OSError as e:
+            print(f"⚠️ 回收 {path} 失败: {e}", file=sys.stderr)
+            return False
+
+    def _apply(self, action: Dict) -> bool:
+        if action['action'] == 'evict':
+            return self._evict(action)
+        project_path = action['path']
+        # 执行前再检查一次，扫描之后可能有人启动了服务器
+        if str(project_path.resolve()) in self._running_projects() or self._pid_file_alive(project_path):
+            return False
+        try:
+            if action['action'] == 'prune':
+                for name in PRUNABLE_DIRS:
+                    shutil.rmtree(project_path / name, ignore_errors=True)
+                if action['catalog_id']:
+                    self.catalog.update(action['catalog_id'], project_path=project_path, compute_size=True)
+            else:
+                shutil.rmtree(project_path)
+                if action['catalog_id']:
+                    self.catalog.update(action['catalog_id'], build_status=STATUS_DELETED, size_bytes=0)
+            return True
+        except OSError as e:
+            print(f"⚠️ 回收 {project_path} 失败: {e}", file=sys.stderr)
+            return False
+
+    def collect(self, dry_run: bool = False) -> Dict:
+        """执行一次回收，返回报告；dry_run 时只报告可以回收的字节数"""
+        projects = self.scan()
+        caches = self.scan_caches()
+        actions = self.plan(projects) + self.plan_caches(caches)
+        reclaimed = 0
+        for action in actions:
+            action['applied'] = False if dry_run else self._apply(action)
+            if action['applied'] or dry_run:
+                reclaimed += action['bytes']
+        total = sum(p['size'] for p in projects)
+        return {
+            'dry_run': dry_run,
+            'projects': len(projects),
+            'protected': sum(1 for p in projects if p['protected']),
+            'total_bytes': total,
+            'budget_bytes': self.budget_bytes,
+            'cache_bytes': sum(c['size'] for c in caches),
+            'cache_budget_bytes': self.cache_budget_bytes,
+            'reclaimed_bytes': reclaimed,
+            'actions': actions,
+        }
+
+    def start(self, interval: int = 3600) -> threading.Thread:
+        """启动后台线程定期回收"""
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    report = self.collect()
+                    if report['actions']:
+                        print(f"🧹 项目回收: 释放 {report['reclaimed_bytes'] / 1024 ** 2:.1f} MB", file=sys.stderr)
+                except Exception as e:
+                    print(f"⚠️ 项目回收失败: {e}", file=sys.stderr)
+
+        thread = threading.Thread(target=_loop, name="project-gc", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回收生成项目占用的磁盘空间")
+    parser.add_argument("project_dirs", nargs="*", help="项目所在目录（默认 generated_projects 和 v0_generated_projects）")
+    parser.add_argument("--budget-gb", type=float, default=DEFAULT_BUDGET_BYTES / 1024 ** 3, help="磁盘占用预算 (GB)")
+    parser.add_argument("--prune-after", type=float, default=DEFAULT_PRUNE_AFTER / 86400,
+                        help="闲置多少天后删除 node_modules / .next")
+    parser.add_argument("--delete-after", type=float, default=DEFAULT_DELETE_AFTER / 86400,
+                        help="闲置多少天后删除整个项目")
+    parser.add_argument("--cache-budget-gb", type=float, default=DEFAULT_CACHE_BUDGET_BYTES / 1024 ** 3,
+                        help="共享编译缓存（next_build_cache、tsc_cache）的磁盘预算 (GB)")
+    parser.add_argument("--cache-max-age", type=float, default=DEFAULT_CACHE_MAX_AGE / 86400,
+                        help="共享编译缓存多少天未使用后淘汰")
+    parser.add_argument("--dry-run", action="store_true", help="只报告可以回收的空间，不删除")
+    args = parser.parse_args()
+
+    gc = ProjectGC(
+        project_dirs=args.project_dirs or None,
+        budget_bytes=int(args.budget_gb * 1024 ** 3),
+        prune_after=int(args.prune_after * 86400),
+        delete_after=int(args.delete_after * 86400),
+        cache_budget_bytes=int(args.cache_budget_gb * 1024 ** 3),
+        cache_max_age=int(args.cache_max_age * 86400),
+    )
+    report = gc.collect(dry_run=args.dry_run)
+
+    for action in report['actions']:
+        icon = '🔍' if report['dry_run'] else ('✅' if action['applied'] else '⏭️')
+        print(f"{icon} {action['action']:<6} {action['bytes'] / 1024 ** 2:9.1f} MB  "
+              f"{action['path']}  ({action['reason']})")
+    verb = "可回收" if report['dry_run'] else "已回收"
+    print(f"\n📊 {report['projects']} 个项目（{report['protected']} 个受保护），"
+          f"共 {report['total_bytes'] / 1024 ** 3:.2f} GB / 预算 {report['budget_bytes'] / 1024 ** 3:.2f} GB，"
+          f"共享缓存 {report['cache_bytes'] / 1024 ** 3:.2f} GB / 预算 {report['cache_budget_bytes'] / 1024 ** 3:.2f} GB，"
+          f"{verb} {report['reclaimed_bytes'] / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Prompt 组装 - 模板只加载、校验一次，文件修改后自动重新加载
+
+以前 V0ApiIntegration 和 V0CompletePipeline 每个请求都重新读取 prompt.txt：
+前者用 template.format(problem=...)，而 prompt.txt 里的占位符是 <problem>，问题内容根本没有插入；
+后者用 str.replace 插入。这里：
+
+1. 模板加载时校验恰好有一个占位符（{problem} 或 <problem>），并预先切分为 head / tail，
+   组装只是一次字符串拼接
+2. 每次组装前最多每 check_interval 秒 stat 一次文件，mtime 或大小变化时重新加载；
+   新模板无效时继续使用上一个有效版本
+3. 模板内容的哈希作为版本号写入响应缓存键（prompt_key），修改模板后旧的生成结果不会再被命中
+
+用法:
+    python prompt_assembler.py                       # 显示模板版本和占位符
+    python prompt_assembler.py --problem "..."       # 输出组装后的 prompt
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import hash_prompt
+
+DEFAULT_TEMPLATE_PATH = Path(os.environ.get('V0_PROMPT_TEMPLATE', Path(__file__).parent / "prompt.txt"))
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# 模板无法加载时使用
+FALLBACK_TEMPLATE = """请根据以下问题创建一个交互式教育网页：
+
+问题：{problem}
+
+要求：
+1. 使用Next.js和React创建
+2. 包含交互式元素
+3. 提供步骤式教学
+4. 包含可视化图表
+5. 适合教学使用"""
+
+# <problem> 后面可能已经有一个空的 </problem>
+_PLACEHOLDER_RE = re.compile(r"\{problem\}|<problem>(?:\s*</problem>)?")
+
+
+class PromptTemplateError(ValueError):
+    """模板不存在或占位符不合法"""
+
+
+class PromptTemplate:
+    def __init__(self, text: str, source: str = '<string>'):
+        text = text.strip()
+        matches = list(_PLACEHOLDER_RE.finditer(text))
+        if len(matches) != 1:
+            raise PromptTemplateError(
+                f"{source}: 需要恰好一个 {{problem}} 或 <problem> 占位符，找到 {len(matches)} 个")
+        match = matches[0]
+        self.source = source
+        self.placeholder = '{problem}' if match.group(0) == '{problem}' else '<problem>'
+        self.head = text[:match.start()]
+        self.tail = text[match.end():]
+        if self.placeholder == '<problem>':
+            self.head += '<problem>\n'
+            self.tail = '\n</problem>' + self.tail
+        self.version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+    def render(self, problem: str) -> str:
+        return self.head + problem + self.tail
+
+    def __len__(self) -> int:
+        return len(self.head) + len(self.tail)
+
+
+class PromptAssembler:
+    def __init__(self, path: Optional[Path] = None, check_interval: float = DEFAULT_CHECK_INTERVAL,
+                 fallback: Optional[str] = FALLBACK_TEMPLATE):
+        self.path = Path(path or DEFAULT_TEMPLATE_PATH)
+        self.check_interval = check_interval
+        self.fallback = PromptTemplate(fallback, '<fallback>') if fallback else None
+        self._template: Optional[PromptTemplate] = None
+        self._stat_key = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        """文件变化时重新加载；调用方持有 _lock"""
+        try:
+            stat = self.path.stat()
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            if stat_key == self._stat_key:
+                return
+            template = PromptTemplate(self.path.read_text(encoding='utf-8'), str(self.path))
+        except (OSError, PromptTemplateError) as e:
+            if self._template is None and self.fallback is None:
+                raise PromptTemplateError(str(e)) from e
+            if self._stat_key != 'error':
+                using = '上一个有效版本' if self._template else '内置模板'
+                print(f"⚠️ prompt 模板加载失败，继续使用{using}: {e}", file=sys.stderr)
+                self._stat_key = 'error'
+            return
+        if self._template is not None:
+            print(f"🔄 prompt 模板已更新: {self._template.version} -> {template.version}", file=sys.stderr)
+        self._template, self._stat_key = template, stat_key
+
+    def template(self) -> PromptTemplate:
+        """当前模板；距离上次检查超过 check_interval 时检查文件是否变化"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    self._reload()
+                    self._next_check = now + self.check_interval
+        return self._template or self.fallback
+
+    @property
+    def version(self) -> str:
+        return self.template().version
+
+    def assemble(self, problem: str) -> str:
+        return self.template().render(problem)
+
+    def prompt_key(self, problem: str) -> str:
+        """响应缓存键：问题内容 + 模板版本"""
+        return hash_prompt(problem, self.version)
+
+
+_default_assembler: Optional[PromptAssembler] = None
+_default_assembler_lock = threading.Lock()
+
+
+def get_assembler() -> PromptAssembler:
+    """进程内共享的 prompt 组装器"""
+    global _default_assembler
+    with _default_assembler_lock:
+        if _default_assembler is None:
+            _default_assembler = PromptAssembler()
+        return _default_assembler
+
+
+def prompt_key(problem: str) -> str:
+    return get_assembler().prompt_key(problem)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="prompt 模板组装")
+    parser.add_argument("--template", default=None, help="模板路径（默认 prompt.txt）")
+    parser.add_argument("--problem", default=None, help="问题内容，输出组装后的 prompt")
+    args = parser.parse_args()
+
+    assembler = PromptAssembler(args.template, fallback=None)
+    try:
+        template = assembler.template()
+    except PromptTemplateError as e:
+        sys.exit(f"❌ {e}")
+    if args.problem is not None:
+        print(template.render(args.problem))
+        return
+    print(f"📄 {template.source}  版本 {template.version}  占位符 {template.placeholder}  "
+          f"{len(template)} 字符")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+开发服务器就绪检测
+
+取代固定的 time.sleep(5) / 每 0.5 秒轮询 stdout：
+1. 增量读取服务器日志，发现 "Ready" 后立即开始 HTTP 探测，发现致命错误立即失败
+2. HTTP 探测使用指数退避（100ms 起步，最长 1s），首个页面编译完成返回 2xx/3xx 即刻返回
+3. 返回实测的就绪耗时
+"""
+
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.request import urlopen
+from urllib.error import URLError, HTTPError
+
+READY_MARKERS = re.compile(r'Ready in|Local:|started server on|✓ Compiled')
+FATAL_MARKERS = re.compile(r'EADDRINUSE|Cannot find module|command not found|ERR_MODULE_NOT_FOUND|npm ERR!')
+COMPILE_ERROR_MARKERS = re.compile(r'Failed to compile|Module not found|Type error:|SyntaxError|⨯ ')
+
+
+def probe_http(url: str, timeout: float = 5) -> Tuple[bool, Optional[int]]:
+    """单次 HTTP 探测"""
+    try:
+        with urlopen(url, timeout=timeout) as resp:
+            code = resp.getcode()
+            return 200 <= code < 400, code
+    except HTTPError as e:
+        return False, e.code
+    except (URLError, ConnectionError, TimeoutError, OSError):
+        return False, None
+
+
+def wait_http_ok(url: str, timeout_sec: float = 40,
+                 initial_delay: float = 0.1, max_delay: float = 1.0,
+                 is_alive: Optional[Callable[[], bool]] = None) -> Tuple[bool, Optional[int]]:
+    """带指数退避的 HTTP 探测，直到返回 2xx/3xx 或超时"""
+    deadline = time.time() + timeout_sec
+    delay = initial_delay
+    last_code = None
+    while time.time() < deadline:
+        ok, code = probe_http(url, timeout=max(1.0, min(10.0, deadline - time.time())))
+        if code is not None:
+            last_code = code
+        if ok:
+            return True, last_code
+        if is_alive and not is_alive():
+            break
+        time.sleep(min(delay, max(0.0, deadline - time.time())))
+        delay = min(delay * 2, max_delay)
+    return False, last_code
+
+
+class _LogWatcher:
+    """增量读取日志文件（只读取新增部分）"""
+
+    def __init__(self, log_path: Optional[Path], on_line: Optional[Callable[[str], None]] = None):
+        self.log_path = Path(log_path) if log_path else None
+        self.on_line = on_line
+        self.offset = 0
+        self.pending = ''
+        self.ready = False
+        self.fatal = None
+        self.compile_error = None
+
+    def poll(self):
+        if not self.log_path or not self.log_path.exists():
+            return
+        try:
+            with open(self.log_path, 'r', encoding='utf-8', errors='replace') as f:
+                f.seek(self.offset)
+                chunk = f.read()
+                self.offset = f.tell()
+        except OSError:
+            return
+        if not chunk:
+            return
+        lines = (self.pending + chunk).split('\n')
+        self.pending = lines.pop()
+        for line in lines:
+            if self.on_line:
+                self.on_line(line)
+            if READY_MARKERS.search(line):
+                self.ready = True
+            if not self.fatal and FATAL_MARKERS.search(line):
+                self.fatal = line.strip()
+            if not self.compile_error and COMPILE_ERROR_MARKERS.search(line):
+                self.compile_error = line.strip()
+
+
+def wait_for_dev_server(url: str, log_path: Optional[Path] = None,
+                        is_alive: Optional[Callable[[], bool]] = None,
+                        timeout_sec: float = 45,
+                        on_line: Optional[Callable[[str], None]] = None,
+                        initial_delay: float = 0.1, max_delay: float = 1.0) -> Dict:
+    """等待开发服务器就绪（首个页面编译完成并返回 2xx/3xx）
+
+    返回 {'ready', 'status', 'elapsed', 'reason'}
+    """
+    start = time.time()
+    deadline = start + timeout_sec
+    watcher = _LogWatcher(log_path, on_line)
+    delay = initial_delay
+    last_code = None
+
+    def _result(ready: bool, reason: str) -> Dict:
+        return {
+            'ready': ready,
+            'status': last_code,
+            'elapsed': round(time.time() - start, 3),
+            'reason': reason,
+        }
+
+    while time.time() < deadline:
+        was_ready = watcher.ready
+        watcher.poll()
+        if watcher.ready and not was_ready:
+            delay = initial_delay
+        if watcher.fatal:
+            return _result(False, watcher.fatal)
+        if is_alive and not is_alive():
+            watcher.poll()
+            return _result(False, watcher.fatal or 'process exited')
+
+        # 没有日志可看时直接探测；有日志时等到 Ready 标记出现再探测，避免无谓的连接失败
+        # （日志格式不认识时，几秒后也开始探测）
+        if watcher.ready or not log_path or time.time() - start > 3:
+            ok, code = probe_http(url, timeout=max(1.0, min(30.0, deadline - time.time())))
+            if code is not None:
+                last_code = code
+            if ok:
+                return _result(True, 'ok')
+            watcher.poll()
+            if code and code >= 500 and watcher.compile_error:
+                return _result(False, watcher.compile_error)
+
+        time.sleep(min(delay, max(0.0, deadline - time.time())))
+        delay = min(delay * 2, max_delay)
+
+    return _result(False, 'timeout')
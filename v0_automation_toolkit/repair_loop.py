@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+编译错误修复循环 - 类型检查失败时先本地修复，再只针对出错的文件重新调用 v0
+
+以前 Smoke Test 失败后只能打印人工修复建议，要么手改，要么整个问题重新生成
+（完整 prompt + 全部文件，几分钟、上万 token）。这里每一轮：
+
+1. ts_validator 只对响应中提取出的文件运行 tsc --noEmit，
+   把输出解析成 {file, line, column, code, message}
+2. 本地修复：缺失的名字按导出索引补全导入，缺失的模块交给依赖检测安装，
+   然后对出错的文件重新跑一遍 fix_rules
+3. 仍有错误的文件：只把这个文件和它的错误发给 call_v0（很小的 prompt），
+   用返回的代码块替换该文件
+
+用法:
+    python repair_loop.py generated_projects/<项目名>            # 检查并修复
+    python repair_loop.py generated_projects/<项目名> --check    # 只检查
+    python repair_loop.py generated_projects/<项目名> --no-model # 只做本地修复
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from export_index import load_export_index
+from fix_rules import import_from_index
+from ts_validator import get_validator, generated_files, format_error, TsValidator
+
+DEFAULT_MAX_ROUNDS = int(os.environ.get('V0_REPAIR_ROUNDS', 2))
+# 每轮最多重新生成的文件数：错误集中在一两个文件时最划算，太多说明整体生成有问题
+MAX_FILES_PER_ROUND = 3
+# 每个文件发给模型的错误条数
+MAX_ERRORS_PER_FILE = 20
+_NAME_IN_MESSAGE_RE = re.compile(r"Cannot find name '([A-Za-z_$][\w$]*)'")
+_MODULE_IN_MESSAGE_RE = re.compile(r"Cannot find module '([^']+)'")
+_CODE_BLOCK_RE = re.compile(r"```[^\n]*\n(.*?)```", re.DOTALL)
+# Cannot find name / Did you mean / Cannot find namespace
+MISSING_NAME_CODES = {'TS2304', 'TS2552', 'TS2503'}
+MISSING_MODULE_CODES = {'TS2307'}
+
+REPAIR_PROMPT = """The following file from a Next.js (App Router, TypeScript, Tailwind CSS, shadcn/ui) project does not compile.
+Fix only the errors listed below and keep everything else unchanged.
+Reply with the complete corrected file in a single code block and nothing else.
+
+File: {path}
+
+Errors:
+{errors}
+
+```{lang}
+{content}
+```"""
+
+
+def extract_code_block(text: str) -> Optional[str]:
+    """模型回复中最长的代码块"""
+    blocks = _CODE_BLOCK_RE.findall(text or '')
+    if not blocks:
+        return None
+    code = max(blocks, key=len).strip('\n')
+    return code + '\n' if code.strip() else None
+
+
+class RepairLoop:
+    def __init__(self, builder, call_model: Optional[Callable[[str], str]] = None,
+                 max_rounds: int = DEFAULT_MAX_ROUNDS, use_model: bool = True,
+                 validator: Optional[TsValidator] = None):
+        self.builder = builder
+        self.validator = validator or get_validator()
+        self._call_model = call_model
+        self.max_rounds = max_rounds
+        self.use_model = use_model
+
+    def call_model(self, prompt: str) -> str:
+        if self._call_model is None:
+            # 延迟导入：只做类型检查和本地修复时不需要 API 客户端
+            from v0_api_call import call_v0
+            self._call_model = call_v0
+        return self._call_model(prompt)
+
+    # ------------------------------------------------------------------
+    # 类型检查
+    # ------------------------------------------------------------------
+    def type_check(self, project_path: Path, files: List[str]) -> Dict:
+        return self.validator.validate(project_path, files, log_path=self.builder._log_path(project_path, 'type-check'),
+                                       cancel_event=self.builder.cancel_event)
+
+    # ------------------------------------------------------------------
+    # 修复
+    # ------------------------------------------------------------------
+    def local_fix(self, project_path: Path, rel: str, errors: List[Dict]) -> bool:
+        """不调用模型的修复，返回文件是否有变化"""
+        path = project_path / rel
+        before = path.read_text(encoding='utf-8')
+        content = before
+
+        missing = []
+        for error in errors:
+            match = _NAME_IN_MESSAGE_RE.search(error['message'])
+            if match and error.get('code') in MISSING_NAME_CODES | {None}:
+                missing.append(match.group(1))
+        if missing:
+            content, resolved = import_from_index(content, missing, load_export_index(project_path))
+            if resolved:
+                print(f"  - 🔧 {rel}: 补全导入 {', '.join(resolved)}")
+        if content != before:
+            path.write_text(content, encoding='utf-8')
+
+        # 依赖安装不改文件内容，但同样需要重新检查
+        installed = any(e.get('code') in MISSING_MODULE_CODES and _MODULE_IN_MESSAGE_RE.search(e['message'])
+                        for e in errors)
+        if installed:
+            self.builder._detect_and_install_missing_dependencies(project_path, only_files=[path])
+        self.builder._post_process_files(project_path, only_files=[path])
+        return installed or path.read_text(encoding='utf-8') != before
+
+    def regenerate_file(self, project_path: Path, rel: str, errors: List[Dict]) -> bool:
+        """只把出错的文件和错误发给模型，用返回的代码替换文件"""
+        path = project_path / rel
+        content = path.read_text(encoding='utf-8')
+        prompt = REPAIR_PROMPT.format(
+            path=rel,
+            errors='\n'.join(f"- line {e['line']}: {e['message']}" for e in errors[:MAX_ERRORS_PER_FILE]),
+            lang=path.suffix.lstrip('.'),
+            content=content.rstrip('\n'),
+        )
+        print(f"  - 🤖 重新生成 {rel} ({len(errors)} 个错误, prompt {len(prompt)} 字符)")
+        try:
+            reply = self.call_model(prompt)
+        except Exception as e:
+            print(f"  - ❌ 调用模型失败: {e}")
+            return False
+        fixed = extract_code_block(reply)
+        if not fixed or fixed == content:
+            print(f"  - ⚠️ {rel}: 模型没有返回可用的代码")
+            return False
+        path.write_text(fixed, encoding='utf-8')
+        self.builder._post_process_files(project_path, only_files=[path])
+        return True
+
+    def run(self, project_path: Path, files: Optional[List[str]] = None) -> Dict:
+        """检查并修复，返回报告"""
+        project_path = Path(project_path)
+        start = time.time()
+        files = files or generated_files(project_path)
+        report = {'status': 'skipped', 'rounds': 0, 'initial_errors': 0, 'remaining_errors': [],
+                  'local_fixes': [], 'regenerated': [], 'elapsed': 0.0}
+        if not files or not (project_path / 'node_modules').is_dir():
+            report['reason'] = 'no generated files' if not files else 'node_modules missing'
+            return report
+
+        print(f"🩺 类型检查 {len(files)} 个生成的文件...")
+        check = self.type_check(project_path, files)
+        if check['status'] == 'unavailable':
+            print(f"⚠️ 类型检查无法运行，跳过修复: {check['tail']}")
+            report['reason'] = 'type check unavailable'
+            report['elapsed'] = round(time.time() - start, 3)
+            return report
+        report['initial_errors'] = len(check['errors'])
+
+        while check['status'] == 'failed' and report['rounds'] < self.max_rounds:
+            report['rounds'] += 1
+            by_file: Dict[str, List[Dict]] = {}
+            for error in check['errors']:
+                by_file.setdefault(error['file'], []).append(error)
+            print(f"🔁 第 {report['rounds']} 轮: {len(check['errors'])} 个错误，分布在 {len(by_file)} 个文件")
+
+            changed = [rel for rel, errors in by_file.items() if self.local_fix(project_path, rel, errors)]
+            report['local_fixes'].extend(rel for rel in changed if rel not in report['local_fixes'])
+            if changed:
+                check = self.type_check(project_path, files)
+                if check['status'] != 'failed':
+                    break
+                by_file = {}
+                for error in check['errors']:
+                    by_file.setdefault(error['file'], []).append(error)
+
+            if not self.use_model:
+                continue
+            # 错误最少的文件最可能一次修好，优先处理
+            targets = sorted(by_file, key=lambda rel: len(by_file[rel]))[:MAX_FILES_PER_ROUND]
+            regenerated = [rel for rel in targets if self.regenerate_file(project_path, rel, by_file[rel])]
+            report['regenerated'].extend(rel for rel in regenerated if rel not in report['regenerated'])
+            if not regenerated:
+                break
+            check = self.type_check(project_path, files)
+
+        report['remaining_errors'] = [format_error(e) for e in check['errors']]
+        if check['ok']:
+            report['status'] = 'passed' if report['rounds'] == 0 else 'repaired'
+        else:
+            report['status'] = 'failed'
+        report['elapsed'] = round(time.time() - start, 3)
+        icon = {'passed': '✅', 'repaired': '🩹', 'failed': '❌'}[report['status']]
+        print(f"{icon} 类型检查 {report['status']}: {report['initial_errors']} -> {len(check['errors'])} 个错误 "
+              f"({report['rounds']} 轮, {report['elapsed']}s)")
+        for line in report['remaining_errors'][:5]:
+            print(f"   {line}")
+        return report
+
+
+def main():
+    from auto_project_builder import AutoProjectBuilder
+
+    parser = argparse.ArgumentParser(description="类型检查生成的文件，本地修复或只针对出错文件重新调用 v0")
+    parser.add_argument("project_path", help="项目目录")
+    parser.add_argument("--check", action="store_true", help="只检查，不修复")
+    parser.add_argument("--no-model", action="store_true", help="只做本地修复，不调用 v0")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_MAX_ROUNDS, help="最多修复轮数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args()
+
+    loop = RepairLoop(AutoProjectBuilder(), max_rounds=0 if args.check else args.rounds,
+                      use_model=not args.no_model)
+    report = loop.run(Path(args.project_path))
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report['status'] in ('passed', 'repaired') else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+响应归档 - 只追加的压缩段文件 + 偏移索引
+
+以前每个 v0 响应单独保存为一个缩进的 JSON 文件（responses/*.json、可能的响应/*.raw.txt），
+响应很大（最多 16k tokens）且包含大量重复的样板代码。这里改为：
+1. 每条记录单独压缩成一个帧（安装了 zstandard 用 zstd，否则 gzip），追加到段文件
+   segment-00001.zst / .gz，段文件超过 segment_max_bytes 后滚动到下一个
+2. index.jsonl 记录 id -> (段文件, 偏移, 长度)，按 id 读取只需一次 seek + 解压一个帧
+3. iter_records() 按写入顺序顺序读取段文件，用于重放和基准测试
+
+写入在文件锁内进行，多个进程可以同时追加；响应引用统一写成 archive://<id>，
+旧的文件路径仍然可以通过 read_response_text() 读取。
+
+用法:
+    python response_archive.py stats
+    python response_archive.py get <id>
+    python response_archive.py import responses/*.json
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from file_lock import file_lock
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = Path(os.environ.get('V0_RESPONSE_ARCHIVE', Path(__file__).parent / "response_archive"))
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+ARCHIVE_SCHEME = 'archive://'
+
+
+def _codec_suffix() -> str:
+    return '.zst' if zstandard else '.gz'
+
+
+def _compress(data: bytes, suffix: str) -> bytes:
+    if suffix == '.zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    # mtime=0 使相同内容产生相同的帧
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(frame: bytes, suffix: str) -> bytes:
+    if suffix == '.zst':
+        if zstandard is None:
+            raise RuntimeError("读取 .zst 段文件需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return gzip.decompress(frame)
+
+
+class ResponseArchive:
+    def __init__(self, root: Optional[Path] = None, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.root = Path(root or DEFAULT_ARCHIVE_DIR)
+        self.index_path = self.root / "index.jsonl"
+        self.lock_path = self.root / ".archive.lock"
+        self.segment_max_bytes = segment_max_bytes
+        self._index: Dict[str, Dict] = {}
+        self._order: List[str] = []
+        self._index_offset = 0
+        self._index_stat: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+    def _refresh_index(self):
+        """增量读取 index.jsonl 中其他进程新追加的记录"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                self._index_stat = (st.st_size, st.st_mtime_ns)
+                if st.st_size < self._index_offset:
+                    # 索引被重建，从头读取
+                    self._index.clear()
+                    self._order.clear()
+                    self._index_offset = 0
+                f.seek(self._index_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 写了一半的行，下次再读
+                    self._index_offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry['id'] not in self._index:
+                        self._order.append(entry['id'])
+                    self._index[entry['id']] = entry
+        except FileNotFoundError:
+            pass
+
+    def _index_changed(self) -> bool:
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return False
+        return (st.st_size, st.st_mtime_ns) != self._index_stat
+
+    def _lookup(self, record_id: str) -> Optional[Dict]:
+        """按 id 查找索引条目；索引文件的大小或 mtime 变化时先刷新，其他进程重复追加的 id 以最新一条为准"""
+        with self._lock:
+            if record_id not in self._index or self._index_changed():
+                self._refresh_index()
+            return self._index.get(record_id)
+
+    def _current_segment(self) -> Path:
+        suffix = _codec_suffix()
+        if self._order:
+            last = self.root / self._index[self._order[-1]]['segment']
+            if last.suffix == suffix and last.exists() and last.stat().st_size < self.segment_max_bytes:
+                return last
+        number = len(list(self.root.glob('segment-*'))) + 1
+        return self.root / f"segment-{number:05d}{suffix}"
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+    def append(self, content: str, record_id: Optional[str] = None, meta: Optional[Dict] = None) -> str:
+        """追加一条响应，返回记录 id（同一 id 重复写入时以最后一次为准）"""
+        data = content.encode('utf-8')
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path), self._lock:
+            self._refresh_index()
+            record_id = record_id or f"generated_{time.time_ns()}"
+            segment = self._current_segment()
+            frame = _compress(data, segment.suffix)
+            with open(segment, 'ab') as f:
+                offset = f.tell()
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {
+                'id': record_id,
+                'segment': segment.name,
+                'offset': offset,
+                'length': len(frame),
+                'size': len(data),
+                'created_at': time.time(),
+            }
+            if meta:
+                entry['meta'] = meta
+            # 先写段文件再写索引：崩溃时最多留下一个没有索引的帧
+            with open(self.index_path, 'ab') as f:
+                f.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh_index()
+        return record_id
+
+    def get(self, record_id: str) -> Optional[str]:
+        entry = self._lookup(record_id)
+        if entry is None:
+            return None
+        segment = self.root / entry['segment']
+        with open(segment, 'rb') as f:
+            f.seek(entry['offset'])
+            frame = f.read(entry['length'])
+        return _decompress(frame, segment.suffix).decode('utf-8')
+
+    def __contains__(self, record_id: str) -> bool:
+        return self._lookup(record_id) is not None
+
+    def iter_records(self) -> Iterator[Tuple[str, str]]:
+        """按写入顺序流式读取全部记录 (id, content)，每个段文件只打开一次"""
+        entries = self.list_records()
+        handle, handle_name = None, None
+        try:
+            for entry in entries:
+                if entry['segment'] != handle_name:
+                    if handle:
+                        handle.close()
+                    handle = open(self.root / entry['segment'], 'rb')
+                    handle_name = entry['segment']
+                handle.seek(entry['offset'])
+                frame = handle.read(entry['length'])
+                yield entry['id'], _decompress(frame, Path(handle_name).suffix).decode('utf-8')
+        finally:
+            if handle:
+                handle.close()
+
+    def list_records(self) -> List[Dict]:
+        """按写入顺序返回索引条目"""
+        with self._lock:
+            self._refresh_index()
+            return [self._index[record_id] for record_id in self._order]
+
+    def stats(self) -> Dict:
+        entries = self.list_records()
+        segments = list(self.root.glob('segment-*'))
+        return {
+            'records': len(entries),
+            'segments': len(segments),
+            'raw_bytes': sum(e['size'] for e in entries),
+            'stored_bytes': sum(s.stat().st_size for s in segments),
+        }
+
+
+_default_archive: Optional[ResponseArchive] = None
+_default_archive_lock = threading.Lock()
+
+
+def get_archive() -> ResponseArchive:
+    """进程内共享的默认归档"""
+    global _default_archive
+    with _default_archive_lock:
+        if _default_archive is None:
+            _default_archive = ResponseArchive()
+        return _default_archive
+
+
+def archive_ref(record_id: str) -> str:
+    return f"{ARCHIVE_SCHEME}{record_id}"
+
+
+def read_response_text(ref) -> str:
+    """读取响应内容：archive://<id> 从归档读取，其他按文件路径读取"""
+    ref = str(ref)
+    if ref.startswith(ARCHIVE_SCHEME):
+        content = get_archive().get(ref[len(ARCHIVE_SCHEME):])
+        if content is None:
+            raise FileNotFoundError(f"归档中不存在响应: {ref}")
+        return content
+    with open(ref, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def response_exists(ref) -> bool:
+    ref = str(ref)
+    if ref.startswith(ARCHIVE_SCHEME):
+        return ref[len(ARCHIVE_SCHEME):] in get_archive()
+    return Path(ref).exists()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v0 响应归档")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="显示归档统计")
+    sub.add_parser("list", help="列出全部记录")
+    get = sub.add_parser("get", help="输出一条记录")
+    get.add_argument("record_id")
+    imp = sub.add_parser("import", help="把旧的响应文件导入归档")
+    imp.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    archive = get_archive()
+    if args.command == "stats":
+        stats = archive.stats()
+        ratio = stats['stored_bytes'] / stats['raw_bytes'] if stats['raw_bytes'] else 0
+        print(f"📦 {stats['records']} 条记录，{stats['segments']} 个段文件，"
+              f"{stats['raw_bytes'] / 1024:.1f} KB -> {stats['stored_bytes'] / 1024:.1f} KB ({ratio:.0%})")
+    elif args.command == "list":
+        for entry in archive.list_records():
+            print(f"{entry['id']:<40} {entry['size']:>8} B  {entry['segment']}")
+    elif args.command == "get":
+        content = archive.get(args.record_id)
+        if content is None:
+            sys.exit(f"❌ 不存在: {args.record_id}")
+        print(content)
+    elif args.command == "import":
+        for file_path in args.files:
+            path = Path(file_path)
+            record_id = path.name.split('.')[0]
+            archive.append(path.read_text(encoding='utf-8'), record_id, meta={'source': str(path)})
+            print(f"✅ {path} -> {archive_ref(record_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+响应文件提取 - 把 v0 响应解析成 {路径: 文件内容}、依赖安装命令和 shadcn-ui 命令
+
+以前只有 AutoProjectBuilder.extract_files_from_response(file_path)：只接受文件路径，
+整个文件读入内存，提取到的命令写进构建器的 setup_commands / extracted_dependencies /
+extracted_shadcn_commands，同一个构建器不能在多个线程中同时提取。这里：
+
+1. extract_response() 接受 str、bytes 或分块的迭代器（流式响应、socket、文件按块读取），
+   bytes 用增量 UTF-8 解码器处理，多字节字符可以跨块
+2. 没有任何共享状态，返回不可变的 ExtractionResult（文件、依赖命令、shadcn 命令、shell 命令、
+   解析诊断），可以在线程间共享，也可以 pickle 后交给其他进程
+3. 不打印任何内容，解析过程中的判断记录在 diagnostics 中，由调用方决定是否输出
+
+用法:
+    python response_extraction.py responses/<响应>.json
+    python response_extraction.py archive://<记录ID> --json
+    cat response.json | python response_extraction.py -
+"""
+
+import os
+import re
+import sys
+import json
+import codecs
+import argparse
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import lazy_re
+
+Chunk = Union[str, bytes, bytearray]
+ResponseInput = Union[str, bytes, bytearray, Iterable[Chunk]]
+
+FORMAT_JSON_FILES = 'json_files'
+FORMAT_MARKDOWN = 'markdown'
+
+THINKING_START = '<Thinking>'
+THINKING_END = '</Thinking>'
+# 没有 </Thinking> 时，从这些标记处开始取实际内容
+CONTENT_MARKERS = ("Here's the implementation:", "I'll create", '```', 'Let me create')
+
+LANGUAGE_BY_SUFFIX = {
+    '.tsx': 'tsx',
+    '.ts': 'typescript',
+    '.js': 'javascript',
+    '.jsx': 'jsx',
+    '.css': 'css',
+    '.json': 'json',
+    '.md': 'markdown',
+    '.py': 'python',
+    '.html': 'html',
+}
+
+_JSON_FILES_BLOCK_RE = lazy_re.compile(r'```json\s*\n(\{.*?\n\})\s*\n```', re.DOTALL)
+_BASH_BLOCK_RE = lazy_re.compile(r'```bash\s*\n(.*?)\n```', re.DOTALL)
+_EXPORT_DEFAULT_FUNCTION_RE = lazy_re.compile(r'export\s+default\s+function\s+(\w+)')
+_FUNCTION_RE = lazy_re.compile(r'function\s+(\w+)')
+_UPPER_RE = lazy_re.compile(r'([A-Z])')
+
+# Markdown 代码块的解析模式（优先级从高到低，同一段代码只取第一次匹配）
+MARKDOWN_PATTERNS = [
+    # 1. 带 file="" 属性的代码块
+    (lazy_re.compile(r'```(\w+)\s+file="([^"]+)"\s*\n(.*?)\n```', re.DOTALL), 'explicit_file'),
+    # 2. Markdown标题定义的代码块
+    (lazy_re.compile(r'####\s*`([^`]+)`\s*\n```(\w+)?\s*\n(.*?)\n```', re.DOTALL), 'markdown_header'),
+    # 3. Shell命令块
+    (lazy_re.compile(r'```(?:sh|bash)\s*\n(.*?)\n```', re.DOTALL), 'shell_commands'),
+    # 4. package.json
+    (lazy_re.compile(r'```json\s*\n(\{.*?"name":.*?\})\s*\n```', re.DOTALL), 'package_json'),
+    # 5. TSX组件
+    (lazy_re.compile(r'```tsx\s*\n(.*?)\n```', re.DOTALL), 'tsx_component'),
+    # 6. TypeScript文件
+    (lazy_re.compile(r'```(?:ts|typescript)\s*\n(.*?)\n```', re.DOTALL), 'typescript_file'),
+    # 7. CSS文件
+    (lazy_re.compile(r'```css\s*\n(.*?)\n```', re.DOTALL), 'css_file'),
+]
+
+
+class ExtractedFile(NamedTuple):
+    path: str
+    content: str
+    language: str
+    source: str
+
+
+class Diagnostic(NamedTuple):
+    level: str  # info / warning
+    message: str
+
+
+class ExtractionResult(NamedTuple):
+    files: Tuple[ExtractedFile, ...]
+    dependency_commands: Tuple[str, ...]
+    shadcn_commands: Tuple[str, ...]
+    setup_commands: Tuple[str, ...]
+    diagnostics: Tuple[Diagnostic, ...]
+    format: str
+
+    @property
+    def paths(self) -> Tuple[str, ...]:
+        return tuple(f.path for f in self.files)
+
+    def get(self, path: str) -> Optional[ExtractedFile]:
+        return next((f for f in self.files if f.path == path), None)
+
+    def file_map(self) -> Dict[str, Dict]:
+        """{路径: {'content', 'language', 'source'}} 的新副本（构建器在此基础上增删文件）"""
+        return {f.path: {'content': f.content, 'language': f.language, 'source': f.source} for f in self.files}
+
+    def to_dict(self) -> Dict:
+        return {
+            'format': self.format,
+            'files': self.file_map(),
+            'dependency_commands': list(self.dependency_commands),
+            'shadcn_commands': list(self.shadcn_commands),
+            'setup_commands': list(self.setup_commands),
+            'diagnostics': [{'level': d.level, 'message': d.message} for d in self.diagnostics],
+        }
+
+
+# ----------------------------------------------------------------------
+# 输入
+# ----------------------------------------------------------------------
+class ResponseReader:
+    """逐块接收响应内容：feed() 若干次后 text() 得到完整文本"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.invalid_utf8 = False
+
+    def feed(self, chunk: Chunk):
+        if isinstance(chunk, (bytes, bytearray)):
+            text = self._decoder.decode(bytes(chunk))
+            self.invalid_utf8 = self.invalid_utf8 or '\ufffd' in text
+        else:
+            text = chunk
+        if text:
+            self._parts.append(text)
+
+    def text(self) -> str:
+        tail = self._decoder.decode(b'', final=True)
+        if tail:
+            self.invalid_utf8 = self.invalid_utf8 or '\ufffd' in tail
+            self._parts.append(tail)
+        text = ''.join(self._parts)
+        self._parts = [text]
+        return text
+
+
+def read_response(response: ResponseInput) -> Tuple[str, bool]:
+    """把 str / bytes / 分块迭代器读成文本，返回 (文本, 是否含有无效的 UTF-8)"""
+    if isinstance(response, str):
+        return response, False
+    reader = ResponseReader()
+    if isinstance(response, (bytes, bytearray)):
+        reader.feed(response)
+    else:
+        for chunk in response:
+            reader.feed(chunk)
+    return reader.text(), reader.invalid_utf8
+
+
+# ----------------------------------------------------------------------
+# 解析
+# ----------------------------------------------------------------------
+def infer_language(path: str) -> str:
+    """根据文件路径推断语言类型"""
+    return LANGUAGE_BY_SUFFIX.get(os.path.splitext(path)[1].lower(), 'text')
+
+
+def camel_to_kebab(name: str) -> str:
+    """将CamelCase转换为kebab-case"""
+    return _UPPER_RE.sub(r'-\1', name).lower().lstrip('-')
+
+
+def infer_component_filename(code: str, file_count: int) -> str:
+    """从TSX内容推断组件文件名：export default function 名称，其次第一个 function 名称"""
+    match = _EXPORT_DEFAULT_FUNCTION_RE.search(code) or _FUNCTION_RE.search(code)
+    if match:
+        return f'components/{camel_to_kebab(match.group(1))}.tsx'
+    return f'components/component-{file_count}.tsx'
+
+
+def unwrap_content(raw: str, diagnostics: List[Diagnostic]) -> str:
+    """JSON 包装格式 {"content": ...} 取出 content，并跳过开头的 <Thinking> 思考过程"""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        diagnostics.append(Diagnostic('info', '非JSON包装格式，直接解析'))
+        return raw
+    if not isinstance(data, dict) or not isinstance(data.get('content'), str):
+        return raw
+
+    diagnostics.append(Diagnostic('info', '检测到JSON包装格式，提取content字段'))
+    content = data['content']
+    if not content.startswith(THINKING_START):
+        return content
+
+    thinking_end = content.find(THINKING_END)
+    if thinking_end != -1:
+        content = content[thinking_end + len(THINKING_END):].strip()
+        diagnostics.append(Diagnostic('info', f'检测到v0新格式，跳过思考过程，实际内容长度: {len(content)}'))
+        return content
+    for marker in CONTENT_MARKERS:
+        marker_pos = content.find(marker)
+        if marker_pos != -1:
+            content = content[marker_pos:].strip()
+            diagnostics.append(Diagnostic('info', f"思考过程没有结束标签，从标记'{marker}'开始提取，长度: {len(content)}"))
+            return content
+    diagnostics.append(Diagnostic('warning', '思考过程没有结束标签，也未找到合适的内容开始位置，使用原始内容'))
+    return content
+
+
+def extract_commands(content: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """bash 代码块中的 (npm install 命令, shadcn-ui 命令)"""
+    dependency_commands, shadcn_commands = [], []
+    for block in _BASH_BLOCK_RE.findall(content):
+        for line in block.strip().split('\n'):
+            line = line.strip()
+            if line.startswith('npm install '):
+                dependency_commands.append(line)
+            elif 'shadcn' in line.lower():
+                shadcn_commands.append(line)
+    return tuple(dependency_commands), tuple(shadcn_commands)
+
+
+def _extract_json_files(content: str, diagnostics: List[Diagnostic]) -> Optional[List[ExtractedFile]]:
+    """```json 代码块中的 {"files": [{"path", "content"}, ...]}；不是这种格式时返回 None"""
+    match = _JSON_FILES_BLOCK_RE.search(content)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(1))
+    except json.JSONDecodeError as e:
+        diagnostics.append(Diagnostic('warning', f'JSON格式解析失败，尝试传统Markdown格式: {e}'))
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('files'), list):
+        return None
+    files: Dict[str, ExtractedFile] = {}
+    for file_obj in data['files']:
+        if isinstance(file_obj, dict) and 'path' in file_obj and isinstance(file_obj.get('content'), str):
+            path = file_obj['path']
+            files[path] = ExtractedFile(path, file_obj['content'].strip(), infer_language(path), 'json_format')
+    return list(files.values())
+
+
+def _extract_markdown_files(content: str, setup_commands: List[str]) -> List[ExtractedFile]:
+    files: Dict[str, ExtractedFile] = {}
+    processed_code_blocks = set()
+    for pattern, source_type in MARKDOWN_PATTERNS:
+        for match in pattern.findall(content):
+            if source_type == 'explicit_file':
+                lang, filename, code = match
+            elif source_type == 'markdown_header':
+                filename, lang, code = match
+                lang = lang or 'tsx'
+            elif source_type == 'shell_commands':
+                setup_commands.extend(match.strip().split('\n'))
+                continue
+            elif source_type == 'package_json':
+                code, filename, lang = match, 'package.json', 'json'
+            else:
+                code, filename, lang = match, None, source_type.split('_')[0]
+
+            clean_code = code.strip()
+            if not clean_code or clean_code in processed_code_blocks:
+                continue
+            processed_code_blocks.add(clean_code)
+
+            # 推断文件名（如果没有明确指定）
+            if not filename:
+                if source_type == 'tsx_component':
+                    filename = infer_component_filename(clean_code, len(files))
+                elif source_type == 'typescript_file':
+                    if 'utils' in clean_code.lower() or 'cn(' in clean_code:
+                        filename = 'lib/utils.ts'
+                    else:
+                        filename = f'lib/helpers-{len(files)}.ts'
+                elif source_type == 'css_file':
+                    if '@tailwind' in clean_code:
+                        filename = 'app/globals.css'
+                    else:
+                        filename = f'styles/style-{len(files)}.css'
+
+            if filename and filename not in files:
+                files[filename] = ExtractedFile(filename, clean_code, lang, source_type)
+    return list(files.values())
+
+
+def extract_response(response: ResponseInput) -> ExtractionResult:
+    """从 v0 响应（str、bytes 或分块迭代器）中提取文件和命令"""
+    diagnostics: List[Diagnostic] = []
+    raw, invalid_utf8 = read_response(response)
+    if invalid_utf8:
+        diagnostics.append(Diagnostic('warning', '响应包含无效的 UTF-8 字节，已替换为 U+FFFD'))
+    content = unwrap_content(raw, diagnostics)
+    dependency_commands, shadcn_commands = extract_commands(content)
+    setup_commands: List[str] = []
+
+    files = _extract_json_files(content, diagnostics)
+    response_format = FORMAT_JSON_FILES
+    if files is None:
+        response_format = FORMAT_MARKDOWN
+        files = _extract_markdown_files(content, setup_commands)
+    if not files:
+        diagnostics.append(Diagnostic('warning', '未找到可提取的文件'))
+    return ExtractionResult(
+        files=tuple(files),
+        dependency_commands=dependency_commands,
+        shadcn_commands=shadcn_commands,
+        setup_commands=tuple(setup_commands),
+        diagnostics=tuple(diagnostics),
+        format=response_format,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 v0 响应中提取文件和依赖命令")
+    parser.add_argument("response", help="响应文件路径、archive://<记录ID>，或 - 从标准输入读取")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出（包含文件内容）")
+    args = parser.parse_args()
+
+    if args.response == '-':
+        result = extract_response(iter(lambda: sys.stdin.buffer.read(64 * 1024), b''))
+    else:
+        from response_archive import read_response_text
+        result = extract_response(read_response_text(args.response))
+
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+        return
+    for diagnostic in result.diagnostics:
+        print(f"{'⚠️' if diagnostic.level == 'warning' else '📋'} {diagnostic.message}")
+    print(f"📊 {result.format}: 提取了 {len(result.files)} 个文件")
+    for extracted in result.files:
+        print(f"   {extracted.path:<40} {extracted.language:<12} {len(extracted.content):>7} 字符  ({extracted.source})")
+    for command in result.dependency_commands:
+        print(f"📦 {command}")
+    for command in result.shadcn_commands:
+        print(f"🎨 {command}")
+    sys.exit(0 if result.files else 1)
+
+
+if __name__ == "__main__":
+    main()
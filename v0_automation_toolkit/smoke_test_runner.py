@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+批量 Smoke Test - 模板修改后并行重新验证 generated_projects 下的所有项目
+
+1. 有界线程池并发运行，每个项目从 PortAllocator 租用端口
+2. 使用 readiness 快速探测就绪，不再每秒轮询一次
+3. 扫描每个项目的 .smoke.log 提取编译错误
+4. 输出一份 JSON 报告；--mode build 时检查 next build 的结果而不是开发服务器，
+   --mode types 时只对生成的文件做类型检查（ts_validator，秒级）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from port_allocator import get_allocator
+from readiness import wait_for_dev_server
+from process_runner import kill_process_group
+from ts_validator import get_validator, format_error
+
+COMPILE_ERROR_PATTERN = re.compile(
+    r"Failed to compile|Module not found|Type error:|SyntaxError|ReferenceError|"
+    r"Error: |error TS\d+|Export .* doesn't exist|⨯ "
+)
+
+
+def scan_log_for_errors(log_path: Path, max_errors: int = 20) -> List[str]:
+    """从 .smoke.log 中提取编译错误行"""
+    errors = []
+    try:
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if COMPILE_ERROR_PATTERN.search(line):
+                    line = line.strip()
+                    if line and line not in errors:
+                        errors.append(line)
+                        if len(errors) >= max_errors:
+                            break
+    except OSError:
+        pass
+    return errors
+
+
+def _smoke_test_dev(project_path: Path, log_file: Path, timeout_sec: float, base_port: Optional[int]) -> Dict:
+    ports = get_allocator()
+    port = ports.lease(owner=f"smoke-test:{project_path}", start_port=base_port)
+    if not port:
+        return {'ok': False, 'http_status': None, 'reason': 'no free port'}
+    proc = None
+    try:
+        with open(log_file, 'w') as log:
+            proc = subprocess.Popen(
+                ['npx', 'next', 'dev', '--turbopack', '-p', str(port)],
+                cwd=str(project_path),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        ports.assign(port, proc.pid)
+        status = wait_for_dev_server(
+            f"http://localhost:{port}/",
+            log_path=log_file,
+            is_alive=lambda: proc.poll() is None,
+            timeout_sec=timeout_sec,
+            initial_delay=0.05,
+            max_delay=0.5,
+        )
+        return {'ok': status['ready'], 'http_status': status['status'], 'reason': status['reason'], 'port': port}
+    finally:
+        if proc:
+            kill_process_group(proc)
+        ports.release(port)
+
+
+def _smoke_test_build(project_path: Path, log_file: Path, timeout_sec: float) -> Dict:
+    with open(log_file, 'w') as log:
+        proc = subprocess.Popen(
+            ['npx', 'next', 'build'],
+            cwd=str(project_path),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            returncode = proc.wait(timeout=timeout_sec)
+        except subprocess.TimeoutExpired:
+            kill_process_group(proc)
+            return {'ok': False, 'http_status': None, 'reason': 'timeout'}
+    return {'ok': returncode == 0, 'http_status': None, 'reason': 'ok' if returncode == 0 else f'exit code {returncode}'}
+
+
+def _smoke_test_types(project_path: Path, log_file: Path, timeout_sec: float) -> Dict:
+    log_file.unlink(missing_ok=True)
+    result = get_validator().validate(project_path, log_path=log_file, timeout_sec=timeout_sec)
+    return {'ok': result['ok'], 'http_status': None, 'reason': result['status'],
+            'type_errors': [format_error(e) for e in result['errors']]}
+
+
+def smoke_test_project(project_path: Path, mode: str = 'dev', timeout_sec: float = 45,
+                       base_port: Optional[int] = None) -> Dict:
+    """对单个项目运行 Smoke Test，返回结果字典"""
+    project_path = Path(project_path)
+    start = time.time()
+    result = {'project': str(project_path), 'mode': mode}
+
+    if not (project_path / 'node_modules').is_dir():
+        result.update(status='skipped', reason='node_modules missing', elapsed=0.0, errors=[])
+        return result
+
+    log_file = project_path / '.smoke.log'
+    if mode == 'build':
+        outcome = _smoke_test_build(project_path, log_file, timeout_sec)
+    elif mode == 'types':
+        outcome = _smoke_test_types(project_path, log_file, timeout_sec)
+    else:
+        outcome = _smoke_test_dev(project_path, log_file, timeout_sec, base_port)
+
+    errors = outcome.pop('type_errors', None)
+    if errors is None:
+        errors = scan_log_for_errors(log_file)
+    result.update(outcome)
+    result['status'] = 'passed' if outcome['ok'] else 'failed'
+    result['elapsed'] = round(time.time() - start, 3)
+    result['errors'] = errors
+    result['log'] = str(log_file)
+    result.pop('ok')
+    return result
+
+
+def discover_projects(paths: List[str]) -> List[Path]:
+    """路径本身是项目（含 package.json）则直接使用，否则取其下一级子目录中的项目"""
+    projects = []
+    for raw in paths:
+        path = Path(raw)
+        if (path / 'package.json').exists():
+            projects.append(path)
+        elif path.is_dir():
+            projects.extend(sorted(p for p in path.iterdir() if (p / 'package.json').exists()))
+    return projects
+
+
+def run_batch(projects: List[Path], workers: int = 4, mode: str = 'dev', timeout_sec: float = 45) -> Dict:
+    """并行运行所有项目的 Smoke Test，返回汇总报告"""
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(smoke_test_project, p, mode, timeout_sec): p for p in projects}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'project': str(futures[future]), 'mode': mode, 'status': 'failed',
+                          'reason': str(e), 'errors': [], 'elapsed': 0.0}
+            icon = {'passed': '✅', 'failed': '❌', 'skipped': '⏭️'}[result['status']]
+            print(f"{icon} {Path(result['project']).name}: {result['status']} ({result['elapsed']}s) {result['reason']}",
+                  file=sys.stderr)
+            results.append(result)
+
+    results.sort(key=lambda r: r['project'])
+    return {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': mode,
+        'workers': workers,
+        'total': len(results),
+        'passed': sum(r['status'] == 'passed' for r in results),
+        'failed': sum(r['status'] == 'failed' for r in results),
+        'skipped': sum(r['status'] == 'skipped' for r in results),
+        'elapsed': round(time.time() - start, 3),
+        'results': results,
+    }
+
+
+def main():
+    default_dir = Path(__file__).parent / "generated_projects"
+    parser = argparse.ArgumentParser(description="批量并行 Smoke Test")
+    parser.add_argument("paths", nargs="*", default=[str(default_dir)], help="项目目录或包含项目的目录")
+    parser.add_argument("-j", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="并发数")
+    parser.add_argument("--mode", choices=["dev", "build", "types"], default="dev",
+                        help="检查开发服务器、next build 输出或只做类型检查")
+    parser.add_argument("--timeout", type=float, default=45, help="单个项目的超时时间（秒）")
+    parser.add_argument("-o", "--output", help="报告输出路径（默认输出到 stdout）")
+    args = parser.parse_args()
+
+    projects = discover_projects(args.paths)
+    print(f"🧪 共 {len(projects)} 个项目，并发 {args.workers}，模式 {args.mode}", file=sys.stderr)
+    report = run_batch(projects, workers=args.workers, mode=args.mode, timeout_sec=args.timeout)
+
+    report_json = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report_json, encoding='utf-8')
+        print(f"📄 报告已保存: {args.output}", file=sys.stderr)
+    else:
+        print(report_json)
+    sys.exit(0 if report['failed'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准 - 用 python -X importtime 测量各入口的冷启动导入时间
+
+server-example.py 和 route.ts 每个请求都新启动一次 v0_api_integration.py，导入时间直接计入每个请求。
+这里对每个入口模块启动若干个全新的解释器（python -X importtime -c "import <模块>"）：
+
+1. 取模块自身的累计导入时间和整个进程的耗时，报告中位数（单次测量受磁盘缓存和调度影响很大）
+2. 列出最重的直接依赖，定位新增的重量级导入
+3. IMPORT_BUDGET_MS 是各入口的导入时间预算，--check 超出预算时以非零状态退出
+
+用法:
+    python startup_bench.py                         # 测量所有入口
+    python startup_bench.py v0_api_integration -n 15
+    python startup_bench.py --check --json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TOOLKIT_DIR = Path(__file__).resolve().parent
+DEFAULT_RUNS = 7
+# 各入口模块的导入时间预算（毫秒，中位数）；httpx、readiness、smoke_test_runner 等按需导入后的实测值留出余量
+IMPORT_BUDGET_MS = {
+    'v0_api_integration': 45,
+    'build_worker': 50,
+    'v0_complete_pipeline': 45,
+    'auto_project_builder': 45,
+    'v0_api_call': 10,
+    'v0_automation_toolkit': 5,
+}
+TOP_IMPORTS = 8
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 -X importtime 的输出：[{'name', 'depth', 'self_us', 'cumulative_us'}]，按输出顺序（子模块在前）"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        # 名称前固定一个空格，每层嵌套再缩进两个空格
+        stripped = name.lstrip(' ')
+        entries.append({
+            'name': stripped.strip(),
+            'depth': (len(name) - len(stripped) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+        })
+    return entries
+
+
+def direct_imports(entries: List[Dict], module: str) -> List[Dict]:
+    """module 的直接依赖（只统计本次首次导入的，已被 site 等导入的不会出现）"""
+    index = next((i for i in range(len(entries) - 1, -1, -1)
+                  if entries[i]['name'] == module and entries[i]['depth'] == 0), None)
+    if index is None:
+        return []
+    children = []
+    for entry in reversed(entries[:index]):
+        if entry['depth'] == 0:
+            break
+        if entry['depth'] == 1:
+            children.append(entry)
+    return sorted(children, key=lambda e: e['cumulative_us'], reverse=True)
+
+
+def measure_once(module: str, python: str = sys.executable) -> Dict:
+    # 包本身要从上一级目录导入，其余入口与脚本方式一样在工具包目录中导入
+    cwd = TOOLKIT_DIR.parent if module == TOOLKIT_DIR.name else TOOLKIT_DIR
+    # 与生产环境一样使用字节码缓存：PYTHONDONTWRITEBYTECODE 会让每次启动都重新编译源码
+    env = {k: v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+    env['PYTHONWARNINGS'] = 'ignore'
+    start = time.perf_counter()
+    proc = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'], cwd=cwd,
+                          capture_output=True, text=True, env=env)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 失败: {proc.stderr.strip().splitlines()[-1:]}")
+    entries = parse_importtime(proc.stderr)
+    top = next((e for e in reversed(entries) if e['name'] == module and e['depth'] == 0), None)
+    return {'import_ms': top['cumulative_us'] / 1000 if top else 0.0, 'process_ms': wall * 1000,
+            'entries': entries}
+
+
+def benchmark(module: str, runs: int = DEFAULT_RUNS) -> Dict:
+    """启动 runs 个全新进程（先预热一次写入字节码缓存），返回中位数和最重的直接依赖"""
+    measure_once(module)
+    samples = [measure_once(module) for _ in range(runs)]
+    import_ms = [s['import_ms'] for s in samples]
+    median_sample = sorted(samples, key=lambda s: s['import_ms'])[len(samples) // 2]
+    budget = IMPORT_BUDGET_MS.get(module)
+    median = round(statistics.median(import_ms), 1)
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms': median,
+        'import_ms_min': round(min(import_ms), 1),
+        'process_ms': round(statistics.median(s['process_ms'] for s in samples), 1),
+        'budget_ms': budget,
+        'within_budget': None if budget is None else median <= budget,
+        'heaviest': [{'name': e['name'], 'ms': round(e['cumulative_us'] / 1000, 1)}
+                     for e in direct_imports(median_sample['entries'], module)[:TOP_IMPORTS]],
+    }
+
+
+def print_result(result: Dict):
+    budget = result['budget_ms']
+    if budget is None:
+        verdict = ''
+    else:
+        verdict = f"  预算 {budget}ms {'✅' if result['within_budget'] else '❌'}"
+    print(f"⏱️ {result['module']:<24} 导入 {result['import_ms']:>7}ms（最快 {result['import_ms_min']}ms）"
+          f"  进程 {result['process_ms']:>7}ms{verdict}")
+    for entry in result['heaviest']:
+        print(f"     {entry['ms']:>7}ms  {entry['name']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="用 -X importtime 测量入口模块的冷启动导入时间")
+    parser.add_argument("modules", nargs="*", help=f"入口模块（默认: {', '.join(IMPORT_BUDGET_MS)}）")
+    parser.add_argument("-n", "--runs", type=int, default=DEFAULT_RUNS, help="每个模块启动的进程数")
+    parser.add_argument("--check", action="store_true", help="超出导入时间预算时以非零状态退出")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    results = [benchmark(module, max(1, args.runs)) for module in (args.modules or IMPORT_BUDGET_MS)]
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for result in results:
+            print_result(result)
+    if args.check and any(r['within_budget'] is False for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
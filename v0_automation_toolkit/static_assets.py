@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+导出项目的静态资源：构建时预压缩 + 服务时的缓存策略
+
+1. precompress_directory() 在导出（next build）后为每个可压缩文件生成 .gz / .br
+   （brotli 模块可选，未安装时只生成 gzip）
+2. choose_variant() 根据 Accept-Encoding 选择预压缩文件，避免每次请求实时压缩
+3. _next/static/ 下的文件名带内容哈希，可以标记为 immutable 长期缓存；
+   HTML 等其他文件使用 ETag / Last-Modified 协商缓存
+"""
+
+import os
+import gzip
+import argparse
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {
+    '.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.xml', '.map', '.ico', '.webmanifest',
+}
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE_PREFIX = '_next/static/'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# (编码名, 文件后缀)，按优先级排序
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _is_fresh(variant: Path, source_stat: os.stat_result) -> bool:
+    try:
+        return variant.stat().st_mtime >= source_stat.st_mtime
+    except OSError:
+        return False
+
+
+def precompress_file(path: Path) -> Dict[str, int]:
+    """为单个文件生成 .gz / .br，返回各编码的压缩后大小（已是最新则跳过）"""
+    stat = path.stat()
+    sizes = {}
+    if path.suffix.lower() not in COMPRESSIBLE_SUFFIXES or stat.st_size < MIN_COMPRESS_SIZE:
+        return sizes
+
+    data = None
+    gz_path = path.with_name(path.name + '.gz')
+    if not _is_fresh(gz_path, stat):
+        data = path.read_bytes()
+        # mtime=0 使相同内容产生相同的压缩结果
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < stat.st_size:
+            gz_path.write_bytes(compressed)
+            sizes['gzip'] = len(compressed)
+        else:
+            gz_path.unlink(missing_ok=True)
+
+    br_path = path.with_name(path.name + '.br')
+    if brotli and not _is_fresh(br_path, stat):
+        if data is None:
+            data = path.read_bytes()
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < stat.st_size:
+            br_path.write_bytes(compressed)
+            sizes['br'] = len(compressed)
+        else:
+            br_path.unlink(missing_ok=True)
+    return sizes
+
+
+def precompress_directory(root: Path) -> Dict[str, int]:
+    """预压缩导出目录（通常是 <project>/out）中的全部静态资源"""
+    root = Path(root)
+    stats = {'files': 0, 'original_bytes': 0, 'gzip_bytes': 0, 'br_bytes': 0}
+    for path in root.rglob('*'):
+        if not path.is_file() or path.suffix in ('.gz', '.br'):
+            continue
+        sizes = precompress_file(path)
+        if sizes:
+            stats['files'] += 1
+            stats['original_bytes'] += path.stat().st_size
+            stats['gzip_bytes'] += sizes.get('gzip', 0)
+            stats['br_bytes'] += sizes.get('br', 0)
+    return stats
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(token)
+    return accepted
+
+
+def choose_variant(path: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+    """返回 (实际发送的文件路径, Content-Encoding)；没有合适的预压缩文件时返回原文件"""
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted or '*' in accepted:
+            variant = path + suffix
+            if os.path.isfile(variant):
+                return variant, encoding
+    return path, None
+
+
+def is_immutable(rel_path: str) -> bool:
+    """_next/static/ 下的资源文件名包含内容哈希，可以永久缓存"""
+    return rel_path.replace('\\', '/').lstrip('/').startswith(IMMUTABLE_PREFIX)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预压缩导出的静态项目")
+    parser.add_argument("out_dir", help="导出目录（例如 project/out）")
+    args = parser.parse_args()
+
+    stats = precompress_directory(Path(args.out_dir))
+    print(f"✅ 预压缩 {stats['files']} 个文件: {stats['original_bytes']} B -> "
+          f"gzip {stats['gzip_bytes']} B, br {stats['br_bytes']} B"
+          + ("" if brotli else " (未安装 brotli，仅生成 gzip)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Token 预算 - 按问题复杂度选择 max_tokens，并分析 token 数与生成耗时的关系
+
+以前每次请求都固定 max_tokens=16384，也不记录用量。现在 v0_api_call.generate_v0 记录
+prompt/completion token、首 token 时间 (TTFT) 和总耗时，随条目写入 catalog.db 的 token_usage。
+
+1. choose_max_tokens(): 按问题的长度、小问数量、数值和方程式个数估算复杂度，选择档位
+   （V0_MAX_TOKENS 固定上限；分档默认关闭，V0_ADAPTIVE_MAX_TOKENS=1 开启）。
+   截断的输出会让构建失败，所以分档要先由 report 中各档位的实测截断比例证明可行
+2. generate_with_budget(): 按档位调用 generate_v0，分档的上限截断输出（finish_reason=length）时
+   以完整的 DEFAULT_MAX_TOKENS 重试一次
+3. build_report(): 按输出 token 数分桶统计耗时分位数和截断率，拟合 "耗时 ≈ a + b × token"，
+   估算把输出上限压到某个值时 p95 耗时能降多少，以及会截断多少比例的请求；
+   tier_caps 给出每个档位的问题在该档上限下会被截断的比例
+
+用法:
+    python token_budget.py report              # 分析 catalog.db 中记录的用量
+    python token_budget.py tier "问题内容"      # 查看问题会使用的档位
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+from typing import Dict, List, Optional, Sequence
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MAX_TOKENS = 16384
+# (档位, 复杂度上限, max_tokens)，按复杂度从低到高
+TIERS = [
+    ('compact', 3.0, 10240),
+    ('standard', 6.0, 13312),
+    ('extended', float('inf'), DEFAULT_MAX_TOKENS),
+]
+REPORT_CAPS = (8192, 10240, 12288, 14336)
+TOKEN_BUCKETS = (4096, 8192, 12288)
+
+_SUBQUESTION_RE = re.compile(r"(?:^|\s)(?:\(?[a-zA-Z0-9]\)|[0-9]+\.|[①-⑩])\s|[?？]")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_EQUATION_RE = re.compile(r"->|→|⇌|⇒|=")
+
+
+def complexity_score(problem: str) -> float:
+    """粗略的复杂度：长度、小问、数值和方程式越多，生成的页面越长"""
+    text = problem.strip()
+    return round(
+        len(text) / 300
+        + len(_SUBQUESTION_RE.findall(text)) * 0.8
+        + min(len(_NUMBER_RE.findall(text)), 20) * 0.1
+        + len(_EQUATION_RE.findall(text)) * 0.5,
+        2,
+    )
+
+
+def tier_for(score: float):
+    """复杂度所属的 (档位, 复杂度上限, max_tokens)"""
+    return next(t for t in TIERS if score <= t[1])
+
+
+def choose_max_tokens(problem: str) -> Dict:
+    """返回 {'tier', 'max_tokens', 'score'}；分档关闭时同样计算 score，供 report 评估各档位的上限"""
+    fixed = os.environ.get('V0_MAX_TOKENS')
+    if fixed:
+        return {'tier': 'fixed', 'max_tokens': int(fixed), 'score': None}
+    score = complexity_score(problem)
+    if os.environ.get('V0_ADAPTIVE_MAX_TOKENS', '0') != '1':
+        return {'tier': 'default', 'max_tokens': DEFAULT_MAX_TOKENS, 'score': score}
+    tier, _, max_tokens = tier_for(score)
+    return {'tier': tier, 'max_tokens': max_tokens, 'score': score}
+
+
+def generate_with_budget(prompt: str, problem: str, cancel_event: Optional[threading.Event] = None) -> Dict:
+    """按 choose_max_tokens 的档位调用 generate_v0
+
+    分档的上限低于 DEFAULT_MAX_TOKENS 且输出被截断时，以完整上限重试一次（截断的代码必然构建失败）。
+    cancel_event 置位时中断进行中的请求并抛出 JobCancelled。
+    返回 generate_v0 的结果，usage 另加 'tier'、'score'，重试时还有 'retried_from'（被截断那次的上限、输出 token 和耗时）
+    """
+    from v0_api_call import generate_v0
+    budget = choose_max_tokens(problem)
+    generation = generate_v0(prompt, max_tokens=budget['max_tokens'], cancel_event=cancel_event)
+    usage = generation['usage']
+    if usage['finish_reason'] == 'length' and budget['tier'] in {t[0] for t in TIERS} \
+            and budget['max_tokens'] < DEFAULT_MAX_TOKENS:
+        print(f"⚠️ 输出达到档位上限 max_tokens={budget['max_tokens']} 被截断，以 {DEFAULT_MAX_TOKENS} 重试",
+              file=sys.stderr)
+        truncated = usage
+        generation = generate_v0(prompt, max_tokens=DEFAULT_MAX_TOKENS, cancel_event=cancel_event)
+        usage = {**generation['usage'], 'retried_from': {
+            key: truncated[key] for key in ('max_tokens', 'completion_tokens', 'elapsed')}}
+    generation['usage'] = {**usage, 'tier': budget['tier'], 'score': budget['score']}
+    return generation
+
+
+# ----------------------------------------------------------------------
+# 报告
+# ----------------------------------------------------------------------
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def linear_fit(xs: Sequence[float], ys: Sequence[float]) -> Optional[Dict]:
+    """最小二乘拟合 y = a + b·x"""
+    n = len(xs)
+    if n < 2:
+        return None
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if not var_x:
+        return None
+    b = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    a = mean_y - b * mean_x
+    ss_tot = sum((y - mean_y) ** 2 for y in ys)
+    ss_res = sum((y - a - b * x) ** 2 for x, y in zip(xs, ys))
+    return {'intercept': round(a, 3), 'sec_per_1k_tokens': round(b * 1000, 3),
+            'r2': round(1 - ss_res / ss_tot, 3) if ss_tot else None}
+
+
+def _stats(samples: List[Dict]) -> Dict:
+    elapsed = [s['elapsed'] for s in samples]
+    ttft = [s['ttft'] for s in samples if s.get('ttft') is not None]
+    return {
+        'count': len(samples),
+        'avg_completion_tokens': round(sum(s['completion_tokens'] for s in samples) / len(samples)),
+        'p50_elapsed': percentile(elapsed, 0.5),
+        'p95_elapsed': percentile(elapsed, 0.95),
+        'p50_ttft': percentile(ttft, 0.5),
+        # 被档位上限截断后重试的也算一次截断
+        'truncated': sum(s.get('finish_reason') == 'length' or bool(s.get('retried_from')) for s in samples),
+    }
+
+
+def build_report(samples: List[Dict], caps: Sequence[int] = REPORT_CAPS) -> Dict:
+    """samples: token_usage 字典列表（至少含 completion_tokens 和 elapsed）"""
+    samples = [s for s in samples if s.get('completion_tokens') and s.get('elapsed')]
+    report = {'samples': len(samples)}
+    if not samples:
+        return report
+    report['overall'] = _stats(samples)
+    report['estimated_usage'] = sum(bool(s.get('estimated')) for s in samples)
+
+    buckets = {}
+    bounds = (0, *TOKEN_BUCKETS, float('inf'))
+    for low, high in zip(bounds, bounds[1:]):
+        bucket = [s for s in samples if low <= s['completion_tokens'] < high]
+        if bucket:
+            label = f"{low}-{high}" if high != float('inf') else f"{low}+"
+            buckets[label] = _stats(bucket)
+    report['by_completion_tokens'] = buckets
+
+    tiers = {}
+    for sample in samples:
+        tiers.setdefault(sample.get('tier') or 'unknown', []).append(sample)
+    report['by_tier'] = {tier: _stats(group) for tier, group in sorted(tiers.items())}
+
+    fit = linear_fit([s['completion_tokens'] for s in samples], [s['elapsed'] for s in samples])
+    report['latency_fit'] = fit
+    if fit:
+        # 超过上限的请求按拟合结果估算截断后的耗时
+        projections = {}
+        for cap in caps:
+            capped = [min(s['elapsed'], fit['intercept'] + fit['sec_per_1k_tokens'] * cap / 1000)
+                      if s['completion_tokens'] > cap else s['elapsed'] for s in samples]
+            projections[str(cap)] = {
+                'p95_elapsed': percentile(capped, 0.95),
+                'would_truncate': round(sum(s['completion_tokens'] > cap for s in samples) / len(samples), 3),
+            }
+        report['cap_projection'] = projections
+
+    # 按复杂度归入档位，看各档的上限会截断多少请求（只统计没有被截断过的完整输出）
+    tier_caps = {}
+    for tier, _, cap in TIERS:
+        group = [s for s in samples if s.get('score') is not None and tier_for(s['score'])[0] == tier
+                 and s.get('finish_reason') != 'length']
+        if group:
+            tier_caps[tier] = {'max_tokens': cap, 'count': len(group),
+                               'would_truncate': round(sum(s['completion_tokens'] > cap for s in group) / len(group), 3)}
+    report['tier_caps'] = tier_caps
+    return report
+
+
+def catalog_samples() -> List[Dict]:
+    from catalog import get_catalog
+    return [entry['token_usage'] for entry in get_catalog().list_projects() if entry.get('token_usage')]
+
+
+def print_report(report: Dict):
+    if not report['samples']:
+        print("ℹ️ 还没有记录 token 用量的条目")
+        return
+    overall = report['overall']
+    print(f"📊 {report['samples']} 次生成（其中 {report['estimated_usage']} 次用量为估算）: "
+          f"p50 {overall['p50_elapsed']}s / p95 {overall['p95_elapsed']}s，TTFT p50 {overall['p50_ttft']}s，"
+          f"截断 {overall['truncated']} 次")
+    for title, key in (("输出 token", 'by_completion_tokens'), ("档位", 'by_tier')):
+        print(f"\n{title:<14} {'次数':>6} {'平均token':>10} {'p50(s)':>8} {'p95(s)':>8} {'TTFT(s)':>8} {'截断':>6}")
+        for label, stats in report[key].items():
+            print(f"{label:<14} {stats['count']:>6} {stats['avg_completion_tokens']:>10} {stats['p50_elapsed'] or '-':>8} "
+                  f"{stats['p95_elapsed'] or '-':>8} {stats['p50_ttft'] or '-':>8} {stats['truncated']:>6}")
+    fit = report.get('latency_fit')
+    if fit:
+        print(f"\n⏱️ 耗时 ≈ {fit['intercept']}s + {fit['sec_per_1k_tokens']}s × 千token (R²={fit['r2']})")
+        for cap, projection in report['cap_projection'].items():
+            print(f"   上限 {cap:>6}: p95 ≈ {projection['p95_elapsed']}s，会截断 {projection['would_truncate']:.0%} 的请求")
+    if report.get('tier_caps'):
+        print("\n🎚️ 分档上限（V0_ADAPTIVE_MAX_TOKENS=1 时使用）:")
+        for tier, stats in report['tier_caps'].items():
+            print(f"   {tier:<10} max_tokens {stats['max_tokens']:>6}: {stats['count']} 个问题，"
+                  f"会截断 {stats['would_truncate']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token 预算与生成耗时报告")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="分析 catalog.db 中记录的用量")
+    report.add_argument("--json", action="store_true", help="以 JSON 输出")
+    tier = sub.add_parser("tier", help="查看问题会使用的 max_tokens 档位")
+    tier.add_argument("problem", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        result = build_report(catalog_samples())
+        if args.json:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            print_report(result)
+    elif args.command == "tier":
+        problem = args.problem or sys.stdin.read()
+        print(json.dumps(choose_max_tokens(problem), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
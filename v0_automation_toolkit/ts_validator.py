@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+TypeScript 快速校验 - 不启动开发服务器，只对生成的文件做类型检查
+
+以前要知道生成的代码能不能编译，只能 run_smoke_test：启动 next dev，最多等 45 秒首页返回 200。
+这里直接运行 tsc --noEmit：
+
+1. 临时 tsconfig 继承项目的 tsconfig.json，include 只列出响应中提取出的文件
+   （它们导入的模板组件和 node_modules 类型会被 tsc 顺带加载，但错误只统计这些文件）
+2. 开启 incremental，build info 按模板指纹保存在 tsc_cache/<指纹>.tsbuildinfo：
+   同一模板的新项目先拷入这份 build info，模板组件和依赖的类型检查结果直接复用，
+   只有生成的文件需要重新检查
+3. 进程内用信号量限制同时运行的 tsc 数量，多个构建可以并发校验
+
+build info 中的路径相对于它自己的位置，模板指纹相同的项目目录结构一致，可以互相复用。
+
+用法:
+    python ts_validator.py generated_projects/<项目名>
+    python ts_validator.py generated_projects/* -j 4 --json
+    python ts_validator.py --check      # 验证同一模板的第二个项目拿到第一个项目写下的 build info
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from build_cache import read_manifest, template_fingerprint, write_sample_project
+from process_runner import run_streaming, DEFAULT_LOG_DIR
+from cancellation import JobCancelled
+
+DEFAULT_CACHE_DIR = Path(os.environ.get('V0_TSC_CACHE_DIR', Path(__file__).parent / "tsc_cache"))
+DEFAULT_CONCURRENCY = int(os.environ.get('V0_TSC_CONCURRENCY', max(1, (os.cpu_count() or 2) // 2)))
+TSC_TIMEOUT = 180
+VALIDATE_TSCONFIG = 'tsconfig.validate.json'
+BUILDINFO_PATH = Path('.next') / 'cache' / 'validate.tsbuildinfo'
+CHECKED_EXTENSIONS = ('.ts', '.tsx')
+
+# tsc --pretty false:  app/page.tsx(12,5): error TS2304: Cannot find name 'Zap'.
+_TSC_ERROR_RE = re.compile(r"^(?P<file>[^\s(][^(]*)\((?P<line>\d+),(?P<column>\d+)\): error (?P<code>TS\d+): (?P<message>.*)$")
+# next build:  ./app/page.tsx:12:5  下一行  Type error: Cannot find name 'Zap'.
+_NEXT_LOCATION_RE = re.compile(r"^\./(?P<file>\S+?):(?P<line>\d+):(?P<column>\d+)$")
+
+
+def parse_errors(output: str) -> List[Dict]:
+    """把 tsc 或 next build 的输出解析成 {file, line, column, code, message} 列表"""
+    errors = []
+    lines = output.splitlines()
+    for i, raw in enumerate(lines):
+        line = raw.strip()
+        match = _TSC_ERROR_RE.match(line)
+        if match:
+            error = match.groupdict()
+            # tsc 的多行消息以缩进续行
+            for cont in lines[i + 1:]:
+                if not cont.startswith('  ') or _TSC_ERROR_RE.match(cont.strip()):
+                    break
+                error['message'] += ' ' + cont.strip()
+            errors.append(error)
+            continue
+        match = _NEXT_LOCATION_RE.match(line)
+        if match:
+            message = next((l.strip() for l in lines[i + 1:] if l.strip()), '')
+            code_match = re.search(r"\b(TS\d+)\b", message)
+            errors.append({**match.groupdict(), 'code': code_match.group(1) if code_match else None,
+                           'message': re.sub(r"^(Type error|Error):\s*", '', message)})
+    for error in errors:
+        error['file'] = Path(error['file'].strip()).as_posix().removeprefix('./')
+        error['line'], error['column'] = int(error['line']), int(error['column'])
+    return errors
+
+
+def format_error(error: Dict) -> str:
+    code = f" {error['code']}" if error.get('code') else ''
+    return f"{error['file']}:{error['line']}:{error['column']}{code} {error['message']}"
+
+
+def generated_files(project_path: Path) -> List[str]:
+    """响应中提取出的 TS/TSX 文件（相对路径），模板自带的文件不检查"""
+    manifest = read_manifest(project_path) or {}
+    return sorted(rel for rel in manifest.get('files', {}) if rel.endswith(CHECKED_EXTENSIONS)
+                  and (Path(project_path) / rel).is_file())
+
+
+class TsValidator:
+    def __init__(self, cache_dir: Optional[Path] = None, concurrency: int = DEFAULT_CONCURRENCY):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    def _seed_path(self, project_path: Path) -> Path:
+        return self.cache_dir / f"{template_fingerprint(project_path)[:16]}.tsbuildinfo"
+
+    def _seed_buildinfo(self, project_path: Path, seed: Path) -> bool:
+        """项目还没有 build info 时拷入同一模板的共享 build info"""
+        target = project_path / BUILDINFO_PATH
+        if target.exists() or not seed.is_file():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(seed, target)
+        return True
+
+    def _publish_buildinfo(self, project_path: Path, seed: Path):
+        """把本次的 build info 原子地写回共享缓存（并发时最后写入的生效，任何一份都可复用）"""
+        source = project_path / BUILDINFO_PATH
+        if not source.is_file():
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = seed.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, seed)
+
+    def validate(self, project_path: Path, files: Optional[List[str]] = None,
+                 log_path: Optional[Path] = None, cancel_event: Optional[threading.Event] = None,
+                 timeout_sec: float = TSC_TIMEOUT) -> Dict:
+        """对 files（默认: 响应中提取出的文件）做类型检查
+
+        返回 {'status', 'ok', 'errors', 'other_errors', 'files', 'seeded', 'elapsed', 'tail'}；
+        status 为 passed / failed / unavailable（tsc 无法运行、tsconfig 无效或超时）
+        """
+        project_path = Path(project_path)
+        start = time.time()
+        files = generated_files(project_path) if files is None else files
+        result = {'status': 'passed', 'ok': True, 'errors': [], 'other_errors': 0, 'files': len(files),
+                  'seeded': False, 'elapsed': 0.0, 'tail': ''}
+        if not files:
+            return result
+        if not (project_path / 'node_modules').is_dir():
+            result.update(status='unavailable', ok=False, tail='node_modules missing')
+            return result
+
+        seed = self._seed_path(project_path)
+        config_path = project_path / VALIDATE_TSCONFIG
+        config = {
+            'extends': './tsconfig.json',
+            'compilerOptions': {'noEmit': True, 'incremental': True, 'tsBuildInfoFile': BUILDINFO_PATH.as_posix()},
+            'include': ['next-env.d.ts', *files],
+        }
+        output: List[str] = []
+        with self._slots:
+            result['seeded'] = self._seed_buildinfo(project_path, seed)
+            config_path.write_text(json.dumps(config, indent=2), encoding='utf-8')
+            try:
+                run = run_streaming(['npx', 'tsc', '-p', VALIDATE_TSCONFIG, '--pretty', 'false'],
+                                    cwd=project_path, timeout=timeout_sec, cancel_event=cancel_event,
+                                    log_path=log_path or DEFAULT_LOG_DIR / project_path.name / 'type-check.log',
+                                    on_line=output.append)
+            finally:
+                config_path.unlink(missing_ok=True)
+        if run['cancelled']:
+            raise JobCancelled('type-check')
+
+        errors = parse_errors('\n'.join(output))
+        wanted = set(files)
+        own = [e for e in errors if e['file'] in wanted]
+        # 非零退出却没有可解析的错误：无法判断结果
+        if run['timed_out'] or (run['returncode'] != 0 and not errors):
+            result.update(status='unavailable', ok=False, tail=run['tail'][-500:])
+        else:
+            self._publish_buildinfo(project_path, seed)
+            result.update(status='failed' if own else 'passed', ok=not own, errors=own,
+                          other_errors=len(errors) - len(own))
+        result['elapsed'] = round(time.time() - start, 3)
+        return result
+
+
+_default_validator: Optional[TsValidator] = None
+_default_validator_lock = threading.Lock()
+
+
+def get_validator() -> TsValidator:
+    """进程内共享的校验器（所有构建共用同一个并发上限）"""
+    global _default_validator
+    with _default_validator_lock:
+        if _default_validator is None:
+            _default_validator = TsValidator()
+        return _default_validator
+
+
+def self_check() -> bool:
+    """同一模板、项目名不同的两个项目共用 build info 种子
+
+    不运行 tsc：第一个项目的 build info 用占位内容代替，只检查发布和拷入这两步
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        validator = TsValidator(cache_dir=tmp / 'tsc_cache')
+        first = write_sample_project(tmp / 'chemistry_project_a', 'chemistry_project_a')
+        second = write_sample_project(tmp / 'job_42', 'job_42')
+        buildinfo = '{"program":{"fileNames":["./components/ui/button.tsx"]},"version":"5.4.5"}'
+        (first / BUILDINFO_PATH).parent.mkdir(parents=True)
+        (first / BUILDINFO_PATH).write_text(buildinfo, encoding='utf-8')
+
+        first_seed = validator._seed_path(first)
+        validator._publish_buildinfo(first, first_seed)
+        second_seed = validator._seed_path(second)
+        seeded = validator._seed_buildinfo(second, second_seed)
+        copied = (second / BUILDINFO_PATH).is_file() and (second / BUILDINFO_PATH).read_text(encoding='utf-8') == buildinfo
+
+    checks = (
+        (first_seed == second_seed, '两个项目的种子路径相同'),
+        (seeded, '第二个项目命中了第一个项目发布的种子'),
+        (copied, 'build info 已拷入第二个项目'),
+    )
+    for ok, label in checks:
+        print(f"{'✅' if ok else '❌'} {label}")
+    return all(ok for ok, _ in checks)
+
+
+def main():
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="不启动开发服务器，对生成的文件做 TypeScript 类型检查")
+    parser.add_argument("projects", nargs="*", help="项目目录")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_CONCURRENCY, help="并发数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--check", action="store_true", help="自检：同一模板的项目共用 build info 种子")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if self_check() else 1)
+    if not args.projects:
+        parser.error("需要至少一个项目目录")
+
+    validator = TsValidator(concurrency=args.workers)
+    projects = [Path(p) for p in args.projects if (Path(p) / 'package.json').exists()]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = dict(zip(projects, pool.map(validator.validate, projects)))
+
+    if args.json:
+        print(json.dumps({str(p): r for p, r in results.items()}, indent=2, ensure_ascii=False))
+    else:
+        for project, result in results.items():
+            icon = {'passed': '✅', 'failed': '❌', 'unavailable': '⚠️'}[result['status']]
+            seeded = '，复用模板 build info' if result['seeded'] else ''
+            print(f"{icon} {project.name}: {result['status']} ({result['files']} 个文件, {result['elapsed']}s{seeded})")
+            for error in result['errors'][:10]:
+                print(f"   {format_error(error)}")
+            if result['tail']:
+                print(f"   {result['tail']}")
+    sys.exit(0 if all(r['ok'] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,21 @@ Usage:
 
 import json
 import re
+import time
+import socket
+import threading
 from pathlib import Path
 import os
 import sys
-from typing import Generator, Union
+from typing import Generator, Optional, Union
 
-import httpx
-
-API_URL = "https://api.v0.dev/v1/chat/completions"
+# httpx is imported inside the request functions: importing it takes ~100ms, and the
+# per-request entry points (v0_api_integration.py) often never reach the API (cache hits, errors).
+# V0_API_URL points the client at another endpoint, e.g. the local stand-in (mock_v0_server.py)
+API_URL = os.getenv("V0_API_URL", "https://api.v0.dev/v1/chat/completions")
 DEFAULT_MODEL = "v0-1.5-lg"  # Large version
 MODEL = os.getenv("V0_MODEL", DEFAULT_MODEL)
+DEFAULT_MAX_TOKENS = 16384
 def _get_api_key() -> str:
     key = os.getenv("V0_API_KEY")
     if not key:
@@ -26,23 +31,95 @@ def _get_api_key() -> str:
     return key
 
 
-def call_v0(prompt: str) -> str:
-    """Simple (non-stream) call returning the assistant's full response text."""
-    payload = {"model": MODEL, "messages": [{"role": "user", "content": prompt}], "max_tokens": 16384}
+class _RequestCanceller:
+    """Aborts the request made inside the `with` block once cancel_event is set.
+
+    Closing an httpx client or response from another thread does not wake a thread blocked
+    reading the socket, so a watcher thread shuts the socket down instead. The socket is
+    captured through httpcore's trace hook right after the TCP connect, which also covers
+    the wait for response headers. When the block fails after cancellation the error is
+    re-raised as JobCancelled.
+    """
+
+    def __init__(self, cancel_event: Optional[threading.Event]):
+        self.cancel_event = cancel_event
+        self._sockets = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def extensions(self) -> dict:
+        return {"trace": self._trace} if self.cancel_event is not None else {}
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            sock = info["return_value"].get_extra_info("socket")
+            with self._lock:
+                self._sockets.append(sock)
+            if self.cancel_event.is_set():
+                self._abort()
+
+    def _abort(self):
+        with self._lock:
+            for sock in self._sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def _watch(self):
+        while not self._done.is_set():
+            if self.cancel_event.wait(0.2):
+                self._abort()
+                return
+
+    def _raise_cancelled(self, cause=None):
+        from cancellation import JobCancelled
+        raise JobCancelled("v0 API request cancelled") from cause
+
+    def __enter__(self):
+        if self.cancel_event is not None:
+            if self.cancel_event.is_set():
+                self._raise_cancelled()
+            threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        if exc_type is not None and issubclass(exc_type, Exception) and self.cancel_event is not None \
+                and self.cancel_event.is_set():
+            self._raise_cancelled(exc)
+        return False
+
+
+def call_v0(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+            cancel_event: Optional[threading.Event] = None) -> str:
+    """Simple (non-stream) call returning the assistant's full response text.
+
+    Setting cancel_event aborts the request and raises JobCancelled.
+    """
+    import httpx
+
+    payload = {"model": MODEL, "messages": [{"role": "user", "content": prompt}], "max_tokens": max_tokens}
     headers = {
         "Authorization": f"Bearer {_get_api_key()}",
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
-    with httpx.Client(timeout=httpx.Timeout(300, connect=30)) as client:
-        response = client.post(API_URL, headers=headers, json=payload)
+    with _RequestCanceller(cancel_event) as canceller, httpx.Client(timeout=httpx.Timeout(300, connect=30)) as client:
+        response = client.post(API_URL, headers=headers, json=payload, extensions=canceller.extensions)
         response.raise_for_status()
         data = response.json()
         return data["choices"][0]["message"]["content"]
 
 
-def stream_v0(prompt: str) -> Generator[str, None, None]:
-    """Stream responses chunk-by-chunk (Server-Sent Events). Yields text pieces."""
+def stream_v0(prompt: str, cancel_event: Optional[threading.Event] = None) -> Generator[str, None, None]:
+    """Stream responses chunk-by-chunk (Server-Sent Events). Yields text pieces.
+
+    Setting cancel_event aborts the stream and raises JobCancelled.
+    """
+    import httpx
+
     payload = {
         "model": MODEL,
         "stream": True,
@@ -53,18 +130,99 @@ def stream_v0(prompt: str) -> Generator[str, None, None]:
         "Content-Type": "application/json",
         "Accept": "application/json",
     }
-    with httpx.Client(timeout=httpx.Timeout(300, connect=30)) as client:
-        with client.stream("POST", API_URL, headers=headers, json=payload) as resp:
+    with _RequestCanceller(cancel_event) as canceller, httpx.Client(timeout=httpx.Timeout(300, connect=30)) as client:
+        with client.stream("POST", API_URL, headers=headers, json=payload, extensions=canceller.extensions) as resp:
             resp.raise_for_status()
-            for line in resp.iter_lines():
-                if not line or not line.startswith("data:"):
-                    continue
-                chunk = json.loads(line.removeprefix("data:").strip())
-                delta = chunk["choices"][0]["delta"]
-                if "content" in delta:
+            for chunk in _iter_sse_chunks(resp):
+                choices = chunk.get("choices") or []
+                delta = choices[0].get("delta", {}) if choices else {}
+                if delta.get("content"):
                     yield delta["content"].replace("\r", "")
 
 
+def _iter_sse_chunks(resp) -> Generator[dict, None, None]:
+    """Parse `data:` lines of an SSE response into JSON chunks, stopping at [DONE]."""
+    for line in resp.iter_lines():
+        if not line or not line.startswith("data:"):
+            continue
+        data = line.removeprefix("data:").strip()
+        if data == "[DONE]":
+            break
+        yield json.loads(data)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used when the API reports no usage."""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def generate_v0(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                cancel_event: Optional[threading.Event] = None) -> dict:
+    """Streaming call that also measures the request.
+
+    Returns {"text": ..., "usage": {...}} where usage holds prompt/completion/total tokens
+    (from the API's final usage chunk, or estimated when it sends none), finish_reason,
+    time to first token, total elapsed time and output tokens per second.
+    Setting cancel_event aborts the stream (even while waiting for the first token) and
+    raises JobCancelled, so worker threads can stop a call without a main-thread signal.
+    """
+    import httpx
+
+    payload = {
+        "model": MODEL,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    headers = {
+        "Authorization": f"Bearer {_get_api_key()}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    start = time.perf_counter()
+    ttft = None
+    pieces = []
+    usage = None
+    finish_reason = None
+    with _RequestCanceller(cancel_event) as canceller, httpx.Client(timeout=httpx.Timeout(300, connect=30)) as client:
+        with client.stream("POST", API_URL, headers=headers, json=payload, extensions=canceller.extensions) as resp:
+            resp.raise_for_status()
+            for chunk in _iter_sse_chunks(resp):
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    pieces.append(content.replace("\r", ""))
+                finish_reason = choices[0].get("finish_reason") or finish_reason
+    elapsed = time.perf_counter() - start
+    text = "".join(pieces)
+
+    estimated = not usage
+    prompt_tokens = (usage or {}).get("prompt_tokens") or estimate_tokens(prompt)
+    completion_tokens = (usage or {}).get("completion_tokens") or estimate_tokens(text)
+    generation_time = elapsed - (ttft or 0)
+    return {
+        "text": text,
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": (usage or {}).get("total_tokens") or prompt_tokens + completion_tokens,
+            "estimated": estimated,
+            "max_tokens": max_tokens,
+            "finish_reason": finish_reason,
+            "ttft": round(ttft, 3) if ttft is not None else None,
+            "elapsed": round(elapsed, 3),
+            "tokens_per_sec": round(completion_tokens / generation_time, 1) if generation_time > 0 else None,
+        },
+    }
+
+
 def _extract_json(text: str) -> Union[dict, None]:
     """Extracts a JSON object from a string, handling markdown code blocks."""
     # Pattern to find JSON within a markdown code block (e.g., ```json ... ```)
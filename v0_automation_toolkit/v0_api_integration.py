@@ -8,49 +8,110 @@ import os
 import sys
 import json
 import time
+import contextlib
 from pathlib import Path
 
 # Add the current directory to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from v0_api_call import call_v0
-from auto_project_builder import AutoProjectBuilder
+# API 客户端 (httpx)、项目构建器和就绪检测在第一次用到时才导入：
+# 每个请求都会重新启动这个脚本，命中缓存或提前失败的请求不必为它们付出导入时间
+from dev_server_supervisor import DevServerSupervisor
+from catalog import get_catalog, STATUS_BUILDING, STATUS_BUILT, STATUS_FAILED, STATUS_CANCELLED
+from response_archive import get_archive, archive_ref
+from prompt_assembler import get_assembler
+from token_budget import generate_with_budget
+from cancellation import CancelToken, JobCancelled, install_signal_handlers
+
+PROJECTS_DIR = Path(os.environ.get('V0_PROJECTS_DIR', Path(__file__).parent / "generated_projects"))
 
 
 class V0ApiIntegration:
-    def __init__(self):
-        self.project_builder = AutoProjectBuilder()
+    def __init__(self, cancel_token=None):
+        self.cancel_token = cancel_token or CancelToken()
+        self._project_builder = None
+        self.dev_servers = DevServerSupervisor()
+        self.catalog = get_catalog()
+        self.archive = get_archive()
+        self.prompts = get_assembler()
+        
+    @property
+    def project_builder(self):
+        if self._project_builder is None:
+            from auto_project_builder import AutoProjectBuilder
+            self._project_builder = AutoProjectBuilder(cancel_event=self.cancel_token.event)
+        return self._project_builder
+
+    def create_full_prompt(self, problem_content):
+        """创建完整的prompt（模板由 prompt_assembler 缓存，prompt.txt 修改后自动重新加载）"""
+        return self.prompts.assemble(problem_content)
+    
+    def generate_response(self, problem_content, response_name=None):
+        """生成prompt、调用v0 API并归档响应，返回响应引用 (archive://<id>)"""
+        result = self.generate(problem_content, response_name)
+        return result['response_path'] if result else None
+
+    def generate(self, problem_content, response_name=None):
+        """同 generate_response，返回 {'response_path', 'usage'}；usage 为 token 用量、TTFT 和耗时
+
+        cancel_token 被取消时中断进行中的 API 请求，抛出 JobCancelled
+        """
+        # 创建完整prompt
+        full_prompt = self.create_full_prompt(problem_content)
+        print("✅ 成功生成完整prompt", file=sys.stderr)
+        
+        # 调用v0 API（分档上限截断时自动以完整上限重试一次）
+        print("🔥 正在调用v0 API...", file=sys.stderr)
+        generation = generate_with_budget(full_prompt, problem_content, cancel_event=self.cancel_token.event)
+        response_text = generation['text']
+        usage = generation['usage']
+        print(f"📈 tokens: 输入 {usage['prompt_tokens']} / 输出 {usage['completion_tokens']}，"
+              f"max_tokens={usage['max_tokens']} (档位 {usage['tier']})，"
+              f"TTFT {usage['ttft']}s，总耗时 {usage['elapsed']}s", file=sys.stderr)
+        if usage['finish_reason'] == 'length':
+            print(f"⚠️ 输出达到 max_tokens={usage['max_tokens']} 被截断", file=sys.stderr)
         
-    def load_prompt_template(self):
-        """加载prompt模板"""
+        # 尝试解析为JSON，如果失败则包装为简单格式
         try:
-            prompt_file = Path(__file__).parent / "prompt.txt"
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        except Exception as e:
-            print(f"❌ 无法加载prompt模板: {e}", file=sys.stderr)
-            return ""
+            response = json.loads(response_text)
+        except json.JSONDecodeError:
+            response = {"content": response_text}
+        
+        if not response:
+            print("❌ v0 API调用失败", file=sys.stderr)
+            return None
+        
+        print("✅ v0 API调用成功", file=sys.stderr)
+        
+        # 追加到压缩归档；不指定名称时由归档生成纳秒级 id，并发请求不会互相覆盖
+        record_id = self.archive.append(json.dumps(response, ensure_ascii=False), record_id=response_name)
+        response_path = archive_ref(record_id)
+        
+        print(f"💾 响应已归档: {response_path}", file=sys.stderr)
+        return {'response_path': response_path, 'usage': usage}
     
-    def create_full_prompt(self, problem_content):
-        """创建完整的prompt"""
-        template = self.load_prompt_template()
-        if not template:
-            # Fallback prompt if template loading fails
-            template = """请根据以下问题创建一个交互式教育网页：
-
-问题：{problem}
-
-要求：
-1. 使用Next.js和React创建
-2. 包含交互式元素
-3. 提供步骤式教学
-4. 包含可视化图表
-5. 适合教学使用"""
+    def build_from_response(self, response_path, project_name=None, builder=None, update=False):
+        """从响应（文件路径或 archive://<id>）构建项目，返回项目路径
+
+        AutoProjectBuilder 在提取文件时会保存状态，并发构建时每个任务需要传入独立的 builder；
+        update=True 时对已存在的同名项目做增量更新
+        """
+        print("🏗️ 开始构建项目...", file=sys.stderr)
+        
+        # 创建输出目录
+        PROJECTS_DIR.mkdir(exist_ok=True)
         
-        return template.format(problem=problem_content)
+        builder = builder or self.project_builder
+        build = builder.update_project if update else builder.build_project
+        project_path = build(str(response_path), str(PROJECTS_DIR), project_name)
+        if not project_path:
+            print("❌ 项目构建失败", file=sys.stderr)
+            return None
+        return project_path
     
     def run_pipeline(self, problem_content, api_key=None):
         """运行完整管道 - 非交互式版本"""
+        entry_id, project_path = None, None
         try:
             print("🚀 启动v0自动化管道...", file=sys.stderr)
             
@@ -64,64 +125,47 @@ class V0ApiIntegration:
             
             print(f"🔑 使用API密钥: ...{api_key[-6:]}", file=sys.stderr)
             
-            # 创建完整prompt
-            full_prompt = self.create_full_prompt(problem_content)
-            print("✅ 成功生成完整prompt", file=sys.stderr)
-            
-            # 调用v0 API
-            print("🔥 正在调用v0 API...", file=sys.stderr)
-            
             # 设置环境变量供v0_api_call.py使用
             os.environ['V0_API_KEY'] = api_key
             
-            response_text = call_v0(full_prompt)
-            
-            # 尝试解析为JSON，如果失败则包装为简单格式
-            try:
-                response = json.loads(response_text)
-            except json.JSONDecodeError:
-                response = {"content": response_text}
-            
-            if not response:
-                print("❌ v0 API调用失败", file=sys.stderr)
+            start = time.time()
+            generation = self.generate(problem_content)
+            if not generation:
                 return {"success": False, "error": "V0 API call failed"}
+            response_path = generation['response_path']
+            entry_id = self.catalog.record_response(
+                self.prompts.prompt_key(problem_content), response_path, problem_content,
+                stage_timings={"api": round(time.time() - start, 3)}, token_usage=generation['usage']
+            )
+            self.cancel_token.check()
             
-            print("✅ v0 API调用成功", file=sys.stderr)
-            
-            # 保存响应
-            timestamp = int(time.time())
-            response_file = f"generated_{timestamp}.json"
-            response_path = Path(__file__).parent / "responses" / response_file
-            response_path.parent.mkdir(exist_ok=True)
-            
-            with open(response_path, 'w', encoding='utf-8') as f:
-                json.dump(response, f, ensure_ascii=False, indent=2)
-            
-            print(f"💾 响应已保存: {response_path}", file=sys.stderr)
-            
-            # 构建项目
-            print("🏗️ 开始构建项目...", file=sys.stderr)
-            
-            # 创建输出目录
-            toolkit_dir = os.path.dirname(os.path.abspath(__file__))
-            output_dir = os.path.join(toolkit_dir, "generated_projects")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            project_path = self.project_builder.build_project(str(response_path), output_dir)
+            # 先记录项目路径，构建中途被取消时 project_gc 可以找到残留目录
+            start = time.time()
+            project_path = PROJECTS_DIR / self.project_builder.default_project_name(str(response_path))
+            self.catalog.update(entry_id, build_status=STATUS_BUILDING, project_path=project_path)
+            project_path = self.build_from_response(response_path, project_name=project_path.name)
+            build_time = round(time.time() - start, 3)
+            self.cancel_token.check()
             if not project_path:
-                print("❌ 项目构建失败", file=sys.stderr)
+                self.catalog.update(entry_id, build_status=STATUS_FAILED, stage_timings={"build": build_time})
                 return {"success": False, "error": "Project build failed"}
+            # 类型检查生成的文件，出错时本地修复或只重新生成出错的文件（V0_REPAIR_ROUNDS=0 时只检查）
+            repair = self.project_builder.repair_project(project_path)
+            self.cancel_token.check()
+            self.catalog.update(entry_id, build_status=STATUS_BUILT, project_path=project_path,
+                                stage_timings={"build": build_time, "repair": repair['elapsed']}, compute_size=True)
             
             print(f"✅ 项目构建成功: {project_path}", file=sys.stderr)
             
             # 启动开发服务器
             print("🚀 启动开发服务器...", file=sys.stderr)
-            port = self.start_dev_server(project_path)
+            port, time_to_ready = self.start_dev_server(project_path)
             
             if not port:
                 print("❌ 服务器启动失败", file=sys.stderr)
                 return {"success": False, "error": "Dev server start failed"}
             
+            self.catalog.update(entry_id, stage_timings={"ready": time_to_ready})
             project_url = f"http://localhost:{port}"
             print(f"🎉 项目成功运行在: {project_url}", file=sys.stderr)
             
@@ -131,70 +175,60 @@ class V0ApiIntegration:
                 "projectUrl": project_url,
                 "projectPath": str(project_path),
                 "port": port,
+                "timeToReady": time_to_ready,
                 "message": f"项目成功生成并运行在端口 {port}"
             }
             
             print(json.dumps(result))
             return result
             
+        except JobCancelled as e:
+            print(f"🛑 任务已取消 ({e})，正在清理...", file=sys.stderr)
+            self.cleanup_cancelled(entry_id, project_path)
+            return {"success": False, "error": "Cancelled", "cancelled": True}
         except Exception as e:
             print(f"❌ 管道执行失败: {str(e)}", file=sys.stderr)
             return {"success": False, "error": str(e)}
     
+    def cleanup_cancelled(self, entry_id, project_path):
+        """停止被取消任务的开发服务器（同时释放端口），并把条目标记为 cancelled 交给 project_gc 回收"""
+        if project_path:
+            self.dev_servers.stop(project_path)
+        if entry_id:
+            self.catalog.update(entry_id, build_status=STATUS_CANCELLED)
+    
     def start_dev_server(self, project_path):
-        """启动开发服务器"""
-        import subprocess
-        import time
-        import socket
-        
-        # 找到可用端口
-        def find_free_port(start_port=3002):
-            for port in range(start_port, start_port + 100):
-                try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                        s.bind(('localhost', port))
-                        return port
-                except OSError:
-                    continue
-            return None
-        
-        port = find_free_port()
+        """通过 DevServerSupervisor 启动（或复用）开发服务器，返回 (端口, 就绪耗时)"""
+        from readiness import wait_for_dev_server
+        start = time.time()
+        port = self.dev_servers.ensure(project_path)
         if not port:
-            print("❌ 无法找到可用端口", file=sys.stderr)
-            return None
-        
-        try:
-            # 启动开发服务器
-            env = os.environ.copy()
-            env['PORT'] = str(port)
-            
-            process = subprocess.Popen(
-                ['npm', 'run', 'dev'],
-                cwd=project_path,
-                env=env,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True
-            )
-            
-            # 等待服务器启动
-            time.sleep(5)
-            
-            # 检查进程是否还在运行
-            if process.poll() is None:
-                print(f"✅ Dev server started on port {port} (PID: {process.pid})", file=sys.stderr)
-                return port
-            else:
-                print("❌ Dev server failed to start", file=sys.stderr)
-                return None
-                
-        except Exception as e:
-            print(f"❌ 启动服务器时出错: {e}", file=sys.stderr)
-            return None
+            print("❌ Dev server failed to start", file=sys.stderr)
+            return None, None
+
+        # 等待首个页面编译完成
+        status = wait_for_dev_server(
+            f"http://localhost:{port}/",
+            log_path=Path(project_path) / '.dev_server.log',
+            is_alive=lambda: self.dev_servers.touch(project_path),
+            timeout_sec=60,
+        )
+        time_to_ready = round(time.time() - start, 3)
+
+        if status['ready']:
+            print(f"✅ Dev server ready on port {port} in {time_to_ready}s", file=sys.stderr)
+            return port, time_to_ready
+        else:
+            print(f"❌ Dev server failed to start: {status['reason']}", file=sys.stderr)
+            self.dev_servers.stop(project_path)
+            return None, None
 
 
 def main():
     """主函数 - 从stdin读取参数"""
+    # 超时或客户端放弃时 server-example.py 会发送 SIGTERM
+    cancel_token = CancelToken()
+    install_signal_handlers(cancel_token)
     try:
         # 从stdin读取问题内容
         problem_content = input().strip()
@@ -206,15 +240,16 @@ def main():
         # 从环境变量获取API密钥
         api_key = os.environ.get('V0_API_KEY')
         
-        # 运行管道
-        integration = V0ApiIntegration()
-        result = integration.run_pipeline(problem_content, api_key)
+        # 运行管道；构建步骤的日志转到 stderr，stdout 只输出结果 JSON（server-example.py 解析它）
+        integration = V0ApiIntegration(cancel_token=cancel_token)
+        with contextlib.redirect_stdout(sys.stderr):
+            result = integration.run_pipeline(problem_content, api_key)
         
+        print(json.dumps(result, default=str))
         if not result.get("success"):
-            print(json.dumps(result))
             sys.exit(1)
             
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, JobCancelled):
         print(json.dumps({"success": False, "error": "Process interrupted"}))
         sys.exit(1)
     except Exception as e:
@@ -8,15 +8,17 @@ import os
 import sys
 import json
 import time
-import subprocess
 import webbrowser
 from pathlib import Path
 from typing import Optional
 
 # 导入现有的 v0 API 和项目构建器
 try:
-    from v0_api_call import call_v0, _extract_json
-    from auto_project_builder import AutoProjectBuilder
+    from token_budget import generate_with_budget
+    from dev_server_supervisor import DevServerSupervisor
+    from catalog import get_catalog, STATUS_BUILDING, STATUS_BUILT, STATUS_FAILED
+    from response_archive import get_archive, archive_ref
+    from prompt_assembler import PromptAssembler, PromptTemplateError
 except ImportError as e:
     print(f"❌ 导入错误: {e}")
     print("请确保 v0_api_call.py 和 auto_project_builder.py 在同一目录下")
@@ -25,13 +27,14 @@ except ImportError as e:
 class V0CompletePipeline:
     def __init__(self):
         self.base_dir = Path(__file__).parent
-        self.prompt_template = self.base_dir / "prompt.txt"
-        self.responses_dir = self.base_dir / "可能的响应"
+        self.prompts = PromptAssembler(self.base_dir / "prompt.txt", fallback=None)
         self.projects_dir = self.base_dir / "v0_generated_projects"
         self.ui_path = self.base_dir / "ui"
+        self.dev_servers = DevServerSupervisor()
+        self.catalog = get_catalog()
+        self.archive = get_archive()
         
         # 确保目录存在
-        self.responses_dir.mkdir(exist_ok=True)
         self.projects_dir.mkdir(exist_ok=True)
 
     def get_user_inputs(self) -> tuple[str, str]:
@@ -62,55 +65,46 @@ class V0CompletePipeline:
         return api_key, problem_content
 
     def create_full_prompt(self, problem_content: str) -> str:
-        """将问题内容插入到 prompt 模板中"""
-        if not self.prompt_template.exists():
-            print(f"❌ 找不到 prompt 模板文件: {self.prompt_template}")
-            sys.exit(1)
-            
+        """将问题内容插入到 prompt 模板的 <problem> 占位符中"""
         try:
-            with open(self.prompt_template, 'r', encoding='utf-8') as f:
-                template = f.read()
-            
-            # 将问题内容插入到 <problem> 标签中
-            full_prompt = template.replace("<problem>", f"<problem>\n{problem_content}\n</problem>")
-            
-            print("✅ 成功生成完整 prompt")
-            return full_prompt
-            
-        except Exception as e:
+            full_prompt = self.prompts.assemble(problem_content)
+        except PromptTemplateError as e:
             print(f"❌ 读取 prompt 模板失败: {e}")
             sys.exit(1)
+        print(f"✅ 成功生成完整 prompt (模板版本 {self.prompts.version})")
+        return full_prompt
 
-    def call_v0_api(self, api_key: str, prompt: str) -> str:
-        """调用 v0 API 生成响应"""
+    def call_v0_api(self, api_key: str, prompt: str, problem_content: str) -> dict:
+        """调用 v0 API 生成响应，返回 {'text', 'usage'}（token 用量、TTFT 和耗时）"""
         print("\n🔥 正在调用 v0 API...")
         
         # 设置环境变量
         os.environ["V0_API_KEY"] = api_key
         
         try:
-            response = call_v0(prompt)
-            print("✅ v0 API 调用成功")
-            return response
+            generation = generate_with_budget(prompt, problem_content)
+            usage = generation['usage']
+            print(f"✅ v0 API 调用成功 (输出 {usage['completion_tokens']} tokens，"
+                  f"TTFT {usage['ttft']}s，总耗时 {usage['elapsed']}s)")
+            return generation
         except Exception as e:
             print(f"❌ v0 API 调用失败: {e}")
             sys.exit(1)
 
-    def save_response(self, response: str) -> Path:
-        """保存 v0 响应到文件"""
+    def save_response(self, response: str) -> str:
+        """把 v0 响应追加到压缩归档，返回 archive://<id>"""
         timestamp = int(time.time())
-        response_file = self.responses_dir / f"generated_{timestamp}.json.raw.txt"
         
         try:
-            with open(response_file, 'w', encoding='utf-8') as f:
-                f.write(response)
-            print(f"✅ 响应已保存到: {response_file}")
+            record_id = self.archive.append(response, record_id=f"generated_{timestamp}")
+            response_file = archive_ref(record_id)
+            print(f"✅ 响应已归档: {response_file}")
             return response_file
         except Exception as e:
             print(f"❌ 保存响应失败: {e}")
             sys.exit(1)
 
-    def build_project(self, response_file: Path) -> Optional[Path]:
+    def build_project(self, response_file: str) -> Optional[Path]:
         """使用现有的项目构建器构建项目"""
         print("\n🏗️  开始构建 Next.js 项目...")
         
@@ -118,6 +112,7 @@ class V0CompletePipeline:
         project_name = f"chemistry_webapp_{timestamp}"
         
         try:
+            from auto_project_builder import AutoProjectBuilder
             builder = AutoProjectBuilder(ui_path=str(self.ui_path) if self.ui_path.exists() else None)
             project_path = builder.build_project(
                 input_file=str(response_file),
@@ -137,80 +132,33 @@ class V0CompletePipeline:
             return None
 
     def start_dev_server(self, project_path: Path) -> Optional[int]:
-        """启动开发服务器并返回端口号"""
+        """通过 DevServerSupervisor 启动开发服务器并返回端口号"""
         print("\n🚀 启动开发服务器...")
-        
-        # 寻找可用端口
-        import socket
-        for port in range(3000, 3100):
-            try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                    s.bind(("127.0.0.1", port))
-                    break
-            except OSError:
-                continue
-        else:
-            print("❌ 找不到可用端口")
+        print(f"📦 正在运行: cd {project_path} && npm run dev")
+
+        port = self.dev_servers.ensure(project_path)
+        if not port:
+            print("❌ 找不到可用端口或服务器启动失败")
             return None
-        
-        try:
-            print(f"📦 正在运行: cd {project_path} && npm run dev")
-            
-            # 由于我们已经配置了 package.json 的 dev 脚本为 "next dev --turbopack"
-            # 我们需要指定端口参数
-            proc = subprocess.Popen(
-                ['npm', 'run', 'dev', '--', '-p', str(port)],
-                cwd=str(project_path),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1
-            )
-            
-            print(f"🌐 开发服务器正在启动... 端口: {port}")
-            print("⏳ 等待服务器就绪...")
-            
-            # 实时读取输出，等待 Ready 标记
-            ready_found = False
-            start_time = time.time()
-            timeout = 30  # 30秒超时
-            
-            while time.time() - start_time < timeout:
-                if proc.poll() is not None:
-                    # 进程已结束
-                    stdout, _ = proc.communicate()
-                    print(f"❌ 服务器启动失败:")
-                    print(stdout)
-                    return None
-                
-                try:
-                    # 非阻塞读取一行
-                    line = proc.stdout.readline()
-                    if line:
-                        print(f"  {line.strip()}")
-                        if "Ready in" in line or "Local:" in line:
-                            ready_found = True
-                            break
-                except:
-                    pass
-                    
-                time.sleep(0.5)
-            
-            if ready_found:
-                print(f"✅ 开发服务器已启动: http://localhost:{port}")
-                # 保存进程ID到文件，方便后续管理
-                pid_file = project_path / '.dev_server.pid'
-                with open(pid_file, 'w') as f:
-                    f.write(str(proc.pid))
-                return port
-            else:
-                print("❌ 服务器启动超时")
-                proc.terminate()
-                return None
-                
-        except Exception as e:
-            print(f"❌ 启动开发服务器失败: {e}")
+
+        print(f"🌐 开发服务器正在启动... 端口: {port}")
+        print("⏳ 等待服务器就绪...")
+
+        from readiness import wait_for_dev_server
+        status = wait_for_dev_server(
+            f"http://localhost:{port}/",
+            log_path=project_path / '.dev_server.log',
+            is_alive=lambda: self.dev_servers.touch(project_path),
+            timeout_sec=60,
+            on_line=lambda line: print(f"  {line.strip()}"),
+        )
+
+        if status['ready']:
+            print(f"✅ 开发服务器已启动: http://localhost:{port} (就绪耗时 {status['elapsed']}s)")
+            return port
+        else:
+            print(f"❌ 服务器启动失败: {status['reason']}")
+            self.dev_servers.stop(project_path)
             return None
 
     def open_browser(self, port: int):
@@ -235,15 +183,25 @@ class V0CompletePipeline:
             full_prompt = self.create_full_prompt(problem_content)
             
             # 3. 调用 v0 API
-            response = self.call_v0_api(api_key, full_prompt)
+            api_start = time.time()
+            generation = self.call_v0_api(api_key, full_prompt, problem_content)
             
             # 4. 保存响应
-            response_file = self.save_response(response)
+            response_file = self.save_response(generation['text'])
+            entry_id = self.catalog.record_response(
+                self.prompts.prompt_key(problem_content), response_file, problem_content,
+                stage_timings={"api": round(time.time() - api_start, 3)}, token_usage=generation['usage'])
             
             # 5. 构建项目
+            start = time.time()
+            self.catalog.update(entry_id, build_status=STATUS_BUILDING)
             project_path = self.build_project(response_file)
+            build_timings = {"build": round(time.time() - start, 3)}
             if not project_path:
+                self.catalog.update(entry_id, build_status=STATUS_FAILED, stage_timings=build_timings)
                 return
+            self.catalog.update(entry_id, build_status=STATUS_BUILT, project_path=project_path,
+                                stage_timings=build_timings, compute_size=True)
             
             # 6. 启动开发服务器
             port = self.start_dev_server(project_path)
@@ -268,6 +226,7 @@ class V0CompletePipeline:
                 while True:
                     time.sleep(1)
             except KeyboardInterrupt:
+                self.dev_servers.stop(project_path)
                 print("\n👋 再见！")
                 
         except KeyboardInterrupt: